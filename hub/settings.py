@@ -54,9 +54,10 @@ MIDDLEWARE = [
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'csp.middleware.CSPMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hub_app.authlib.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hub_app.authlib.middleware.HashingPoolSaturatedMiddleware',
 ]
 
 MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
@@ -120,9 +121,46 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 # Password Hashers
+# The Argon2 cost parameters are measured for the host with "./manage.py tuneargon2". Stored hashes with other
+# parameters are upgraded on the next successful login. A parameter set to None keeps the value of the installed
+# Django's Argon2PasswordHasher (the defaults differ between Django versions), so the existing hashes stay as they are.
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'hub_app.authlib.hashers.TunedArgon2PasswordHasher',
 ]
+ARGON2_TIME_COST = None
+ARGON2_MEMORY_COST = None
+ARGON2_PARALLELISM = None
+
+
+# TOTP Secret Encryption
+# The first secret encrypts, all secrets decrypt. If empty, the SECRET_KEY is used. To rotate, put the new secret
+# first, keep the old one(s) behind it and run "./manage.py rotatetotpsecrets" before removing the old ones.
+TOTP_SECRET_KEYRING = []
+
+
+# TOTP QR Codes
+# Rendered QR codes are kept in a process-wide LRU cache of at most QR_CODE_CACHE_SIZE images (0: no caching). The
+# cache is keyed by an HMAC of username, secret, format and block size, never by the secret itself. The admin serves
+# QR codes of about QR_CODE_DEFAULT_SIZE pixels; larger ones can be requested with "?size=", up to QR_CODE_MAX_SIZE.
+QR_CODE_CACHE_SIZE = 256
+QR_CODE_DEFAULT_SIZE = 256
+QR_CODE_MAX_SIZE = 2048
+
+
+# Enrollment Sheet Export
+# The admin exports the enrollment sheets (name, username, QR code and secret) of the selected users as ZIP archive. The
+# secrets are decrypted and the sheets are rendered in ENROLLMENT_EXPORT_WORKERS worker processes (0: on the request
+# thread).
+ENROLLMENT_EXPORT_WORKERS = 2
+
+
+# Password Hashing Pool
+# Password hashes are calculated in PASSWORD_HASHING_WORKERS worker processes (0: on the request thread). At most
+# PASSWORD_HASHING_MAX_PENDING hashes run or wait at the same time. Requests that don't get a slot within
+# PASSWORD_HASHING_WAIT seconds are answered with "429 Too Many Requests".
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_MAX_PENDING = 16
+PASSWORD_HASHING_WAIT = 0.5
 
 
 # User Model and Auth Backend
@@ -132,6 +170,78 @@ AUTHENTICATION_BACKENDS = (
 )
 
 
+# Caches and Authenticated User Cache
+# The user of a session is cached in the cache USER_CACHE (None: no caching) for USER_CACHE_TIMEOUT seconds, and
+# dropped whenever the user is saved or deleted. A local-memory cache only notices the changes of its own process, so
+# use a shared cache (e.g. memcached) if more than one process serves the hub.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hub-users',
+    },
+}
+USER_CACHE = 'users'
+USER_CACHE_TIMEOUT = 60
+
+
+# Login Timing Attack Mitigation
+# 'dummy_hash': one password hash per login attempt, unknown users are checked against a dummy hash
+# 'padding': like 'dummy_hash', and every login attempt takes at least LOGIN_TIMING_PADDING seconds
+# 'random_hashes': like 'dummy_hash', plus 1 to 4 additional password hashes per login attempt (costs a lot of CPU)
+LOGIN_TIMING_MITIGATION = 'dummy_hash'
+LOGIN_TIMING_PADDING = 0.5
+
+
+# Login Rate Limiting
+# Failed logins are counted per IP address ('ip'), per username ('username') and per pair of both ('ip_username').
+# LOGIN_RATE_LIMITS maps each scope to (maximum failed logins, sliding window in seconds); scopes left out are not
+# limited. Limited logins are rejected before any password hash.
+# Available stores: MemoryRateLimitStore (single process only), SqliteRateLimitStore (all processes on one host, using
+# LOGIN_RATE_LIMIT_SQLITE_PATH), CacheRateLimitStore (the Django cache LOGIN_RATE_LIMIT_CACHE, e.g. for many hosts)
+LOGIN_RATE_LIMIT_STORE = 'hub_app.authlib.ratelimit.MemoryRateLimitStore'
+LOGIN_RATE_LIMITS = {
+    'ip': (50, 10 * 60),
+    'username': (10, 15 * 60),
+    'ip_username': (5, 5 * 60),
+}
+LOGIN_RATE_LIMIT_SQLITE_PATH = os.path.join(BASE_DIR, '_login-rate-limit.sqlite3')
+LOGIN_RATE_LIMIT_CACHE = 'default'
+# Behind reverse proxies, REMOTE_ADDR is the address of the proxy: set LOGIN_RATE_LIMIT_CLIENT_IP_HEADER to the META key
+# of the header the proxies append the client address to (e.g. 'HTTP_X_FORWARDED_FOR'), and
+# LOGIN_RATE_LIMIT_TRUSTED_PROXIES to the number of proxies in front of the hub. Only set this behind proxies, otherwise
+# the client can choose its own address.
+LOGIN_RATE_LIMIT_CLIENT_IP_HEADER = None
+LOGIN_RATE_LIMIT_TRUSTED_PROXIES = 1
+
+
+# OTP Replay Protection
+# Available backends: DatabaseReplayBackend (needs "./manage.py cleanburnedotp"), MemoryReplayBackend (single process
+# only) and SqliteReplayBackend (shared by all processes on one host).
+OTP_REPLAY_BACKEND = 'hub_app.authlib.replay.DatabaseReplayBackend'
+OTP_REPLAY_TTL = 3 * 30  # The OTP window: one step before and one step after the current one
+OTP_REPLAY_SQLITE_PATH = os.path.join(BASE_DIR, '_otp-replay.sqlite3')
+
+
+# Maintenance
+# The command "runhubmaintenance" runs these management commands at their intervals (in seconds). Only one node runs
+# them at a time, using an advisory lock of the database or, e.g. for SQLite, a lock on MAINTENANCE_LOCK_FILE (in the
+# temp directory if None). The runs are logged to "hub_app.maintenance" and appended to MAINTENANCE_METRICS_FILE.
+MAINTENANCE_TASKS = {
+    'cleanburnedotp': 10 * 60,
+    'cleanpendingrecoveries': 15 * 60,
+    'cleanpendingregistrations': 60 * 60,
+    'cleanpendingemailchanges': 60 * 60,
+    'clearsessions': 60 * 60,
+    'sendoutbox': 60,
+}
+MAINTENANCE_LOCK_NAME = 'passiopeia-hub-maintenance'
+MAINTENANCE_LOCK_FILE = None
+MAINTENANCE_METRICS_FILE = None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -196,6 +306,16 @@ SESSION_COOKIE_SECURE = True
 SESSION_COOKIE_SAMESITE = 'Strict'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Session Engine
+# 'hub_app.sessionlib.db': Database, unchanged sessions are not saved again
+# 'hub_app.sessionlib.cached_db': Like 'db', and also kept in the cache SESSION_CACHE_ALIAS. With SESSION_L1_SIZE > 0,
+# the most recently used sessions are additionally kept in the memory of the process for SESSION_L1_TIMEOUT seconds
+# (only for a single process or sticky sessions, other processes don't see it)
+# Expired sessions are deleted in batches with "./manage.py clearsessions".
+SESSION_ENGINE = 'hub_app.sessionlib.db'
+SESSION_L1_SIZE = 0
+SESSION_L1_TIMEOUT = 5
+
 
 # Settings for the test subsystem
 HEADLESS_TEST_MODE = True
@@ -245,6 +365,29 @@ EMAIL_USE_LOCALTIME = False
 # Other E-Mail Settings: https://docs.djangoproject.com/en/3.0/ref/settings/#email-host
 
 
+# E-Mail Backend
+# SMTP connections are kept in a pool of at most EMAIL_POOL_SIZE connections per mail server and reused. A sender waits
+# up to EMAIL_POOL_TIMEOUT seconds for a free connection. Connections idle for more than EMAIL_POOL_CHECK_AFTER seconds
+# are checked before use, connections idle for more than EMAIL_POOL_MAX_IDLE seconds are closed.
+EMAIL_BACKEND = 'hub_app.maillib.smtp.PooledEmailBackend'
+EMAIL_POOL_SIZE = 4
+EMAIL_POOL_TIMEOUT = 10
+EMAIL_POOL_CHECK_AFTER = 30
+EMAIL_POOL_MAX_IDLE = 5 * 60
+
+
+# E-Mail Outbox
+# The views queue their E-Mails, the command "sendoutbox" delivers them (run by "runhubmaintenance" every minute, or
+# "sendoutbox --loop" for less delay). A failed E-Mail is tried again after EMAIL_OUTBOX_RETRY_DELAY seconds, doubled
+# with every attempt up to EMAIL_OUTBOX_MAX_RETRY_DELAY seconds, and is given up after EMAIL_OUTBOX_MAX_ATTEMPTS
+# attempts; its body is cleared then, as it may contain links with tokens. A worker claims its E-Mails for
+# EMAIL_OUTBOX_LEASE seconds.
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 6 * 60 * 60
+EMAIL_OUTBOX_MAX_ATTEMPTS = 10
+EMAIL_OUTBOX_LEASE = 5 * 60
+
+
 # Notifications
 ADMINS = (
     ('Test Admin', 'test-admin@passiopeia.github.io'),
@@ -252,4 +395,6 @@ ADMINS = (
 
 
 # JSON Schema Settings
+# The schemas and examples are sent with a strong ETag and may be cached for JSON_SCHEMA_MAX_AGE seconds.
 JSON_SCHEMA_BASE = 'http://localhost:8000/schema/'
+JSON_SCHEMA_MAX_AGE = 24 * 60 * 60
@@ -9,6 +9,9 @@ LANGUAGE_COOKIE_SECURE = False
 CSRF_COOKIE_SECURE = False
 SESSION_COOKIE_SECURE = False
 
+# The tests log in many times with wrong credentials, the rate limiting tests configure their own limits
+LOGIN_RATE_LIMITS = {}
+
 
 # Mail delivery to folder
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
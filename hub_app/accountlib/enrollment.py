@@ -0,0 +1,198 @@
+"""
+Enrollment sheets for many users at once
+
+An enrollment sheet is an SVG page with the name, the username, the QR code and the secret of a user. For the export,
+the secrets are decrypted and the sheets are rendered in a pool of ENROLLMENT_EXPORT_WORKERS worker processes. Only a
+few sheets are in flight at any time, and the finished sheets are streamed into a ZIP archive, so the memory needed
+does not grow with the number of users.
+"""
+from base64 import b32encode
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils.html import escape
+from django.utils.text import get_valid_filename
+from django.utils.translation import gettext
+
+from hub_app.authlib.crypt import SymmetricCrypt
+from hub_app.authlib.hashing import run_in_worker
+from hub_app.authlib.totp.qr import create_qr_code, iter_svg_path_data
+
+SHEET_FIELDS = ('id', 'username', 'first_name', 'last_name', 'totp_secret')
+
+SheetJob = Tuple[Dict[str, str], str, str, bytes]
+
+
+def get_sheet_labels() -> Dict[str, str]:
+    """
+    Get the texts of the sheets in the active language
+
+    The worker processes don't know the language of the request, so the texts are translated before.
+
+    :rtype: Dict[str, str]
+    :returns: The texts
+    """
+    return {
+        'title': gettext('Passiopeia Hub'),
+        'subtitle': gettext('One Time Password Enrollment'),
+        'username': gettext('Username'),
+        'secret': gettext('Secret'),
+        'hint': gettext('Scan the QR code with your OTP app or enter the secret manually. Keep this sheet safe.'),
+    }
+
+
+def format_secret(secret: str) -> str:
+    """
+    Split the base32 secret into groups of four characters, for manual input
+
+    :param str secret: The base32 encoded secret
+    :rtype: str
+    :returns: The grouped secret
+    """
+    return ' '.join(secret[i:i + 4] for i in range(0, len(secret), 4))
+
+
+def render_enrollment_sheet(labels: Dict[str, str], username: str, full_name: str,
+                            encrypted_secret: bytes) -> Tuple[str, bytes]:
+    """
+    Render the enrollment sheet of a user, as A4 page in SVG
+
+    Runs in the worker processes (by run_in_worker()), or on the calling thread without workers.
+
+    :param Dict[str, str] labels: The texts, from get_sheet_labels()
+    :param str username: The username
+    :param str full_name: The full name of the user, may be empty
+    :param bytes encrypted_secret: The encrypted TOTP secret
+    :rtype: Tuple[str, bytes]
+    :returns: The username and the SVG document
+    """
+    secret = b32encode(SymmetricCrypt().decrypt(encrypted_secret))
+    matrix = create_qr_code(username, secret).get_matrix()
+    modules = len(matrix)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<svg xmlns="http://www.w3.org/2000/svg" width="210mm" height="297mm" viewBox="0 0 210 297" '
+        'font-family="sans-serif">',
+        '<text x="20" y="30" font-size="9" font-weight="bold">{}</text>'.format(escape(labels['title'])),
+        '<text x="20" y="40" font-size="6">{}</text>'.format(escape(labels['subtitle'])),
+        '<text x="20" y="60" font-size="6">{}</text>'.format(escape(full_name)),
+        '<text x="20" y="70" font-size="5">{}: {}</text>'.format(escape(labels['username']), escape(username)),
+        '<path transform="translate(45 85) scale({})" shape-rendering="crispEdges" d="{}"/>'.format(
+            120 / modules, ''.join(iter_svg_path_data(matrix))
+        ),
+        '<text x="20" y="225" font-size="5">{}:</text>'.format(escape(labels['secret'])),
+        '<text x="20" y="235" font-size="5" font-family="monospace">{}</text>'.format(
+            format_secret(secret.decode('us-ascii'))
+        ),
+        '<text x="20" y="255" font-size="3.5">{}</text>'.format(escape(labels['hint'])),
+        '</svg>',
+        '',
+    ]
+    return username, '\n'.join(lines).encode('utf-8')
+
+
+def get_sheet_jobs(users: QuerySet, labels: Dict[str, str]) -> Iterator[SheetJob]:
+    """
+    Get the arguments of render_enrollment_sheet() for the users with a secret
+
+    :param QuerySet users: The users
+    :param Dict[str, str] labels: The texts, from get_sheet_labels()
+    :rtype: Iterator[SheetJob]
+    :returns: The arguments for every sheet
+    """
+    users = users.filter(totp_secret__isnull=False).only(*SHEET_FIELDS).order_by('username')
+    for user in users.iterator(chunk_size=100):
+        if user.totp_secret:
+            yield labels, user.username, user.get_full_name(), bytes(user.totp_secret)
+
+
+def iter_enrollment_sheets(jobs: Iterable[SheetJob], workers: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Render the enrollment sheets in worker processes, in order
+
+    At most two sheets per worker are submitted but not yet taken, so the memory stays bounded.
+
+    :param Iterable[SheetJob] jobs: The arguments of render_enrollment_sheet()
+    :param int workers: Number of worker processes, 0 means rendering on the calling thread
+    :rtype: Iterator[Tuple[str, bytes]]
+    :returns: The username and the SVG document of every sheet
+    """
+    if workers < 1:
+        for job in jobs:
+            yield render_enrollment_sheet(*job)
+        return
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append(executor.submit(run_in_worker, render_enrollment_sheet, *job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+    finally:  # Also if the download is aborted
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+class _ZipStream:
+    """
+    Write-only, unseekable target for ZipFile that hands out what was written so far
+    """
+
+    def __init__(self):
+        self._chunks = []  # type: List[bytes]
+
+    def write(self, data: bytes) -> int:
+        """
+        Take the data
+        """
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """
+        Nothing to do, the data is taken by drain()
+        """
+
+    def drain(self) -> bytes:
+        """
+        Get and forget the data written so far
+
+        :rtype: bytes
+        :returns: The data
+        """
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _stream_zip(sheets: Iterator[Tuple[str, bytes]]) -> Iterator[bytes]:
+    stream = _ZipStream()
+    with ZipFile(stream, mode='w', compression=ZIP_DEFLATED) as archive:
+        for username, sheet in sheets:
+            archive.writestr('{}.svg'.format(get_valid_filename(username)), sheet)
+            yield stream.drain()
+    yield stream.drain()
+
+
+def stream_enrollment_zip(users: QuerySet, workers: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive with the enrollment sheets of the users, one SVG file per user
+
+    Users without a secret are skipped. The texts are translated right away, the sheets are rendered while the
+    archive is consumed.
+
+    :param QuerySet users: The users
+    :param Optional[int] workers: Number of worker processes, the setting ENROLLMENT_EXPORT_WORKERS if not given
+    :rtype: Iterator[bytes]
+    :returns: The parts of the ZIP archive
+    """
+    if workers is None:
+        workers = settings.ENROLLMENT_EXPORT_WORKERS
+    return _stream_zip(iter_enrollment_sheets(get_sheet_jobs(users, get_sheet_labels()), workers))
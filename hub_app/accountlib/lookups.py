@@ -0,0 +1,69 @@
+"""
+Case-insensitive lookups of users
+
+Usernames and E-Mail addresses are compared case-insensitively. The HubUser keeps lowercase copies of both in indexed
+columns, so the lookups are plain comparisons of these columns; "iexact" cannot use an index on most databases.
+"""
+from typing import List, Optional
+
+from django.db.models import Count, QuerySet, Q
+from django.utils.timezone import now
+
+from hub_app.models import HubUser
+
+
+def users_by_username(username: str, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """
+    Get the users with the username, ignoring the case
+
+    :param str username: The username
+    :param Optional[QuerySet] queryset: The users to search, all users if not given
+    :rtype: QuerySet
+    :returns: The matching users
+    """
+    if queryset is None:
+        queryset = HubUser.objects.all()
+    return queryset.filter(username_normalized=username.lower())
+
+
+def get_duplicate_usernames() -> List[str]:
+    """
+    Get the usernames that belong to more than one user, ignoring the case
+
+    These users can't log in, the login doesn't know which one is meant. Rename all but one of them.
+
+    :rtype: List[str]
+    :returns: The lowercase usernames
+    """
+    return list(
+        HubUser.objects.values('username_normalized').annotate(users=Count('pk')).filter(users__gt=1).order_by(
+            'username_normalized'
+        ).values_list('username_normalized', flat=True)
+    )
+
+
+def users_by_email(email: str, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """
+    Get the users with the E-Mail address, ignoring the case
+
+    :param str email: The E-Mail address
+    :param Optional[QuerySet] queryset: The users to search, all users if not given
+    :rtype: QuerySet
+    :returns: The matching users
+    """
+    if queryset is None:
+        queryset = HubUser.objects.all()
+    return queryset.filter(email_normalized=email.lower())
+
+
+def get_recoverable_users() -> QuerySet:
+    """
+    Get the users that can start a credential recovery
+
+    :rtype: QuerySet
+    :returns: The active users without a pending registration and without a valid pending credential recovery
+    """
+    return HubUser.objects.filter(
+        Q(pendingcredentialrecovery__isnull=True) | Q(pendingcredentialrecovery__valid_until__lt=now()),
+        is_active=True, pendingregistration__isnull=True
+    )
@@ -10,11 +10,13 @@ from django.contrib.sessions.models import Session
 from django.utils.translation import gettext_lazy as _
 
 from hub_app.admin.otp import BurnedOtpAdmin
+from hub_app.admin.outbox import OutboxMailAdmin
 from hub_app.admin.pending_credential_recovery import PendingCredentialRecoveryAdmin
 from hub_app.admin.pending_email_changes import PendingEMailChangeAdmin
 from hub_app.admin.pending_registration import PendingRegistrationAdmin
 from hub_app.admin.user import HubUserAdmin
-from hub_app.models import HubUser, BurnedOtp, PendingRegistration, PendingCredentialRecovery, PendingEMailChange
+from hub_app.models import HubUser, BurnedOtp, PendingRegistration, PendingCredentialRecovery, PendingEMailChange, \
+    OutboxMail
 
 
 class HubAdmin(AdminSite):
@@ -33,6 +35,7 @@ admin_site.register(BurnedOtp, BurnedOtpAdmin)
 admin_site.register(PendingRegistration, PendingRegistrationAdmin)
 admin_site.register(PendingCredentialRecovery, PendingCredentialRecoveryAdmin)
 admin_site.register(PendingEMailChange, PendingEMailChangeAdmin)
+admin_site.register(OutboxMail, OutboxMailAdmin)
 
 # Django internals
 admin_site.register(Group)
@@ -0,0 +1,43 @@
+"""
+Admin for the E-Mail Outbox
+"""
+from django.contrib import admin
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxMailAdmin(admin.ModelAdmin):
+    """
+    Outbox E-Mail Admin
+    """
+
+    list_display = (
+        'subject',
+        'recipients',
+        'created',
+        'attempts',
+        'next_attempt',
+        'uuid',
+    )
+
+    ordering = ('created',)
+
+    readonly_fields = (
+        'uuid',
+        'created',
+        'from_email',
+        'recipients',
+        'subject',
+        'attempts',
+        'last_error',
+    )
+
+    fieldsets = (
+        (_('Identification'), {
+            'fields': (
+                'uuid',
+                'created',
+            ),
+        }),
+        (_('E-Mail'), {'fields': ('from_email', 'recipients', 'subject',)}),  # No body, it may contain tokens
+        (_('Delivery'), {'fields': ('attempts', 'next_attempt', 'last_error',)}),
+    )
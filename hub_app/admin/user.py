@@ -6,8 +6,12 @@ from uuid import uuid4
 from django import forms
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserChangeForm
+from django.http import StreamingHttpResponse
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
+from hub_app.accountlib.enrollment import stream_enrollment_zip
+
 
 class ReadOnlySecretWidget(forms.Widget):
     """
@@ -64,6 +68,8 @@ class HubUserAdmin(UserAdmin):
 
     form = UserAdminForm
 
+    actions = ('export_enrollment_sheets',)
+
     ordering = ('last_name', 'first_name', 'username',)
 
     list_display = (
@@ -90,3 +96,16 @@ class HubUserAdmin(UserAdmin):
     readonly_fields = UserAdmin.readonly_fields + (
         'id', 'last_login',
     )
+
+    def export_enrollment_sheets(self, request, queryset):  # pylint: disable=unused-argument
+        """
+        Download the enrollment sheets of the selected users as ZIP archive
+        """
+        response = StreamingHttpResponse(stream_enrollment_zip(queryset), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="enrollment-sheets-{}.zip"'.format(
+            now().strftime('%Y%m%d-%H%M%S')
+        )
+        return response
+
+    export_enrollment_sheets.short_description = _('Download enrollment sheets of selected users')
+    export_enrollment_sheets.allowed_permissions = ('change',)
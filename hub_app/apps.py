@@ -12,3 +12,11 @@ class HubAppConfig(AppConfig):
     """
     name = 'hub_app'
     verbose_name = _('* Passiopeia Hub')
+
+    def ready(self):
+        """
+        Connect the signal receivers and compile the E-Mail templates
+        """
+        from hub_app.authlib import user_cache  # noqa: F401  # pylint: disable=import-outside-toplevel,unused-import
+        from hub_app.maillib.templates import get_mail_templates  # pylint: disable=import-outside-toplevel
+        get_mail_templates()
@@ -1,24 +1,99 @@
 """
 Authentication Backend that incorporates a one-time password
 """
-import datetime
+import time
 from random import SystemRandom
+from threading import Lock
 from typing import Optional
 
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http import HttpRequest
-from django.utils.timezone import now
+from django.utils.crypto import get_random_string
 
+from hub_app.accountlib.lookups import users_by_username
 from hub_app.authlib.crypt import SymmetricCrypt
-from hub_app.authlib.totp.token import get_possible_otps
-from hub_app.models.users import HubUser, BurnedOtp
+from hub_app.authlib.hashing import HashingPool, get_hashing_pool, check_user_password
+from hub_app.authlib.ratelimit import RateLimiter, get_rate_limiter
+from hub_app.authlib.replay import get_replay_backend
+from hub_app.authlib.totp.token import verify_otp
+from hub_app.models.users import HubUser
+
+
+TIMING_MITIGATIONS = ('dummy_hash', 'padding', 'random_hashes')
+
+# The columns loaded for a login: all the authentication needs, plus the first name for the welcome message
+AUTHENTICATION_FIELDS = ('id', 'username', 'password', 'is_active', 'totp_secret', 'first_name')
+
+_DUMMY_PASSWORD_HASH_LOCK = Lock()
+_DUMMY_PASSWORD_HASH = None  # type: Optional[str]
+
+
+def get_dummy_password_hash() -> str:
+    """
+    Get a password hash, created with the default hasher, that is never used by any user
+
+    :rtype: str
+    :returns: The (process-wide) dummy hash
+    """
+    global _DUMMY_PASSWORD_HASH  # pylint: disable=global-statement
+    dummy_hash = _DUMMY_PASSWORD_HASH
+    if dummy_hash is None:
+        with _DUMMY_PASSWORD_HASH_LOCK:
+            if _DUMMY_PASSWORD_HASH is None:
+                _DUMMY_PASSWORD_HASH = make_password(get_random_string(32))
+            dummy_hash = _DUMMY_PASSWORD_HASH
+    return dummy_hash
+
+
+@receiver(setting_changed)
+def _reset_dummy_password_hash(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    A new default hasher (or new parameters) needs a new dummy hash
+    """
+    global _DUMMY_PASSWORD_HASH  # pylint: disable=global-statement
+    if setting in ('PASSWORD_HASHERS', 'ARGON2_TIME_COST', 'ARGON2_MEMORY_COST', 'ARGON2_PARALLELISM'):
+        with _DUMMY_PASSWORD_HASH_LOCK:
+            _DUMMY_PASSWORD_HASH = None
 
 
 class TotpAuthenticationBackend(ModelBackend):
     """
     Backend implementation for username, password and one-time password
+
+    The mitigation against timing attacks is configured with the setting LOGIN_TIMING_MITIGATION:
+
+    - 'dummy_hash': Exactly one password hash per attempt. If the user does not exist, the password is checked against
+      a dummy hash instead.
+    - 'padding': Like 'dummy_hash', but every attempt additionally takes at least LOGIN_TIMING_PADDING seconds.
+    - 'random_hashes': Like 'dummy_hash', plus 1 to 4 additional password hashes per attempt (the former behaviour).
+
+    Failed attempts are counted by the rate limiter. A limited attempt is rejected before any password hash.
     """
 
+    def __init__(self, mitigation: Optional[str] = None, padding: Optional[float] = None,
+                 rate_limiter: Optional[RateLimiter] = None, hashing_pool: Optional[HashingPool] = None):
+        """
+        Django creates the backend without arguments, so everything is taken from the settings. Other values are
+        for measurements, see the command "benchmarklogin".
+
+        :param Optional[str] mitigation: The timing mitigation, LOGIN_TIMING_MITIGATION if not given
+        :param Optional[float] padding: The padding in seconds, LOGIN_TIMING_PADDING if not given
+        :param Optional[RateLimiter] rate_limiter: The rate limiter, the configured one if not given
+        :param Optional[HashingPool] hashing_pool: The hashing pool, the configured one if not given
+        """
+        super().__init__()
+        if mitigation is not None and mitigation not in TIMING_MITIGATIONS:
+            raise ValueError('The mitigation must be one of {}'.format(', '.join(TIMING_MITIGATIONS)))
+        self.mitigation = mitigation
+        self.padding = padding
+        self.rate_limiter = rate_limiter
+        self.hashing_pool = hashing_pool
+
     @staticmethod
     def clean_username(username: str) -> str:
         """
@@ -30,11 +105,53 @@ class TotpAuthenticationBackend(ModelBackend):
         """
         return username.lower().strip()
 
-    def authenticate(self, request: HttpRequest, username=None, password=None, one_time_pw=None) -> Optional[HubUser]:
-        # pylint: disable=arguments-differ
-        random = SystemRandom()
-        for i in range(random.randrange(1, 5)):  # nosec
-            HubUser().set_password('against-timing-attack' + str(i))  # Mitigation against timing attack
+    @staticmethod
+    def get_timing_mitigation() -> str:
+        """
+        Get the configured timing mitigation strategy
+
+        :rtype: str
+        :returns: The strategy
+
+        :raises ImproperlyConfigured: On unknown strategies
+        """
+        mitigation = getattr(settings, 'LOGIN_TIMING_MITIGATION', 'dummy_hash')
+        if mitigation not in TIMING_MITIGATIONS:
+            raise ImproperlyConfigured(
+                'LOGIN_TIMING_MITIGATION must be one of {}'.format(', '.join(TIMING_MITIGATIONS))
+            )
+        return mitigation
+
+    def check_credentials(self, username: str, password: str) -> Optional[HubUser]:
+        """
+        Check username and password with exactly one password hash, no matter if the user exists or not
+
+        :param str username: The cleaned username
+        :param str password: The password
+        :rtype: Optional[HubUser]
+        :returns: The user, if the credentials are fine and the user is allowed to login
+        """
+        try:
+            user = users_by_username(
+                username, HubUser._default_manager.only(*AUTHENTICATION_FIELDS)  # pylint: disable=protected-access
+            ).get()
+        except (HubUser.DoesNotExist, HubUser.MultipleObjectsReturned):
+            (self.hashing_pool or get_hashing_pool()).check_password(password, get_dummy_password_hash())
+            return None
+        if check_user_password(user, password, self.hashing_pool) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def authenticate_with_otp(self, username, password, one_time_pw) -> Optional[HubUser]:
+        """
+        Check all credentials
+
+        :param str username: The username
+        :param str password: The password
+        :param str one_time_pw: The one time password
+        :rtype: Optional[HubUser]
+        :returns: The user, if all credentials are fine
+        """
         if username is None or password is None or one_time_pw is None:
             return None
         if any(
@@ -42,19 +159,52 @@ class TotpAuthenticationBackend(ModelBackend):
         ):
             return None
         c_user = TotpAuthenticationBackend.clean_username(username)
-        user_object = super(TotpAuthenticationBackend, self).authenticate(request, c_user, password)  # type: HubUser
+        user_object = self.check_credentials(c_user, password)
         if user_object is None:
             return None
         if user_object.totp_secret is None:
             return None
-        possible_tokens = get_possible_otps(SymmetricCrypt().decrypt(user_object.totp_secret))
-        if one_time_pw not in possible_tokens:
+        if not verify_otp(SymmetricCrypt().decrypt(user_object.totp_secret), one_time_pw):
             return None
-        current_time = now()
-        starting_at = current_time - datetime.timedelta(hours=1)
-        try:
-            BurnedOtp.objects.filter(user=user_object, burned_timestamp__gte=starting_at).get(token=one_time_pw)
+        if not get_replay_backend().burn(user_object.pk, one_time_pw):
             return None
-        except BurnedOtp.DoesNotExist:
-            BurnedOtp.objects.create(user=user_object, token=one_time_pw)
         return user_object
+
+    def authenticate(self, request: HttpRequest, username=None, password=None, one_time_pw=None) -> Optional[HubUser]:
+        # pylint: disable=arguments-differ
+        mitigation = self.mitigation or TotpAuthenticationBackend.get_timing_mitigation()
+        limiter = self.rate_limiter or get_rate_limiter()
+        hashing_pool = self.hashing_pool or get_hashing_pool()
+        keys = RateLimiter.get_keys(request, TotpAuthenticationBackend.clean_username(username or ''))
+        if limiter.is_limited(keys):
+            raise PermissionDenied()  # Stops the authentication with all backends
+        started = time.monotonic()
+        if mitigation == 'random_hashes':
+            random = SystemRandom()
+            for i in range(random.randrange(1, 5)):  # nosec
+                hashing_pool.make_password('against-timing-attack' + str(i))  # Mitigation against timing attack
+        user_object = self.authenticate_with_otp(username, password, one_time_pw)
+        if user_object is None:
+            limiter.register_failure(keys)
+        else:
+            limiter.register_success(keys)
+        if mitigation == 'padding':
+            padding = settings.LOGIN_TIMING_PADDING if self.padding is None else self.padding
+            remaining = padding - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+        return user_object
+
+    def get_user(self, user_id) -> Optional[HubUser]:
+        """
+        Load the user of the session on every request, without the TOTP secret
+
+        :param user_id: The primary key of the user
+        :rtype: Optional[HubUser]
+        :returns: The user, if the user exists and is allowed to login
+        """
+        try:
+            user = HubUser._default_manager.defer('totp_secret').get(pk=user_id)  # pylint: disable=protected-access
+        except HubUser.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
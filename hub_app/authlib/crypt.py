@@ -2,30 +2,136 @@
 Cryptographic stuff needed for Authentication
 """
 from base64 import urlsafe_b64encode
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
 
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+_CIPHER_REGISTRY = {}  # type: Dict[Tuple[bytes, ...], MultiFernet]
+_CIPHER_REGISTRY_LOCK = Lock()
+
+
+def derive_key(secret: str) -> bytes:
+    """
+    Derive a Fernet key from a secret
+
+    :param str secret: The secret, e.g. the Django SECRET_KEY
+    :rtype: bytes
+    :returns: The urlsafe base64 encoded key
+    """
+    return urlsafe_b64encode(secret.encode('utf-8')[:32])
+
+
+def get_key_material() -> Tuple[bytes, ...]:
+    """
+    Derive the Fernet keys from the configured keyring
+
+    The keyring is configured with the setting TOTP_SECRET_KEYRING. If it is empty, the Django Secret is used.
+
+    :rtype: Tuple[bytes, ...]
+    :returns: The urlsafe base64 encoded keys, the primary key first
+    """
+    keyring = getattr(settings, 'TOTP_SECRET_KEYRING', None) or (settings.SECRET_KEY,)
+    return tuple(derive_key(secret) for secret in keyring)
+
+
+def get_cipher_suite(key_material: Tuple[bytes, ...]) -> MultiFernet:
+    """
+    Get the process-wide Cipher Suite for the key material
+
+    Building a Fernet instance decodes and splits the key every time, so every cipher is only created once per process
+    and keyring.
+
+    :param Tuple[bytes, ...] key_material: The urlsafe base64 encoded keys, the primary key first
+    :rtype: MultiFernet
+    :returns: The (cached) Cipher Suite
+    """
+    cipher_suite = _CIPHER_REGISTRY.get(key_material, None)
+    if cipher_suite is None:
+        with _CIPHER_REGISTRY_LOCK:
+            cipher_suite = _CIPHER_REGISTRY.get(key_material, None)
+            if cipher_suite is None:
+                cipher_suite = MultiFernet([Fernet(key) for key in key_material])
+                _CIPHER_REGISTRY[key_material] = cipher_suite
+    return cipher_suite
+
+
+def clear_cipher_registry():
+    """
+    Forget all cached Cipher Suites
+    """
+    with _CIPHER_REGISTRY_LOCK:
+        _CIPHER_REGISTRY.clear()
+
+
+@receiver(setting_changed)
+def _invalidate_cipher_registry(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop cached Cipher Suites if the key material changes
+    """
+    if setting in ('SECRET_KEY', 'TOTP_SECRET_KEYRING'):
+        clear_cipher_registry()
 
 
 class SymmetricCrypt:
     """
-    Symmetric Encryption and Decryption using the configured Django Secret
+    Symmetric Encryption and Decryption using the configured keyring (or the Django Secret)
+
+    Encryption always uses the primary (first) key, decryption tries all keys of the keyring.
     """
 
     def __init__(self):
         """
-        Initialize Fernet Cipher Suite
+        Get the Fernet Cipher Suite from the registry
         """
-        self.cipher_suite = Fernet(urlsafe_b64encode(settings.SECRET_KEY.encode('utf-8')[:32]))
+        self.cipher_suite = get_cipher_suite(get_key_material())
 
     def encrypt(self, to_be_encrypted: bytes) -> bytes:
         """
-        Encrypt with Fernet, using the configured Django Secret
+        Encrypt with Fernet, using the primary key
         """
         return self.cipher_suite.encrypt(to_be_encrypted)
 
     def decrypt(self, to_be_decrypted: bytes) -> bytes:
         """
-        Decrypt with Fernet, using the configured Django Secret
+        Decrypt with Fernet, using any key of the keyring
         """
         return self.cipher_suite.decrypt(to_be_decrypted)
+
+    def encrypt_many(self, to_be_encrypted: Iterable[bytes]) -> List[bytes]:
+        """
+        Encrypt many items with the same Cipher Suite
+
+        :param Iterable[bytes] to_be_encrypted: The plain items
+        :rtype: List[bytes]
+        :returns: The encrypted items, in the same order
+        """
+        encrypt = self.cipher_suite.encrypt
+        return [encrypt(item) for item in to_be_encrypted]
+
+    def decrypt_many(self, to_be_decrypted: Iterable[bytes]) -> List[bytes]:
+        """
+        Decrypt many items with the same Cipher Suite
+
+        :param Iterable[bytes] to_be_decrypted: The encrypted items
+        :rtype: List[bytes]
+        :returns: The decrypted items, in the same order
+        """
+        decrypt = self.cipher_suite.decrypt
+        return [decrypt(item) for item in to_be_decrypted]
+
+    def rotate(self, to_be_rotated: bytes) -> bytes:
+        """
+        Re-encrypt with the primary key
+
+        :param bytes to_be_rotated: The item, encrypted with any key of the keyring
+        :rtype: bytes
+        :returns: The item, encrypted with the primary key
+
+        :raises InvalidToken: If no key of the keyring is able to decrypt the item
+        """
+        return self.cipher_suite.rotate(to_be_rotated)
@@ -0,0 +1,36 @@
+"""
+Password hashers
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with the cost parameters from the settings
+
+    The parameters are configured with ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) and ARGON2_PARALLELISM; use
+    "./manage.py tuneargon2" to measure them for the host. The algorithm name stays "argon2", so hashes created with
+    other parameters are still verified and replaced with a new hash on the next successful login.
+    """
+
+    @property
+    def time_cost(self) -> int:
+        """
+        Number of iterations
+        """
+        return getattr(settings, 'ARGON2_TIME_COST', None) or Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self) -> int:
+        """
+        Memory usage in KiB
+        """
+        return getattr(settings, 'ARGON2_MEMORY_COST', None) or Argon2PasswordHasher.memory_cost
+
+    @property
+    def parallelism(self) -> int:
+        """
+        Number of lanes
+        """
+        return getattr(settings, 'ARGON2_PARALLELISM', None) or Argon2PasswordHasher.parallelism
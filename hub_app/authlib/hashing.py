@@ -0,0 +1,260 @@
+"""
+Password hashing in a bounded pool of worker processes
+
+Hashing a password with Argon2 costs a lot of CPU and memory. To keep login storms from starving all other pages, the
+hashes are calculated in a pool of worker processes. The number of hashes running or waiting is limited; if there is no
+free slot in time, HashingPoolSaturated is raised (and answered with "429 Too Many Requests" by the middleware).
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+_POOL_LOCK = Lock()
+_POOL = None  # type: Optional[HashingPool]
+
+
+class HashingPoolSaturated(Exception):
+    """
+    There are too many password hashes running or waiting
+    """
+
+
+def init_worker():
+    """
+    Make sure Django is set up in the worker process (required if workers are spawned instead of forked)
+
+    Called by the functions the workers run, as the "initializer" of ProcessPoolExecutor needs Python 3.7.
+    """
+    from django.apps import apps  # pylint: disable=import-outside-toplevel
+    if not apps.ready:  # pragma: no cover  # Only in spawned worker processes
+        import django  # pylint: disable=import-outside-toplevel
+        django.setup()
+
+
+def run_in_worker(func: Callable, *args):
+    """
+    Run a function in a worker process, after setting up Django
+
+    :param Callable func: The function
+    :returns: The result of the function
+    """
+    init_worker()
+    return func(*args)
+
+
+def check_and_rehash_password(password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password and create a new hash, if the hash is outdated
+
+    :param str password: The raw password
+    :param str encoded: The stored hash
+    :rtype: Tuple[bool, Optional[str]]
+    :returns: If the password is correct and the new hash (or None, if the stored hash is still fine)
+    """
+    new_encoded = []
+    correct = check_password(password, encoded, setter=lambda raw_password: new_encoded.append(
+        make_password(raw_password)
+    ))
+    return correct, (new_encoded[0] if len(new_encoded) > 0 else None)
+
+
+class HashingPool:
+    """
+    A bounded pool for password hashing
+    """
+
+    def __init__(self, workers: int, max_pending: int, wait: float):
+        """
+        :param int workers: Number of worker processes, 0 means hashing on the calling thread
+        :param int max_pending: Maximum number of hashes running or waiting at the same time
+        :param float wait: Seconds to wait for a free slot
+        """
+        self.workers = workers
+        self.wait = wait
+        self._slots = BoundedSemaphore(max_pending)
+        self._executor_lock = Lock()
+        self._executor = None  # type: Optional[ProcessPoolExecutor]
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers < 1:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset_executor(self):
+        with self._executor_lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _acquire(self, blocking: bool = True):
+        """
+        :raises HashingPoolSaturated: If there is no free slot in time
+        """
+        if blocking and self.wait > 0:
+            acquired = self._slots.acquire(timeout=self.wait)  # pylint: disable=consider-using-with
+        else:
+            acquired = self._slots.acquire(blocking=False)  # pylint: disable=consider-using-with
+        if not acquired:
+            raise HashingPoolSaturated()
+
+    def _submit(self, func: Callable, *args) -> Future:
+        executor = self._get_executor()
+        try:
+            return executor.submit(run_in_worker, func, *args)
+        except BrokenProcessPool:  # pragma: no cover  # A worker process died, start over with a fresh pool
+            self._reset_executor()
+            return self._get_executor().submit(run_in_worker, func, *args)
+
+    def run(self, func: Callable, *args):
+        """
+        Run a hashing function in the pool and wait for the result
+
+        :raises HashingPoolSaturated: If there is no free slot in time
+        """
+        self._acquire()
+        try:
+            if self.workers < 1:
+                return func(*args)
+            return self._submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    async def run_async(self, func: Callable, *args):
+        """
+        Run a hashing function in the pool without blocking the event loop
+
+        :raises HashingPoolSaturated: If there is no free slot
+        """
+        self._acquire(blocking=False)
+        try:
+            if self.workers < 1:
+                return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+            return await asyncio.wrap_future(self._submit(func, *args))
+        finally:
+            self._slots.release()
+
+    def make_password(self, password: str) -> str:
+        """
+        Hash a password with the default hasher
+
+        :param str password: The raw password
+        :rtype: str
+        :returns: The hash
+        """
+        return self.run(make_password, password)
+
+    async def amake_password(self, password: str) -> str:
+        """
+        Hash a password with the default hasher (async)
+
+        :param str password: The raw password
+        :rtype: str
+        :returns: The hash
+        """
+        return await self.run_async(make_password, password)
+
+    def check_password(self, password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password
+
+        :param str password: The raw password
+        :param str encoded: The stored hash
+        :rtype: Tuple[bool, Optional[str]]
+        :returns: If the password is correct and the new hash (or None, if the stored hash is still fine)
+        """
+        return self.run(check_and_rehash_password, password, encoded)
+
+    async def acheck_password(self, password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password (async)
+
+        :param str password: The raw password
+        :param str encoded: The stored hash
+        :rtype: Tuple[bool, Optional[str]]
+        :returns: If the password is correct and the new hash (or None, if the stored hash is still fine)
+        """
+        return await self.run_async(check_and_rehash_password, password, encoded)
+
+    def shutdown(self):
+        """
+        Stop the worker processes
+        """
+        self._reset_executor()
+
+
+def get_hashing_pool() -> HashingPool:
+    """
+    Get the configured hashing pool
+
+    :rtype: HashingPool
+    :returns: The (process-wide) pool
+    """
+    global _POOL  # pylint: disable=global-statement
+    pool = _POOL
+    if pool is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = HashingPool(
+                    settings.PASSWORD_HASHING_WORKERS,
+                    settings.PASSWORD_HASHING_MAX_PENDING,
+                    settings.PASSWORD_HASHING_WAIT
+                )
+            pool = _POOL
+    return pool
+
+
+@receiver(setting_changed)
+def _reset_hashing_pool(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    Create a new pool if the configuration changes
+    """
+    global _POOL  # pylint: disable=global-statement
+    if setting in ('PASSWORD_HASHING_WORKERS', 'PASSWORD_HASHING_MAX_PENDING', 'PASSWORD_HASHING_WAIT',
+                   'PASSWORD_HASHERS', 'ARGON2_TIME_COST', 'ARGON2_MEMORY_COST', 'ARGON2_PARALLELISM'):
+        with _POOL_LOCK:
+            pool = _POOL
+            _POOL = None
+        if pool is not None:
+            pool.shutdown()
+
+
+def set_user_password(user, password: str):
+    """
+    Set the password of a user, hashed in the pool (the user is not saved)
+
+    :param AbstractBaseUser user: The user
+    :param str password: The raw password
+    """
+    user.password = get_hashing_pool().make_password(password)
+    user._password = password  # pylint: disable=protected-access  # Like AbstractBaseUser.set_password
+
+
+def check_user_password(user, password: str, pool: Optional[HashingPool] = None) -> bool:
+    """
+    Check the password of a user in the pool, an outdated hash is replaced and saved
+
+    :param AbstractBaseUser user: The user
+    :param str password: The raw password
+    :param Optional[HashingPool] pool: The pool, the configured one if not given
+    :rtype: bool
+    :returns: True, if the password is correct
+    """
+    if not user.has_usable_password():
+        return False
+    correct, new_encoded = (pool or get_hashing_pool()).check_password(password, user.password)
+    if correct and new_encoded is not None:
+        user.password = new_encoded
+        user.save(update_fields=['password'])
+    return correct
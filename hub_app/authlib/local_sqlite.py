@@ -0,0 +1,38 @@
+"""
+Local SQLite databases shared by all worker processes on the same host
+"""
+import os
+import sqlite3
+from threading import local
+
+
+class LocalSqlite:  # pylint: disable=too-few-public-methods
+    """
+    One connection per thread and process to a SQLite database in WAL mode, in autocommit mode
+    """
+
+    def __init__(self, path: str, schema: str):
+        """
+        :param str path: Path to the database file
+        :param str schema: Statement creating the table, if it does not exist yet
+        """
+        self.path = path
+        self.schema = schema
+        self._local = local()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Get the connection for the current thread and process
+
+        :rtype: sqlite3.Connection
+        :returns: The connection
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(self.schema)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
@@ -0,0 +1,42 @@
+"""
+Middleware for the authentication
+"""
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.http import HttpRequest, HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.authlib.hashing import HashingPoolSaturated
+from hub_app.authlib.user_cache import get_cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):  # pylint: disable=too-few-public-methods
+    """
+    Like the Django AuthenticationMiddleware, but the user is taken from the user cache
+    """
+
+    def process_request(self, request: HttpRequest):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+class HashingPoolSaturatedMiddleware(MiddlewareMixin):  # pylint: disable=too-few-public-methods
+    """
+    Answer with "429 Too Many Requests" if the password hashing pool is saturated
+    """
+
+    retry_after = 5
+
+    def process_exception(self, request: HttpRequest, exception: Exception):  # pylint: disable=unused-argument
+        """
+        Only handle the saturation of the hashing pool
+        """
+        if not isinstance(exception, HashingPoolSaturated):
+            return None
+        response = HttpResponse(
+            _('Too many requests at the moment. Please try again in a few seconds.'),
+            status=429, content_type='text/plain; charset=utf-8'
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
@@ -0,0 +1,341 @@
+"""
+Rate limiting for logins
+
+Failed logins are counted per IP address, per username and per pair of both. Every scope has a limit of failed logins
+within a sliding window, configured with the setting LOGIN_RATE_LIMITS. A limited login is rejected before any password
+is hashed.
+
+The sliding window is approximated with two fixed windows: the count of the previous window is weighted by the part of
+it that still overlaps with the sliding window. The counters are kept in a store, configured with the setting
+LOGIN_RATE_LIMIT_STORE.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+from hub_app.authlib.local_sqlite import LocalSqlite
+
+
+RATE_LIMIT_SCOPES = ('ip', 'username', 'ip_username')
+
+
+def get_client_ip(request: HttpRequest) -> str:
+    """
+    Get the IP address of the client
+
+    Without the setting LOGIN_RATE_LIMIT_CLIENT_IP_HEADER, this is REMOTE_ADDR. Behind reverse proxies, the address is
+    taken from that header, as added by the outermost of the LOGIN_RATE_LIMIT_TRUSTED_PROXIES trusted proxies; entries
+    further left are sent by the client and can't be trusted.
+
+    :param HttpRequest request: The request
+    :rtype: str
+    :returns: The IP address, REMOTE_ADDR if the header is missing or too short
+    """
+    remote_address = request.META.get('REMOTE_ADDR', '')
+    header = settings.LOGIN_RATE_LIMIT_CLIENT_IP_HEADER
+    if not header:
+        return remote_address
+    addresses = [address.strip() for address in request.META.get(header, '').split(',') if address.strip()]
+    trusted_proxies = max(settings.LOGIN_RATE_LIMIT_TRUSTED_PROXIES, 1)
+    if len(addresses) < trusted_proxies:
+        return remote_address
+    return addresses[-trusted_proxies]
+
+
+_LIMITER_LOCK = Lock()
+_LIMITER = None  # type: Optional[RateLimiter]
+
+
+class BaseRateLimitStore:
+    """
+    Interface for all rate limit stores
+    """
+
+    def increment(self, key: str, window: int, ttl: int):
+        """
+        Count one failed login
+
+        :param str key: The key of the counter
+        :param int window: The number of the current window
+        :param int ttl: Seconds the counter must be kept
+        """
+        raise NotImplementedError()
+
+    def get_counts(self, key: str, window: int) -> Tuple[int, int]:
+        """
+        Get the counts of the previous and the current window
+
+        :param str key: The key of the counter
+        :param int window: The number of the current window
+        :rtype: Tuple[int, int]
+        :returns: The count of the previous and the count of the current window
+        """
+        raise NotImplementedError()
+
+    def reset(self, key: str, window: int):
+        """
+        Forget the counts of the previous and the current window
+
+        :param str key: The key of the counter
+        :param int window: The number of the current window
+        """
+        raise NotImplementedError()
+
+
+class MemoryRateLimitStore(BaseRateLimitStore):
+    """
+    Keep the counters in the memory of the current process
+
+    Only suitable if there is exactly one process handling logins.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters = OrderedDict()  # type: OrderedDict[str, Tuple[float, Dict[int, int]]]
+
+    def _expire(self, current_time: float):
+        """
+        Forget expired counters; the counters are kept in the order of their last change
+        """
+        while self._counters:
+            key, (expires, _counts) = next(iter(self._counters.items()))
+            if expires > current_time:
+                break
+            del self._counters[key]
+
+    def increment(self, key: str, window: int, ttl: int):
+        current_time = time.time()
+        with self._lock:
+            self._expire(current_time)
+            _expires, counts = self._counters.pop(key, (0, {}))
+            counts = {counted_window: count for counted_window, count in counts.items() if counted_window >= window - 1}
+            counts[window] = counts.get(window, 0) + 1
+            self._counters[key] = (current_time + ttl, counts)
+
+    def get_counts(self, key: str, window: int) -> Tuple[int, int]:
+        with self._lock:
+            _expires, counts = self._counters.get(key, (0, {}))
+            return counts.get(window - 1, 0), counts.get(window, 0)
+
+    def reset(self, key: str, window: int):
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class SqliteRateLimitStore(BaseRateLimitStore):
+    """
+    Keep the counters in a local SQLite database in WAL mode
+
+    All worker processes on the same host share the database file. The file is configured with the setting
+    LOGIN_RATE_LIMIT_SQLITE_PATH.
+    """
+
+    expire_every = 1000
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.LOGIN_RATE_LIMIT_SQLITE_PATH
+        self._database = LocalSqlite(
+            self.path,
+            'CREATE TABLE IF NOT EXISTS rate_limit ('
+            'key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, expires REAL NOT NULL, '
+            'PRIMARY KEY (key, window)'
+            ') WITHOUT ROWID'
+        )
+        self._counter_lock = Lock()
+        self._increment_counter = 0
+
+    def _should_expire_all(self) -> bool:
+        """
+        Only sweep the whole table every now and then
+        """
+        with self._counter_lock:
+            self._increment_counter += 1
+            return self._increment_counter % self.expire_every == 0
+
+    def increment(self, key: str, window: int, ttl: int):
+        current_time = time.time()
+        connection = self._database.get_connection()
+        if self._should_expire_all():
+            connection.execute('DELETE FROM rate_limit WHERE expires <= ?', (current_time,))
+        # No upsert, it needs SQLite 3.24; both statements are atomic on their own, so no increment is lost
+        connection.execute(
+            'INSERT OR IGNORE INTO rate_limit (key, window, count, expires) VALUES (?, ?, 0, ?)',
+            (key, window, current_time + ttl)
+        )
+        connection.execute(
+            'UPDATE rate_limit SET count = count + 1, expires = ? WHERE key = ? AND window = ?',
+            (current_time + ttl, key, window)
+        )
+
+    def get_counts(self, key: str, window: int) -> Tuple[int, int]:
+        counts = dict(self._database.get_connection().execute(
+            'SELECT window, count FROM rate_limit WHERE key = ? AND window IN (?, ?)', (key, window - 1, window)
+        ).fetchall())
+        return counts.get(window - 1, 0), counts.get(window, 0)
+
+    def reset(self, key: str, window: int):
+        self._database.get_connection().execute('DELETE FROM rate_limit WHERE key = ?', (key,))
+
+
+class CacheRateLimitStore(BaseRateLimitStore):
+    """
+    Keep the counters in a Django cache
+
+    Suitable for many hosts if the cache is shared, e.g. memcached or redis. The cache is configured with the setting
+    LOGIN_RATE_LIMIT_CACHE.
+    """
+
+    def __init__(self, alias: Optional[str] = None):
+        self.cache = caches[alias or settings.LOGIN_RATE_LIMIT_CACHE]
+
+    @staticmethod
+    def _cache_key(key: str, window: int) -> str:
+        return 'hub-rate-limit:{}:{}'.format(key, window)
+
+    def increment(self, key: str, window: int, ttl: int):
+        cache_key = CacheRateLimitStore._cache_key(key, window)
+        if self.cache.add(cache_key, 1, ttl):
+            return
+        try:
+            self.cache.incr(cache_key)
+        except ValueError:  # Expired between add and incr
+            self.cache.set(cache_key, 1, ttl)
+
+    def get_counts(self, key: str, window: int) -> Tuple[int, int]:
+        previous_key = CacheRateLimitStore._cache_key(key, window - 1)
+        current_key = CacheRateLimitStore._cache_key(key, window)
+        counts = self.cache.get_many([previous_key, current_key])
+        return counts.get(previous_key, 0), counts.get(current_key, 0)
+
+    def reset(self, key: str, window: int):
+        self.cache.delete_many([
+            CacheRateLimitStore._cache_key(key, window - 1), CacheRateLimitStore._cache_key(key, window)
+        ])
+
+
+class RateLimiter:
+    """
+    Check and count failed logins for all configured scopes
+    """
+
+    def __init__(self, store: BaseRateLimitStore, limits: Dict[str, Tuple[int, int]]):
+        """
+        :param BaseRateLimitStore store: The store for the counters
+        :param Dict[str, Tuple[int, int]] limits: Scope to maximum failed logins and window in seconds
+        """
+        self.store = store
+        self.limits = limits
+
+    @staticmethod
+    def now() -> float:
+        """
+        The current time as timestamp
+        """
+        return time.time()
+
+    @staticmethod
+    def get_keys(request: Optional[HttpRequest], username: str) -> Dict[str, str]:
+        """
+        Get the counter keys of a login attempt; the values are hashed, so no username is stored in clear text
+
+        :param Optional[HttpRequest] request: The request, for the IP address
+        :param str username: The cleaned username
+        :rtype: Dict[str, str]
+        :returns: Scope to counter key
+        """
+        ip_address = get_client_ip(request) if request is not None else ''
+        values = {
+            'ip': ip_address,
+            'username': username,
+            'ip_username': '{}\x00{}'.format(ip_address, username),
+        }
+        return {
+            scope: '{}:{}'.format(scope, hashlib.sha256(value.encode('utf-8')).hexdigest())
+            for scope, value in values.items()
+        }
+
+    def _windows(self, current_time: float) -> List[Tuple[str, int, int, int, float]]:
+        """
+        The configured scopes with their limit, window length, current window and part of the previous window that
+        still overlaps with the sliding window
+        """
+        windows = []
+        for scope, (limit, length) in self.limits.items():
+            window, elapsed = divmod(current_time, length)
+            windows.append((scope, limit, length, int(window), 1 - elapsed / length))
+        return windows
+
+    def is_limited(self, keys: Dict[str, str]) -> bool:
+        """
+        Check if a login attempt must be rejected
+
+        :param Dict[str, str] keys: The counter keys of the attempt
+        :rtype: bool
+        :returns: True, if any scope reached its limit
+        """
+        for scope, limit, _length, window, overlap in self._windows(RateLimiter.now()):
+            previous, current = self.store.get_counts(keys[scope], window)
+            if previous * overlap + current >= limit:
+                return True
+        return False
+
+    def register_failure(self, keys: Dict[str, str]):
+        """
+        Count a failed login in all scopes
+
+        :param Dict[str, str] keys: The counter keys of the attempt
+        """
+        for scope, _limit, length, window, _overlap in self._windows(RateLimiter.now()):
+            self.store.increment(keys[scope], window, 2 * length)
+
+    def register_success(self, keys: Dict[str, str]):
+        """
+        A successful login clears the failures of the IP address and username pair
+
+        :param Dict[str, str] keys: The counter keys of the attempt
+        """
+        for scope, _limit, _length, window, _overlap in self._windows(RateLimiter.now()):
+            if scope == 'ip_username':
+                self.store.reset(keys[scope], window)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the configured rate limiter
+
+    :rtype: RateLimiter
+    :returns: The (process-wide) rate limiter
+    """
+    global _LIMITER  # pylint: disable=global-statement
+    limiter = _LIMITER
+    if limiter is None:
+        with _LIMITER_LOCK:
+            if _LIMITER is None:
+                limits = getattr(settings, 'LOGIN_RATE_LIMITS', {})
+                _LIMITER = RateLimiter(
+                    import_string(settings.LOGIN_RATE_LIMIT_STORE)(),
+                    {scope: tuple(limits[scope]) for scope in RATE_LIMIT_SCOPES if scope in limits}
+                )
+            limiter = _LIMITER
+    return limiter
+
+
+@receiver(setting_changed)
+def _reset_rate_limiter(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    Create a new rate limiter if the configuration changes
+    """
+    global _LIMITER  # pylint: disable=global-statement
+    if setting in ('LOGIN_RATE_LIMITS', 'LOGIN_RATE_LIMIT_STORE', 'LOGIN_RATE_LIMIT_SQLITE_PATH',
+                   'LOGIN_RATE_LIMIT_CACHE'):
+        with _LIMITER_LOCK:
+            _LIMITER = None
@@ -0,0 +1,192 @@
+"""
+Replay protection for one-time passwords
+
+Every OTP may only be used once. A replay backend remembers burned OTPs at least as long as they could be valid. The
+backend is configured with the setting OTP_REPLAY_BACKEND.
+"""
+import datetime
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction, IntegrityError
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from hub_app.authlib.local_sqlite import LocalSqlite
+from hub_app.models.users import BurnedOtp
+
+
+_BACKEND_LOCK = Lock()
+_BACKEND = None  # type: Optional[BaseReplayBackend]
+
+
+class BaseReplayBackend:
+    """
+    Interface for all replay backends
+    """
+
+    def __init__(self, ttl: int):
+        """
+        :param int ttl: Seconds a burned OTP is remembered
+        """
+        self.ttl = ttl
+
+    @staticmethod
+    def now() -> float:
+        """
+        The current time as timestamp
+        """
+        return time.time()
+
+    def burn(self, user_id: int, token: str) -> bool:
+        """
+        Burn an OTP
+
+        :param int user_id: The user the OTP belongs to
+        :param str token: The OTP
+        :rtype: bool
+        :returns: True, if the OTP has not been used before and is burned now, False if it is a replay
+        """
+        raise NotImplementedError()
+
+
+class DatabaseReplayBackend(BaseReplayBackend):
+    """
+    Keep burned OTPs in the BurnedOtp table
+
+    The OTP is burned with a single, savepoint-guarded INSERT. The unique constraint on user and token decides about
+    concurrent logins with the same OTP, so exactly one of them wins. An entry older than one hour is re-burned with a
+    conditional UPDATE. The table needs to be cleaned up with the "cleanburnedotp" command.
+    """
+
+    def burn(self, user_id: int, token: str) -> bool:
+        try:
+            with transaction.atomic():
+                BurnedOtp.objects.create(user_id=user_id, token=token)
+            return True
+        except IntegrityError:
+            current_time = now()
+            return BurnedOtp.objects.filter(
+                user_id=user_id, token=token, burned_timestamp__lt=current_time - datetime.timedelta(hours=1)
+            ).update(burned_timestamp=current_time) == 1
+
+
+class MemoryReplayBackend(BaseReplayBackend):
+    """
+    Keep burned OTPs in the memory of the current process
+
+    Only suitable if there is exactly one process handling logins.
+    """
+
+    def __init__(self, ttl: int):
+        super().__init__(ttl)
+        self._lock = Lock()
+        self._burned = OrderedDict()  # type: OrderedDict[Tuple[int, str], float]
+
+    def _expire(self, current_time: float):
+        """
+        Forget expired OTPs; as the TTL is fixed, the oldest entries are always first
+        """
+        while self._burned:
+            key, expires = next(iter(self._burned.items()))
+            if expires > current_time:
+                break
+            del self._burned[key]
+
+    def burn(self, user_id: int, token: str) -> bool:
+        current_time = self.now()
+        key = (user_id, token)
+        with self._lock:
+            self._expire(current_time)
+            if key in self._burned:
+                return False
+            self._burned[key] = current_time + self.ttl
+        return True
+
+
+class SqliteReplayBackend(BaseReplayBackend):
+    """
+    Keep burned OTPs in a local SQLite database in WAL mode
+
+    All worker processes on the same host share the database file, so a burned OTP can not be replayed against another
+    worker. The file is configured with the setting OTP_REPLAY_SQLITE_PATH.
+    """
+
+    expire_every = 1000
+
+    def __init__(self, ttl: int, path: Optional[str] = None):
+        super().__init__(ttl)
+        self.path = path or settings.OTP_REPLAY_SQLITE_PATH
+        self._database = LocalSqlite(
+            self.path,
+            'CREATE TABLE IF NOT EXISTS burned_otp ('
+            'user_id INTEGER NOT NULL, token TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (user_id, token)'
+            ') WITHOUT ROWID'
+        )
+        self._counter_lock = Lock()
+        self._burn_counter = 0
+
+    def _should_expire_all(self) -> bool:
+        """
+        Only sweep the whole table every now and then
+        """
+        with self._counter_lock:
+            self._burn_counter += 1
+            return self._burn_counter % self.expire_every == 0
+
+    def burn(self, user_id: int, token: str) -> bool:
+        current_time = self.now()
+        connection = self._database.get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if self._should_expire_all():
+                connection.execute('DELETE FROM burned_otp WHERE expires <= ?', (current_time,))
+            else:
+                connection.execute(
+                    'DELETE FROM burned_otp WHERE user_id = ? AND token = ? AND expires <= ?',
+                    (user_id, token, current_time)
+                )
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO burned_otp (user_id, token, expires) VALUES (?, ?, ?)',
+                (user_id, token, current_time + self.ttl)
+            )
+            burned = cursor.rowcount == 1
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        return burned
+
+
+def get_replay_backend() -> BaseReplayBackend:
+    """
+    Get the configured replay backend
+
+    :rtype: BaseReplayBackend
+    :returns: The (process-wide) backend instance
+    """
+    global _BACKEND  # pylint: disable=global-statement
+    backend = _BACKEND
+    if backend is None:
+        with _BACKEND_LOCK:
+            if _BACKEND is None:
+                _BACKEND = import_string(settings.OTP_REPLAY_BACKEND)(ttl=settings.OTP_REPLAY_TTL)
+            backend = _BACKEND
+    return backend
+
+
+@receiver(setting_changed)
+def _reset_replay_backend(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    Create a new backend if the configuration changes
+    """
+    global _BACKEND  # pylint: disable=global-statement
+    if setting in ('OTP_REPLAY_BACKEND', 'OTP_REPLAY_TTL', 'OTP_REPLAY_SQLITE_PATH'):
+        with _BACKEND_LOCK:
+            _BACKEND = None
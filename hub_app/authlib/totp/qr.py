@@ -1,13 +1,95 @@
 """
 Generate QR codes for the programming of TOTP devices and apps
+
+The Pillow and qrcode image factories are still available, but the hub renders its QR codes with the lightweight
+renderers: an SVG with one path and a PNG with one bit per pixel, both directly from the QR code matrix.
 """
-from typing import Union, Type
+import struct
+import zlib
+from io import BytesIO
+from threading import local
+from typing import BinaryIO, Iterator, List, Union, Type
 
 import qrcode
+import qrcode.util
 from qrcode.image.base import BaseImage
 from qrcode.image.pil import PilImage
 from qrcode.image.svg import SvgPathImage, SvgPathFillImage
 
+ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_Q
+BORDER = 4
+
+_BUFFERS = local()
+
+
+def get_otpauth_uri(user: str, data: bytes) -> bytes:
+    """
+    Get the otpauth URI for the QR code
+
+    :param str user: Username to embed in the QR code
+    :param bytes data: The (base32 encoded) secret to embed in the QR code
+    :rtype: bytes
+    :returns: The URI, UTF-8 encoded
+    """
+    return 'otpauth://totp/{:s}:{:s}?secret={:s}'.format(
+        'Passiopeia-Hub',
+        user,
+        data.decode('us-ascii')
+    ).encode('utf-8')
+
+
+def get_qr_code_version(payload_length: int) -> int:
+    """
+    Get the smallest QR code version (size) for a payload in byte mode
+
+    The payload is always put into one byte mode segment, so the version follows from its length and there is no
+    need to probe the versions with "fit=True".
+
+    :param int payload_length: The length of the payload in bytes
+    :rtype: int
+    :returns: The version, 1 to 40
+    """
+    bit_limits = qrcode.util.BIT_LIMIT_TABLE[ERROR_CORRECTION]
+    for version in range(1, 41):
+        needed_bits = 4 + qrcode.util.length_in_bits(qrcode.util.MODE_8BIT_BYTE, version) + 8 * payload_length
+        if needed_bits <= bit_limits[version]:
+            return version
+    raise ValueError('Payload of {} bytes is too large for a QR code'.format(payload_length))
+
+
+def get_qr_code_size(user: str, data: bytes) -> int:
+    """
+    Get the number of modules per side of the QR code, including the border, without creating it
+
+    :param str user: Username to embed in the QR code
+    :param bytes data: The secret to embed in the QR code
+    :rtype: int
+    :returns: The number of modules
+    """
+    return get_qr_code_version(len(get_otpauth_uri(user, data))) * 4 + 17 + 2 * BORDER
+
+
+def create_qr_code(user: str, data: bytes, block_size: int = 32) -> qrcode.QRCode:
+    """
+    Create the QR code (the matrix) with the Secret
+
+    :param str user: Username to embed in the QR code
+    :param bytes data: The secret to embed in the QR code
+    :param int block_size: How large should one block be?
+    :rtype: qrcode.QRCode
+    :returns: The QR Code
+    """
+    otp_data = get_otpauth_uri(user, data)
+    qr_code = qrcode.QRCode(
+        version=get_qr_code_version(len(otp_data)),
+        error_correction=ERROR_CORRECTION,
+        box_size=block_size,
+        border=BORDER,
+    )
+    qr_code.add_data(qrcode.util.QRData(otp_data, mode=qrcode.util.MODE_8BIT_BYTE))
+    qr_code.make(fit=False)
+    return qr_code
+
 
 def create_qr_code_image(
         user: str, data: bytes,
@@ -24,21 +106,152 @@ def create_qr_code_image(
     :rtype: Union[BaseImage, SvgPathImage, SvgPathFillImage, PilImage]
     :returns: The QR Code
     """
-    otp_data = 'otpauth://totp/{:s}:{:s}?secret={:s}'.format(
-        'Passiopeia-Hub',
-        user,
-        data.decode('us-ascii')
-    )
-    qr_code = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_Q,
-        box_size=block_size,
-        border=4,
-    )
-    qr_code.add_data(otp_data)
-    qr_code.make(fit=True)
-    img = qr_code.make_image(image_factory=image_factory)
-    return img
+    return create_qr_code(user, data, block_size).make_image(image_factory=image_factory)
+
+
+def iter_svg_path_data(matrix: List[List[bool]]) -> Iterator[str]:
+    """
+    Get the path data of a QR code matrix, in module units
+
+    Every run of dark modules in a row becomes one rectangle of the path.
+
+    :param List[List[bool]] matrix: The modules, including the border
+    :rtype: Iterator[str]
+    :returns: The rectangles of the path
+    """
+    size = len(matrix)
+    for row_index, row in enumerate(matrix):
+        column = 0
+        while column < size:
+            if not row[column]:
+                column += 1
+                continue
+            start = column
+            while column < size and row[column]:
+                column += 1
+            yield 'M{} {}h{}v1h-{}z'.format(start, row_index, column - start, column - start)
+
+
+def write_svg_path(matrix: List[List[bool]], block_size: int, out: BinaryIO):
+    """
+    Write a QR code matrix as SVG with a single path and a transparent background
+
+    The path is in module units; the viewBox scales it.
+
+    :param List[List[bool]] matrix: The modules, including the border
+    :param int block_size: How large should one block be?
+    :param BinaryIO out: Where to write the SVG document to
+    """
+    size = len(matrix)
+    out.write((
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{0}" viewBox="0 0 {1} {1}" '
+        'shape-rendering="crispEdges"><path d="'
+    ).format(size * block_size, size).encode('us-ascii'))
+    for rectangle in iter_svg_path_data(matrix):
+        out.write(rectangle.encode('us-ascii'))
+    out.write(b'"/></svg>\n')
+
+
+def _write_png_chunk(out: BinaryIO, chunk_type: bytes, chunk_data: bytes):
+    out.write(struct.pack('>I', len(chunk_data)))
+    out.write(chunk_type)
+    out.write(chunk_data)
+    out.write(struct.pack('>I', zlib.crc32(chunk_data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+
+def write_png(matrix: List[List[bool]], block_size: int, out: BinaryIO):
+    """
+    Write a QR code matrix as black and white PNG with one bit per pixel
+
+    The scanlines are compressed one module row at a time, so the uncompressed image is never held in memory.
+
+    :param List[List[bool]] matrix: The modules, including the border
+    :param int block_size: How large should one block be?
+    :param BinaryIO out: Where to write the PNG image to
+    """
+    width = len(matrix) * block_size
+    compressor = zlib.compressobj()
+    compressed = []
+    for row in matrix:
+        bits = ''.join(('0' if module else '1') * block_size for module in row)
+        bits += '0' * (-width % 8)
+        scanline = b'\0' + int(bits, 2).to_bytes(len(bits) // 8, 'big')  # Filter type "None"
+        compressed.append(compressor.compress(scanline * block_size))
+    compressed.append(compressor.flush())
+    out.write(b'\x89PNG\r\n\x1a\n')
+    _write_png_chunk(out, b'IHDR', struct.pack('>IIBBBBB', width, width, 1, 0, 0, 0, 0))  # 1 bit grayscale
+    _write_png_chunk(out, b'IDAT', b''.join(compressed))
+    _write_png_chunk(out, b'IEND', b'')
+
+
+def _get_buffer() -> BytesIO:
+    """
+    Get the empty render buffer of the current thread
+
+    The buffer is reused for every QR code rendered by the thread, so it only grows to the largest image once.
+    """
+    buffer = getattr(_BUFFERS, 'buffer', None)
+    if buffer is None:
+        buffer = BytesIO()
+        _BUFFERS.buffer = buffer
+    buffer.seek(0)
+    buffer.truncate()
+    return buffer
+
+
+def render_svg_path(matrix: List[List[bool]], block_size: int) -> bytes:
+    """
+    Render a QR code matrix as SVG with a single path and a transparent background
+
+    :param List[List[bool]] matrix: The modules, including the border
+    :param int block_size: How large should one block be?
+    :rtype: bytes
+    :returns: The SVG document
+    """
+    buffer = _get_buffer()
+    write_svg_path(matrix, block_size, buffer)
+    return buffer.getvalue()
+
+
+def render_png(matrix: List[List[bool]], block_size: int) -> bytes:
+    """
+    Render a QR code matrix as black and white PNG with one bit per pixel
+
+    :param List[List[bool]] matrix: The modules, including the border
+    :param int block_size: How large should one block be?
+    :rtype: bytes
+    :returns: The PNG image
+    """
+    buffer = _get_buffer()
+    write_png(matrix, block_size, buffer)
+    return buffer.getvalue()
+
+
+def create_fast_svg_qr_code(user: str, data: bytes, block_size: int = 32) -> bytes:
+    """
+    Create a transparent SVG QR code without Pillow
+
+    :param str user: Username to embed in the QR code
+    :param bytes data: The secret to embed in the QR code
+    :param int block_size: How large should one block be?
+    :rtype: bytes
+    :returns: The SVG document
+    """
+    return render_svg_path(create_qr_code(user, data, block_size).get_matrix(), block_size)
+
+
+def create_fast_png_qr_code(user: str, data: bytes, block_size: int = 32) -> bytes:
+    """
+    Create a black and white PNG QR code without Pillow
+
+    :param str user: Username to embed in the QR code
+    :param bytes data: The secret to embed in the QR code
+    :param int block_size: How large should one block be?
+    :rtype: bytes
+    :returns: The PNG image
+    """
+    return render_png(create_qr_code(user, data, block_size).get_matrix(), block_size)
 
 
 def create_transparent_svg_qr_code(user: str, data: bytes, block_size: int = 32) -> SvgPathImage:
@@ -0,0 +1,208 @@
+"""
+Cache for rendered QR codes
+
+Rendering a QR code costs much more than sending it, and the same QR code is shown again and again while a user
+programs the device. The rendered images are therefore kept in a process-wide LRU cache of at most QR_CODE_CACHE_SIZE
+entries. The entries are keyed by an HMAC of username, secret, format and block size, so neither the secret nor
+anything derived from it without the SECRET_KEY is kept as a key. The key also serves as ETag.
+
+Setting a new TOTP secret drops the QR codes of the user.
+"""
+from binascii import b2a_base64
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.crypto import salted_hmac
+
+from hub_app.authlib.totp.qr import create_fast_png_qr_code, create_fast_svg_qr_code
+
+RENDERERS = {
+    'png': create_fast_png_qr_code,
+    'svg': create_fast_svg_qr_code,
+}
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def get_qr_code_key(username: str, secret: bytes, file_type: str, block_size: int) -> str:
+    """
+    Get the cache key of a QR code
+
+    :param str username: The username in the QR code
+    :param bytes secret: The (base32 encoded) secret in the QR code
+    :param str file_type: The format, "png" or "svg"
+    :param int block_size: The size of one block
+    :rtype: str
+    :returns: The HMAC of all parameters, as hex string
+    """
+    value = b'\0'.join((
+        username.encode('utf-8'), secret, file_type.encode('us-ascii'), str(block_size).encode('us-ascii')
+    ))
+    return salted_hmac('hub_app.authlib.totp.qr_cache', value).hexdigest()
+
+
+class QrCodeCache:
+    """
+    Bounded LRU cache of rendered QR codes
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        :param int max_entries: The maximum number of cached QR codes
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # type: OrderedDict[str, Tuple[str, bytes]]
+        self._keys_by_user = {}  # type: Dict[str, Set[str]]
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached QR code
+
+        :param str key: The key from get_qr_code_key()
+        :rtype: Optional[bytes]
+        :returns: The rendered QR code, None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, username: str, data: bytes):
+        """
+        Cache a QR code, the least recently used ones are dropped if the cache is full
+
+        :param str key: The key from get_qr_code_key()
+        :param str username: The username in the QR code
+        :param bytes data: The rendered QR code
+        """
+        if self.max_entries < 1:
+            return
+        with self._lock:
+            self._entries[key] = (username, data)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(username, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (old_username, _) = self._entries.popitem(last=False)
+                self._forget_key(old_username, old_key)
+
+    def _forget_key(self, username: str, key: str):
+        keys = self._keys_by_user.get(username, None)
+        if keys is not None:
+            keys.discard(key)
+            if len(keys) < 1:
+                del self._keys_by_user[username]
+
+    def invalidate(self, username: str):
+        """
+        Drop all QR codes of a user
+
+        :param str username: The username
+        """
+        with self._lock:
+            for key in self._keys_by_user.pop(username, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drop all QR codes
+        """
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_QR_CODE_CACHE = None  # type: Optional[QrCodeCache]
+_QR_CODE_CACHE_LOCK = Lock()
+
+
+def get_qr_code_cache() -> QrCodeCache:
+    """
+    Get the process-wide QR code cache
+
+    :rtype: QrCodeCache
+    :returns: The cache, configured with the setting QR_CODE_CACHE_SIZE
+    """
+    global _QR_CODE_CACHE  # pylint: disable=global-statement
+    if _QR_CODE_CACHE is None:
+        with _QR_CODE_CACHE_LOCK:
+            if _QR_CODE_CACHE is None:
+                _QR_CODE_CACHE = QrCodeCache(getattr(settings, 'QR_CODE_CACHE_SIZE', 256))
+    return _QR_CODE_CACHE
+
+
+@receiver(setting_changed)
+def _reset_qr_code_cache(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cache if its size or the key of the HMAC changes
+    """
+    global _QR_CODE_CACHE  # pylint: disable=global-statement
+    if setting in ('QR_CODE_CACHE_SIZE', 'SECRET_KEY'):
+        with _QR_CODE_CACHE_LOCK:
+            _QR_CODE_CACHE = None
+
+
+def render_qr_code(username: str, secret: bytes, file_type: str, block_size: int) -> Tuple[str, bytes]:
+    """
+    Get a rendered QR code, from the cache if possible
+
+    :param str username: The username in the QR code
+    :param bytes secret: The (base32 encoded) secret in the QR code
+    :param str file_type: The format, "png" or "svg"
+    :param int block_size: The size of one block
+    :rtype: Tuple[str, bytes]
+    :returns: The cache key (usable as ETag) and the rendered QR code
+    """
+    key = get_qr_code_key(username, secret, file_type, block_size)
+    cache = get_qr_code_cache()
+    data = cache.get(key)
+    if data is None:
+        data = RENDERERS[file_type](username, secret, block_size=block_size)
+        cache.put(key, username, data)
+    return key, data
+
+
+def invalidate_qr_codes(username: str):
+    """
+    Drop the cached QR codes of a user
+
+    :param str username: The username
+    """
+    get_qr_code_cache().invalidate(username)
+
+
+def render_qr_code_data_uri(username: str, secret: bytes, file_type: str, block_size: int) -> str:
+    """
+    Get a QR code as data URI, from the cache if possible
+
+    The data URI is cached as well, so a cached QR code is neither rendered nor encoded again.
+
+    :param str username: The username in the QR code
+    :param bytes secret: The (base32 encoded) secret in the QR code
+    :param str file_type: The format, "png" or "svg"
+    :param int block_size: The size of one block
+    :rtype: str
+    :returns: The data URI
+    """
+    key = get_qr_code_key(username, secret, '{}-uri'.format(file_type), block_size)
+    cache = get_qr_code_cache()
+    data_uri = cache.get(key)
+    if data_uri is None:
+        _, data = render_qr_code(username, secret, file_type, block_size)
+        data_uri = b'data:' + CONTENT_TYPES[file_type].encode('us-ascii') + b';base64,' + b2a_base64(
+            data, newline=False
+        )
+        cache.put(key, username, data_uri)
+    return data_uri.decode('us-ascii')
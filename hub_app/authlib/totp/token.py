@@ -2,15 +2,64 @@
 Creation and handling of OTPs and their secrets
 """
 import hmac
+import re
 import struct
 import hashlib
 import time
 from random import SystemRandom
-from typing import List
+from typing import List, Optional
 
 from hub_app.authlib.crypt import SymmetricCrypt
 
 
+_COUNTER_STRUCT = struct.Struct('>Q')
+_TOKEN_STRUCT = struct.Struct('>I')
+_TOKEN_PATTERN = re.compile(r'[0-9]{6}')
+
+
+def _get_hmac_prototype(secret: bytes) -> hmac.HMAC:
+    """
+    Get a keyed HMAC object that can be copied for every counter
+
+    :param bytes secret: The secret to generate the OTP
+    :rtype: hmac.HMAC
+    :returns: The keyed, but not yet updated HMAC object
+    """
+    base_secret = secret
+    if isinstance(base_secret, memoryview):  # pragma: no coverage
+        base_secret = base_secret.tobytes()
+    return hmac.new(base_secret, digestmod=hashlib.sha1)
+
+
+def _get_token_value(prototype: hmac.HMAC, counter: int) -> int:
+    """
+    Calculate the OTP for a counter as integer
+
+    :param hmac.HMAC prototype: The keyed HMAC object, will not be changed
+    :param int counter: The counter (number of 30 seconds steps)
+    :rtype: int
+    :returns: The OTP as integer
+    """
+    mac = prototype.copy()
+    mac.update(_COUNTER_STRUCT.pack(counter))
+    digest = mac.digest()
+    ordinal = digest[-1] & 0x0f
+    return (_TOKEN_STRUCT.unpack_from(digest, ordinal)[0] & 0x7fffffff) % 1000000
+
+
+def _get_counter(timestamp: Optional[float] = None) -> int:
+    """
+    Get the current counter (number of 30 seconds steps)
+
+    :param Optional[float] timestamp: The timestamp, defaults to the current time
+    :rtype: int
+    :returns: The counter
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    return int(timestamp) // 30
+
+
 def get_otp(secret: bytes, offset: int = 0) -> str:
     """
     Get an OTP by the secret
@@ -20,14 +69,7 @@ def get_otp(secret: bytes, offset: int = 0) -> str:
     :rtype: str
     :returns: The OTP
     """
-    base_secret = secret
-    if isinstance(base_secret, memoryview):  # pragma: no coverage
-        base_secret = base_secret.tobytes()
-    time_struct = struct.pack('>Q', int(time.time() + (offset * 30)) // 30)
-    digest = hmac.new(base_secret, time_struct, hashlib.sha1).digest()
-    ordinal = digest[-1] & 0x0f
-    token = (struct.unpack('>I', digest[ordinal:ordinal + 4])[0] & 0x7fffffff) % 1000000
-    return '{:06d}'.format(token)
+    return '{:06d}'.format(_get_token_value(_get_hmac_prototype(secret), _get_counter(time.time() + (offset * 30))))
 
 
 def get_possible_otps(secret: bytes, start_offset: int = -1, end_offset: int = 1) -> List[str]:
@@ -40,12 +82,55 @@ def get_possible_otps(secret: bytes, start_offset: int = -1, end_offset: int = 1
     :rtype: List[str]
     :returns: A list of valid OTPs within the given offsets
     """
-    possible_tokens = []
-    current_offset = start_offset
-    while current_offset <= end_offset:
-        possible_tokens.append(get_otp(secret, current_offset))
-        current_offset += 1
-    return possible_tokens
+    prototype = _get_hmac_prototype(secret)
+    counter = _get_counter()
+    return [
+        '{:06d}'.format(_get_token_value(prototype, counter + offset))
+        for offset in range(start_offset, end_offset + 1)
+    ]
+
+
+def find_otp_offset(secret: bytes, token: str, start_offset: int = -1, end_offset: int = 1,
+                    timestamp: Optional[float] = None) -> Optional[int]:
+    """
+    Find the time offset an OTP is valid for
+
+    The clock is read only once and the keyed HMAC is only set up once for the whole window. Every offset of the
+    window is checked with a constant time comparison, even if a match has already been found.
+
+    :param bytes secret: The secret to generate the otp
+    :param str token: The OTP to check
+    :param int start_offset: The time offset (in 30 seconds steps) where to start
+    :param int end_offset: The time offset (in 30 seconds steps) where to end
+    :param Optional[float] timestamp: The timestamp to check against, defaults to the current time
+    :rtype: Optional[int]
+    :returns: The matching offset or None, if the OTP is not valid within the given offsets
+    """
+    if not isinstance(token, str) or _TOKEN_PATTERN.fullmatch(token) is None:
+        return None
+    expected = _TOKEN_STRUCT.pack(int(token))
+    prototype = _get_hmac_prototype(secret)
+    counter = _get_counter(timestamp)
+    matched_offset = None
+    for offset in range(start_offset, end_offset + 1):
+        candidate = _TOKEN_STRUCT.pack(_get_token_value(prototype, counter + offset))
+        if hmac.compare_digest(candidate, expected) and matched_offset is None:
+            matched_offset = offset
+    return matched_offset
+
+
+def verify_otp(secret: bytes, token: str, start_offset: int = -1, end_offset: int = 1) -> bool:
+    """
+    Check if an OTP is valid within the given offsets
+
+    :param bytes secret: The secret to generate the otp
+    :param str token: The OTP to check
+    :param int start_offset: The time offset (in 30 seconds steps) where to start
+    :param int end_offset: The time offset (in 30 seconds steps) where to end
+    :rtype: bool
+    :returns: True, if the OTP is valid
+    """
+    return find_otp_offset(secret, token, start_offset, end_offset) is not None
 
 
 def create_random_totp_secret(secret_length: int = 72) -> bytes:
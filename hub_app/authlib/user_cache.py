@@ -0,0 +1,145 @@
+"""
+Cache for the user of a session
+
+Resolving request.user costs a query on every request. The user is therefore kept as a small snapshot in the Django
+cache configured with the setting USER_CACHE, for USER_CACHE_TIMEOUT seconds. A snapshot is only used if the session
+auth hash of the session matches the one of the snapshot, so a changed password still ends all other sessions.
+Snapshots are dropped whenever a HubUser is saved or deleted, and a snapshot is only used if the backend of the session
+still lets the user authenticate (like ModelBackend.get_user(), e.g. is_active). QuerySet.update() and bulk_update()
+send no signals, so their changes show after USER_CACHE_TIMEOUT seconds at the latest.
+
+A local-memory cache only notices the changes made by its own process; with more than one process, use a shared cache.
+"""
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches, BaseCache
+from django.db import router
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.utils.crypto import constant_time_compare
+
+from hub_app.models.users import HubUser
+
+
+def get_user_cache() -> Optional[BaseCache]:
+    """
+    Get the configured cache
+
+    :rtype: Optional[BaseCache]
+    :returns: The cache, None if the caching is disabled
+    """
+    alias = getattr(settings, 'USER_CACHE', None)
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def get_user_cache_key(user_id) -> str:
+    """
+    Get the cache key of a user
+
+    :param user_id: The primary key of the user
+    :rtype: str
+    :returns: The cache key
+    """
+    return 'hub-user:{}'.format(user_id)
+
+
+class UserSnapshot:
+    """
+    The columns of a user needed for a request, without the TOTP secret
+    """
+
+    __slots__ = ('field_names', 'values', 'session_auth_hash')
+
+    def __init__(self, field_names: Tuple[str, ...], values: tuple, session_auth_hash: str):
+        self.field_names = field_names
+        self.values = values
+        self.session_auth_hash = session_auth_hash
+
+    @staticmethod
+    def from_user(user: HubUser) -> 'UserSnapshot':
+        """
+        Take a snapshot of the loaded columns of a user
+
+        :param HubUser user: The user
+        :rtype: UserSnapshot
+        :returns: The snapshot
+        """
+        loaded = user.__dict__
+        field_names = tuple(
+            field.attname for field in HubUser._meta.concrete_fields  # pylint: disable=protected-access
+            if field.attname in loaded and field.attname != 'totp_secret'
+        )
+        return UserSnapshot(
+            field_names, tuple(loaded[field_name] for field_name in field_names), user.get_session_auth_hash()
+        )
+
+    def to_user(self) -> HubUser:
+        """
+        Create the user again, all other columns are loaded on access
+
+        :rtype: HubUser
+        :returns: The user
+        """
+        return HubUser.from_db(router.db_for_read(HubUser), self.field_names, self.values)
+
+
+def load_user(request: HttpRequest):
+    """
+    Get the user of the session, from the cache if possible
+
+    :param HttpRequest request: The request with the session
+    :rtype: Union[HubUser, AnonymousUser]
+    :returns: The user
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return auth.get_user(request)
+    try:
+        user_id = HubUser._meta.pk.to_python(request.session[auth.SESSION_KEY])  # pylint: disable=protected-access
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if backend_path in settings.AUTHENTICATION_BACKENDS and session_hash:
+        snapshot = cache.get(get_user_cache_key(user_id))
+        if snapshot is not None and constant_time_compare(session_hash, snapshot.session_auth_hash):
+            user = snapshot.to_user()
+            user.backend = backend_path
+            user_can_authenticate = getattr(auth.load_backend(backend_path), 'user_can_authenticate', None)
+            if user_can_authenticate is None or user_can_authenticate(user):
+                return user
+            cache.delete(get_user_cache_key(user_id))
+    user = auth.get_user(request)
+    if isinstance(user, HubUser):
+        cache.set(get_user_cache_key(user.pk), UserSnapshot.from_user(user), settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def get_cached_user(request: HttpRequest):
+    """
+    Get the user of the session once per request
+
+    :param HttpRequest request: The request with the session
+    :rtype: Union[HubUser, AnonymousUser]
+    :returns: The user
+    """
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = load_user(request)  # pylint: disable=protected-access
+    return request._cached_user  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=HubUser)
+@receiver(post_delete, sender=HubUser)
+def _invalidate_user_cache(instance: HubUser, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the snapshot of a changed user
+    """
+    cache = get_user_cache()
+    if cache is not None:
+        cache.delete(get_user_cache_key(instance.pk))
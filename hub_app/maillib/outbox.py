@@ -0,0 +1,152 @@
+"""
+Outbox for E-Mails
+
+Sending an E-Mail within a request makes the request (and its database transaction) as slow as the mail server. The
+views therefore only queue their E-Mails as OutboxMail in the transaction of the request, so an E-Mail exists if,
+and only if, the transaction is committed. The "sendoutbox" command delivers the queued E-Mails in batches, each batch
+over one connection of the configured E-Mail backend.
+
+An E-Mail that could not be delivered is tried again after EMAIL_OUTBOX_RETRY_DELAY seconds, the delay doubles with
+every attempt up to EMAIL_OUTBOX_MAX_RETRY_DELAY. After EMAIL_OUTBOX_MAX_ATTEMPTS attempts, the E-Mail is kept
+without a next attempt for the admins to look at.
+"""
+from datetime import timedelta
+from typing import Tuple, List
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, router, transaction
+from django.utils.timezone import now
+
+from hub_app.models import OutboxMail
+
+
+def queue_mail(to: List[str], from_email: str, subject: str, body: str) -> OutboxMail:  # pylint: disable=invalid-name
+    """
+    Queue an E-Mail for delivery, in the current transaction
+
+    :param List[str] to: The E-Mail addresses of the recipients
+    :param str from_email: The sender
+    :param str subject: The subject
+    :param str body: The body text
+    :rtype: OutboxMail
+    :returns: The queued E-Mail
+    """
+    return OutboxMail.objects.create(
+        recipients='\n'.join(to),
+        from_email=from_email,
+        subject=str(subject),
+        body=body
+    )
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """
+    Get the delay before the next attempt
+
+    :param int attempts: The number of failed attempts so far
+    :rtype: timedelta
+    :returns: The delay
+    """
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (max(attempts, 1) - 1)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size: int) -> List[OutboxMail]:
+    """
+    Claim the E-Mails that are due
+
+    The claimed E-Mails get a lease of EMAIL_OUTBOX_LEASE seconds, so other workers skip them. If the worker dies,
+    they are delivered after the lease.
+
+    :param int batch_size: Maximum number of E-Mails to claim
+    :rtype: List[OutboxMail]
+    :returns: The claimed E-Mails
+    """
+    current_time = now()
+    database = router.db_for_write(OutboxMail)
+    # Without SKIP LOCKED (e.g. SQLite, which locks the whole database anyway), concurrent workers wait for each other
+    skip_locked = connections[database].features.has_select_for_update_skip_locked
+    with transaction.atomic(using=database):
+        keys = list(
+            OutboxMail.objects.select_for_update(skip_locked=skip_locked).filter(
+                next_attempt__lte=current_time
+            ).order_by('next_attempt').values_list('uuid', flat=True)[:batch_size]
+        )
+        if len(keys) < 1:
+            return []
+        OutboxMail.objects.filter(uuid__in=keys).update(
+            next_attempt=current_time + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+        )
+    return list(OutboxMail.objects.filter(uuid__in=keys).order_by('created'))
+
+
+def _register_failure(mail: OutboxMail, error: Exception):
+    mail.attempts += 1
+    mail.last_error = '{}: {}'.format(type(error).__name__, str(error))
+    if mail.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        # Given up: the row stays for the admins, but the body may contain links with tokens
+        mail.next_attempt = None
+        mail.body = ''
+    else:
+        mail.next_attempt = now() + get_retry_delay(mail.attempts)
+    mail.save(update_fields=('attempts', 'last_error', 'next_attempt', 'body'))
+
+
+def deliver_batch(batch_size: int) -> Tuple[int, int]:
+    """
+    Deliver one batch of due E-Mails over one connection
+
+    :param int batch_size: Maximum number of E-Mails to deliver
+    :rtype: Tuple[int, int]
+    :returns: The number of sent and the number of failed E-Mails
+    """
+    mails = claim_batch(batch_size)
+    if len(mails) < 1:
+        return 0, 0
+    sent = []
+    failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except (OSError, ValueError) as error:
+        for mail in mails:
+            _register_failure(mail, error)
+        return 0, len(mails)
+    try:
+        for mail in mails:
+            try:
+                connection.send_messages([EmailMessage(
+                    subject=mail.subject,
+                    body=mail.body,
+                    from_email=mail.from_email,
+                    to=mail.get_recipients(),
+                    connection=connection
+                )])
+            except (OSError, ValueError) as error:
+                _register_failure(mail, error)
+                failed += 1
+            else:
+                sent.append(mail.uuid)
+    finally:
+        connection.close()
+        OutboxMail.objects.filter(uuid__in=sent).delete()
+    return len(sent), failed
+
+
+def deliver_outbox(batch_size: int = 50) -> Tuple[int, int]:
+    """
+    Deliver all due E-Mails, batch by batch
+
+    :param int batch_size: Maximum number of E-Mails per batch (and connection)
+    :rtype: Tuple[int, int]
+    :returns: The number of sent and the number of failed E-Mails
+    """
+    sent_total = 0
+    failed_total = 0
+    while True:
+        sent, failed = deliver_batch(batch_size)
+        sent_total += sent
+        failed_total += failed
+        if sent + failed < batch_size:
+            return sent_total, failed_total
@@ -0,0 +1,265 @@
+"""
+SMTP E-Mail backend with a pool of connections
+
+The SMTP backend of Django opens a new connection, including the TLS handshake and the login, for every call of
+send_messages() that was not preceded by open(). The PooledEmailBackend takes its connections from a process-wide pool
+instead and gives them back on close(), so the connections are reused across requests and outbox batches.
+
+The pool holds at most EMAIL_POOL_SIZE connections per mail server; if all are in use, a backend waits up to
+EMAIL_POOL_TIMEOUT seconds for one to be given back. Connections that were idle for more than EMAIL_POOL_CHECK_AFTER
+seconds are checked with a NOOP before they are used again, connections idle for more than EMAIL_POOL_MAX_IDLE seconds
+are closed. Connections that failed while sending are not given back to the pool.
+"""
+import atexit
+import smtplib
+import time
+from collections import deque
+from threading import Lock, BoundedSemaphore
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+def _is_healthy(connection: smtplib.SMTP) -> bool:
+    try:
+        return connection.noop()[0] == 250
+    except OSError:
+        return False
+
+
+def _quit(connection: smtplib.SMTP):
+    try:
+        connection.quit()
+    except OSError:
+        connection.close()
+
+
+class SmtpConnectionPool:
+    """
+    A bounded pool of open (and, if configured, authenticated) SMTP connections to one mail server
+    """
+
+    def __init__(self, factory: Callable[[], smtplib.SMTP], size: int, timeout: float, check_after: float,
+                 max_idle: float):
+        self.factory = factory
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self._slots = BoundedSemaphore(size)
+        self._idle = deque()
+        self._lock = Lock()
+
+    @property
+    def idle_count(self) -> int:
+        """
+        Get the number of idle connections
+
+        :rtype: int
+        :returns: The number of connections waiting for reuse
+        """
+        return len(self._idle)
+
+    def _take_idle(self) -> Optional[smtplib.SMTP]:
+        while True:
+            with self._lock:
+                if len(self._idle) < 1:
+                    return None
+                connection, released = self._idle.pop()
+            idle_time = time.monotonic() - released
+            if idle_time > self.max_idle or (idle_time > self.check_after and not _is_healthy(connection)):
+                _quit(connection)
+                continue
+            return connection
+
+    def acquire(self) -> smtplib.SMTP:
+        """
+        Get a connection, an idle one if possible, otherwise a new one
+
+        :rtype: smtplib.SMTP
+        :returns: The connection
+        :raises smtplib.SMTPException: If no connection becomes available within the timeout
+        """
+        if not self._slots.acquire(timeout=self.timeout):  # pylint: disable=consider-using-with
+            raise smtplib.SMTPException('No SMTP connection available within {} seconds'.format(self.timeout))
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = self.factory()
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: smtplib.SMTP, broken: bool = False):
+        """
+        Give a connection back
+
+        :param smtplib.SMTP connection: The connection taken with acquire()
+        :param bool broken: True, if the connection must not be reused
+        """
+        try:
+            if broken:
+                _quit(connection)
+                return
+            expired = []
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+                while len(self._idle) > 0 and time.monotonic() - self._idle[0][1] > self.max_idle:
+                    expired.append(self._idle.popleft()[0])
+            for expired_connection in expired:
+                _quit(expired_connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Close all idle connections
+        """
+        with self._lock:
+            connections = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in connections:
+            _quit(connection)
+
+
+_POOLS = {}  # type: Dict[tuple, SmtpConnectionPool]
+_POOLS_LOCK = Lock()
+
+
+def _create_connection(**params) -> smtplib.SMTP:
+    backend = EmailBackend(fail_silently=False, **params)
+    backend.open()
+    return backend.connection
+
+
+def get_smtp_pool(backend: EmailBackend) -> SmtpConnectionPool:
+    """
+    Get the pool for the mail server and the credentials of a backend
+
+    :param EmailBackend backend: The backend
+    :rtype: SmtpConnectionPool
+    :returns: The pool
+    """
+    params = {
+        'host': backend.host,
+        'port': backend.port,
+        'username': backend.username,
+        'password': backend.password,
+        'use_tls': backend.use_tls,
+        'use_ssl': backend.use_ssl,
+        'timeout': backend.timeout,
+        'ssl_keyfile': backend.ssl_keyfile,
+        'ssl_certfile': backend.ssl_certfile,
+    }
+    key = tuple(sorted(params.items()))
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = SmtpConnectionPool(
+                    lambda: _create_connection(**params),
+                    settings.EMAIL_POOL_SIZE, settings.EMAIL_POOL_TIMEOUT,
+                    settings.EMAIL_POOL_CHECK_AFTER, settings.EMAIL_POOL_MAX_IDLE
+                )
+                _POOLS[key] = pool
+    return pool
+
+
+@atexit.register
+def close_smtp_pools():
+    """
+    Close the idle connections of all pools and forget the pools
+    """
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
+@receiver(setting_changed)
+def _reset_smtp_pools(setting: str, **kwargs):  # pylint: disable=unused-argument
+    if setting.startswith('EMAIL_'):
+        close_smtp_pools()
+
+
+class PooledEmailBackend(EmailBackend):
+    """
+    SMTP backend using the connections of the pool
+    """
+
+    _broken = False
+
+    def open(self) -> Optional[bool]:
+        """
+        Take a connection from the pool, replacing a connection that failed
+
+        :rtype: Optional[bool]
+        :returns: True, if a connection was taken, False if it was already open, None if an error passed silently
+        """
+        if self.connection:
+            if not self._broken:
+                return False
+            self.close()
+            opened = self.open()
+            return None if opened is None else False
+        try:
+            self.connection = get_smtp_pool(self).acquire()
+            return True
+        except OSError:
+            if not self.fail_silently:
+                raise
+        return None
+
+    def close(self):
+        """
+        Give the connection back to the pool
+        """
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        broken, self._broken = self._broken, False
+        get_smtp_pool(self).release(connection, broken)
+
+    def send_messages(self, email_messages) -> int:
+        """
+        Send the messages over one connection
+
+        :param email_messages: The messages
+        :rtype: int
+        :returns: The number of sent messages
+        """
+        if not email_messages:
+            return 0
+        with self._lock:
+            new_conn_created = self.open()
+            if not self.connection or new_conn_created is None:
+                return 0
+            try:
+                return len([message for message in email_messages if self._send(message)])
+            finally:
+                if new_conn_created:
+                    self.close()
+
+    def _reset_connection(self):
+        try:
+            self.connection.rset()
+        except OSError:
+            self._broken = True
+
+    def _send(self, email_message) -> bool:
+        try:
+            sent = super()._send(email_message)
+        except smtplib.SMTPException:
+            self._reset_connection()
+            raise
+        except OSError:
+            self._broken = True
+            raise
+        if not sent and email_message.recipients():
+            self._reset_connection()
+        return sent
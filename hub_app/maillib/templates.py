@@ -0,0 +1,149 @@
+"""
+Registry of the E-Mail body templates
+
+The E-Mail bodies are loaded and compiled once per language when the app is ready, so rendering an E-Mail neither
+searches the template directories nor reads a file, even without the cached template loader. A language-specific
+version of a template can be provided next to it, e.g. "reg-email.de.txt" next to "reg-email.txt".
+
+The templates are rendered with a plain context, without context processors, and the registry counts the renders and
+the time spent on them.
+"""
+import os
+import time
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import Context
+from django.template.loader import select_template
+from django.utils.translation import get_language
+
+MAIL_TEMPLATES = {
+    'registration': 'hub_app/registration/reg-email.txt',
+    'recovery': 'hub_app/auth/forgot-credentials/recovery-email.txt',
+    'email-change': 'hub_app/my-account/change-email.txt',
+}
+
+
+class MailTemplateRegistry:
+    """
+    Compiled E-Mail templates per name and language
+    """
+
+    def __init__(self, templates: Dict[str, str], languages: Iterable[str]):
+        self.templates = templates
+        self.languages = tuple(languages)
+        self.render_count = 0
+        self.render_time = 0.0
+        self._compiled = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _compile(template_name: str, language: str):
+        base, extension = os.path.splitext(template_name)
+        return select_template(['{}.{}{}'.format(base, language, extension), template_name]).template
+
+    def load(self):
+        """
+        Compile all templates for all languages
+        """
+        compiled = {
+            (name, language): self._compile(template_name, language)
+            for name, template_name in self.templates.items() for language in self.languages
+        }
+        with self._lock:
+            self._compiled.update(compiled)
+
+    def get(self, name: str, language: Optional[str] = None):
+        """
+        Get a compiled template
+
+        :param str name: The name of the template, a key of MAIL_TEMPLATES
+        :param Optional[str] language: The language, the active language if not given
+        :rtype: django.template.base.Template
+        :returns: The compiled template
+        """
+        language = language or get_language() or settings.LANGUAGE_CODE
+        for key in ((name, language), (name, language.split('-')[0])):
+            template = self._compiled.get(key)
+            if template is not None:
+                return template
+        template = self._compile(self.templates[name], language)
+        with self._lock:
+            self._compiled[(name, language)] = template
+        return template
+
+    def render(self, name: str, context: dict) -> str:
+        """
+        Render an E-Mail body in the active language
+
+        :param str name: The name of the template, a key of MAIL_TEMPLATES
+        :param dict context: The variables of the template
+        :rtype: str
+        :returns: The rendered body
+        """
+        start = time.perf_counter()
+        body = self.get(name).render(Context(context))
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.render_count += 1
+            self.render_time += elapsed
+        return body
+
+    def get_metrics(self) -> dict:
+        """
+        Get the render metrics
+
+        :rtype: dict
+        :returns: The number of renders, and the total and average render time in seconds
+        """
+        with self._lock:
+            count, total = self.render_count, self.render_time
+        return {
+            'count': count,
+            'total_seconds': total,
+            'average_seconds': total / count if count > 0 else 0.0,
+        }
+
+
+_REGISTRY = None  # type: Optional[MailTemplateRegistry]
+_REGISTRY_LOCK = Lock()
+
+
+def get_mail_templates() -> MailTemplateRegistry:
+    """
+    Get the process-wide registry, loaded on first use
+
+    :rtype: MailTemplateRegistry
+    :returns: The registry
+    """
+    global _REGISTRY  # pylint: disable=global-statement
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                registry = MailTemplateRegistry(MAIL_TEMPLATES, (code for code, _ in settings.LANGUAGES))
+                registry.load()
+                _REGISTRY = registry
+    return _REGISTRY
+
+
+def render_mail(name: str, context: dict) -> str:
+    """
+    Render an E-Mail body in the active language
+
+    :param str name: The name of the template, a key of MAIL_TEMPLATES
+    :param dict context: The variables of the template
+    :rtype: str
+    :returns: The rendered body
+    """
+    return get_mail_templates().render(name, context)
+
+
+@receiver(setting_changed)
+def _reset_mail_templates(setting: str, **kwargs):  # pylint: disable=unused-argument
+    global _REGISTRY  # pylint: disable=global-statement
+    if setting in ('TEMPLATES', 'LANGUAGES', 'LANGUAGE_CODE'):
+        with _REGISTRY_LOCK:
+            _REGISTRY = None
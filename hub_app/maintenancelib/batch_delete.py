@@ -0,0 +1,172 @@
+"""
+Batched deletion for the clean up commands
+
+One DELETE for all expired rows locks the table for as long as it runs, and for rows with cascades, Django collects
+all related objects in memory first. The BatchDeleter walks the rows to delete in primary key order instead and
+deletes them batch by batch, each batch in its own short transaction:
+
+* If no cascades or signals apply, a batch is deleted with one DELETE for its primary key range, without loading any
+  model instances.
+* Otherwise, the batch is deleted the Django way, so only the objects of one batch are collected at a time.
+"""
+import argparse
+import time
+from typing import Optional
+
+from django.core.management import BaseCommand, CommandError
+from django.db import router, transaction
+from django.db.models import QuerySet
+from django.db.models.deletion import Collector
+from django.utils.translation import gettext_lazy as _
+
+
+class BatchDeleteResult:  # pylint: disable=too-few-public-methods
+    """
+    Outcome of a batched deletion
+    """
+
+    __slots__ = ('deleted', 'seconds', 'complete')
+
+    def __init__(self, deleted: int, seconds: float, complete: bool):
+        self.deleted = deleted
+        self.seconds = seconds
+        self.complete = complete
+
+    @property
+    def rate(self) -> float:
+        """
+        Get the deleted rows per second
+
+        :rtype: float
+        :returns: The rate, 0 if nothing was deleted
+        """
+        if self.deleted < 1:
+            return 0.0
+        return self.deleted / max(self.seconds, 1e-6)
+
+
+class BatchDeleter:
+    """
+    Delete the rows of a queryset in batches
+    """
+
+    def __init__(self, queryset: QuerySet, batch_size: int = 1000, pause: float = 0.0,
+                 max_runtime: Optional[float] = None):
+        self.queryset = queryset
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_runtime = max_runtime
+        self.using = router.db_for_write(queryset.model)
+
+    @property
+    def can_fast_delete(self) -> bool:
+        """
+        Check if the rows can be deleted without collecting related objects
+
+        :rtype: bool
+        :returns: True, if no cascades or signals apply
+        """
+        return Collector(using=self.using).can_fast_delete(self.queryset)
+
+    def count(self) -> int:
+        """
+        Count the rows to delete
+
+        :rtype: int
+        :returns: The number of rows
+        """
+        return self.queryset.count()
+
+    def _delete_batch(self, keys: list, fast: bool) -> int:
+        if fast:
+            batch = self.queryset.filter(pk__gte=keys[0], pk__lte=keys[-1])
+        else:
+            batch = self.queryset.filter(pk__in=keys)
+        with transaction.atomic(using=self.using):
+            counts = batch.delete()[1]
+        return counts.get(self.queryset.model._meta.label, 0)  # pylint: disable=protected-access
+
+    def run(self) -> BatchDeleteResult:
+        """
+        Delete the rows
+
+        :rtype: BatchDeleteResult
+        :returns: The number of deleted rows, the time it took and whether all rows were deleted
+        """
+        fast = self.can_fast_delete
+        start = time.monotonic()
+        deleted = 0
+        last_key = None
+        while True:
+            batch = self.queryset.order_by('pk')
+            if last_key is not None:
+                batch = batch.filter(pk__gt=last_key)
+            keys = list(batch.values_list('pk', flat=True)[:self.batch_size])
+            if len(keys) < 1:
+                return BatchDeleteResult(deleted, time.monotonic() - start, True)
+            deleted += self._delete_batch(keys, fast)
+            last_key = keys[-1]
+            if len(keys) < self.batch_size:
+                return BatchDeleteResult(deleted, time.monotonic() - start, True)
+            if self.max_runtime is not None and time.monotonic() - start >= self.max_runtime:
+                return BatchDeleteResult(deleted, time.monotonic() - start, False)
+            if self.pause > 0:
+                time.sleep(self.pause)
+
+
+class BatchDeleteCommand(BaseCommand):
+    """
+    Base for the clean up commands, deleting the rows of get_queryset() in batches
+    """
+
+    item_name = _('rows')
+
+    def get_queryset(self) -> QuerySet:
+        """
+        Get the rows to delete
+        """
+        raise NotImplementedError()
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--batch-size',
+            type=int, default=1000,
+            help=_('Number of rows to delete per batch')
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float, default=0.1,
+            help=_('Seconds to pause between two batches')
+        )
+        parser.add_argument(
+            '--max-runtime',
+            type=float, default=0,
+            help=_('Stop after this many seconds, 0 for no limit')
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true', default=False,
+            help=_('Only count the rows to delete')
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError(_('The batch size must be at least 1'))
+        deleter = BatchDeleter(
+            self.get_queryset(), options['batch_size'], max(options['sleep'], 0),
+            options['max_runtime'] if options['max_runtime'] > 0 else None
+        )
+        if options['dry_run']:
+            self.stdout.write(_('Would delete %(count)s %(items)s.') % {
+                'count': deleter.count(), 'items': self.item_name
+            })
+        else:
+            result = deleter.run()
+            self.stdout.write(_('Deleted %(count)s %(items)s in %(seconds).2f seconds (%(rate).0f per second).') % {
+                'count': result.deleted, 'items': self.item_name, 'seconds': result.seconds, 'rate': result.rate
+            })
+            if not result.complete:
+                self.stdout.write(self.style.WARNING(
+                    _('Stopped after the maximum runtime, run again to delete the rest.')
+                ))
+        self.stdout.write(self.style.SUCCESS(_('Done')))
@@ -0,0 +1,81 @@
+"""
+Check the query plans of the hot queries
+
+Every hot query of the hub is explained on the configured database. A query plan with a sequential scan (a full
+table scan) means that an index is missing, e.g. because the migrations are not applied, or that the database cannot
+use it. On PostgreSQL, sequential scans are disabled for the check, as the planner prefers them for small tables.
+"""
+import re
+from datetime import timedelta
+from typing import Callable, List, Tuple
+
+from django.contrib.sessions.models import Session
+from django.db import connections, router, transaction
+from django.db.models import QuerySet
+from django.utils.timezone import now
+
+from hub_app.accountlib.lookups import users_by_username, users_by_email, get_recoverable_users
+from hub_app.models import HubUser, BurnedOtp, PendingRegistration, PendingCredentialRecovery, PendingEMailChange, \
+    OutboxMail
+
+
+def get_hot_queries() -> List[Tuple[str, Callable[[], QuerySet]]]:
+    """
+    Get the hot queries of the hub
+
+    :rtype: List[Tuple[str, Callable[[], QuerySet]]]
+    :returns: The name and a factory for the QuerySet of every hot query
+    """
+    return [
+        ('login by username', lambda: HubUser.objects.filter(username='mr_check')),
+        ('username availability', lambda: users_by_username('Mr_Check')),
+        ('credential recovery by e-mail', lambda: users_by_email('Mr_Check@example.com', get_recoverable_users())),
+        ('burned OTP lookup', lambda: BurnedOtp.objects.filter(user_id=1, token='123456')),
+        ('burned OTP clean up', lambda: BurnedOtp.objects.filter(burned_timestamp__lt=now() - timedelta(hours=2))),
+        ('pending registration clean up', lambda: HubUser.objects.filter(
+            pendingregistration__isnull=False, pendingregistration__valid_until__lt=now()
+        )),
+        ('pending recovery clean up', PendingCredentialRecovery.objects.expired),
+        ('pending e-mail change clean up', PendingEMailChange.objects.expired),
+        ('pending registration by user', lambda: PendingRegistration.objects.filter(user_id=1)),
+        ('due outbox e-mails', lambda: OutboxMail.objects.filter(next_attempt__lte=now()).order_by('next_attempt')),
+        ('session clean up', lambda: Session.objects.filter(expire_date__lt=now())),
+    ]
+
+
+def find_sequential_scans(vendor: str, plan: str) -> List[str]:
+    """
+    Find the tables that are scanned completely
+
+    :param str vendor: The database vendor, as in connection.vendor
+    :param str plan: The query plan, as from QuerySet.explain()
+    :rtype: List[str]
+    :returns: The names of the scanned tables
+    """
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if vendor == 'sqlite':
+        return re.findall(r'\bSCAN (?:TABLE )?(\w+)', plan)
+    if vendor == 'mysql':
+        return re.findall(r'"table_name": "(\w+)",\s*"access_type": "ALL"', plan)
+    return []
+
+
+def explain(queryset: QuerySet) -> str:
+    """
+    Get the query plan of a QuerySet
+
+    :param QuerySet queryset: The query
+    :rtype: str
+    :returns: The query plan
+    """
+    using = router.db_for_read(queryset.model)
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        return queryset.explain(format='json')
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
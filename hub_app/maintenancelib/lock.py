@@ -0,0 +1,125 @@
+"""
+Advisory lock for the maintenance
+
+Only one node of the hub should run the maintenance at a time. On PostgreSQL and MySQL, the lock is an advisory lock
+of the database, so it works across hosts. On other databases (e.g. SQLite, where all nodes share one host), it is a
+lock on a file: flock() on POSIX, msvcrt.locking() on Windows.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from django.db import connections
+
+
+def _lock_file(file) -> bool:
+    """
+    Try to lock the open file exclusively, without waiting
+    """
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel  # Not available on Windows
+    except ImportError:  # pragma: no cover
+        import msvcrt  # pylint: disable=import-outside-toplevel,import-error
+        file.seek(0)
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock_file(file):
+    """
+    Unlock the file locked by _lock_file()
+    """
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel  # Not available on Windows
+    except ImportError:  # pragma: no cover
+        import msvcrt  # pylint: disable=import-outside-toplevel,import-error
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class AdvisoryLock:
+    """
+    Non-blocking lock, shared by all nodes using the same database
+    """
+
+    def __init__(self, name: str, using: str = 'default', lock_file: Optional[str] = None):
+        """
+        :param str name: The name of the lock
+        :param str using: The database alias
+        :param Optional[str] lock_file: The file to lock if the database has no advisory locks, in the temp directory
+                                        if not given
+        """
+        self.name = name
+        self.using = using
+        self.lock_file = lock_file or os.path.join(tempfile.gettempdir(), '{}.lock'.format(name))
+        self._file = None
+        self._locked = False
+
+    @property
+    def key(self) -> int:
+        """
+        Get the numeric key of the lock for PostgreSQL
+
+        :rtype: int
+        :returns: A signed 64 bit integer derived from the name
+        """
+        return int.from_bytes(hashlib.sha256(self.name.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+    def _execute(self, sql: str, params: list):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()[0]
+
+    def _acquire_file(self) -> bool:
+        self._file = open(self.lock_file, 'a', encoding='utf-8')  # pylint: disable=consider-using-with
+        if not _lock_file(self._file):
+            self._file.close()
+            self._file = None
+            return False
+        return True
+
+    def acquire(self) -> bool:
+        """
+        Try to take the lock, without waiting
+
+        :rtype: bool
+        :returns: True, if the lock was taken
+        """
+        if self._locked:
+            return True
+        vendor = connections[self.using].vendor
+        if vendor == 'postgresql':
+            self._locked = bool(self._execute('SELECT pg_try_advisory_lock(%s)', [self.key]))
+        elif vendor == 'mysql':
+            self._locked = self._execute('SELECT GET_LOCK(%s, 0)', [self.name[:64]]) == 1
+        else:
+            self._locked = self._acquire_file()
+        return self._locked
+
+    def release(self):
+        """
+        Give the lock back
+        """
+        if not self._locked:
+            return
+        self._locked = False
+        vendor = connections[self.using].vendor
+        if vendor == 'postgresql':
+            self._execute('SELECT pg_advisory_unlock(%s)', [self.key])
+        elif vendor == 'mysql':
+            self._execute('SELECT RELEASE_LOCK(%s)', [self.name[:64]])
+        else:
+            _unlock_file(self._file)
+            self._file.close()
+            self._file = None
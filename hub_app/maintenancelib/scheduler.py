@@ -0,0 +1,160 @@
+"""
+Scheduler for the maintenance tasks
+
+The "runhubmaintenance" command runs the clean up commands within one long-running process instead of a cron job per
+command: no Django start-up per run, the database connection is reused as long as CONN_MAX_AGE allows, and no
+overlapping runs. Every task is a management command with its interval in seconds (setting MAINTENANCE_TASKS). Due
+tasks only run while holding the advisory lock, so with more than one node, only one node sweeps at a time.
+
+Every run is logged to the logger "hub_app.maintenance" and, if MAINTENANCE_METRICS_FILE is set, appended to that
+file as one JSON object per line.
+"""
+import json
+import logging
+import time
+from io import StringIO
+from threading import Event
+from typing import Callable, Dict, List, Optional
+
+from django.core.management import call_command
+from django.db import connection, DatabaseError
+from django.utils.timezone import now
+
+from hub_app.maintenancelib.lock import AdvisoryLock
+
+LOGGER = logging.getLogger('hub_app.maintenance')
+
+
+class TaskRun:  # pylint: disable=too-few-public-methods
+    """
+    Outcome of one run of a task
+    """
+
+    __slots__ = ('name', 'started', 'seconds', 'error', 'output')
+
+    def __init__(self, name: str, started: str, seconds: float, error: Optional[str], output: str):
+        self.name = name
+        self.started = started
+        self.seconds = seconds
+        self.error = error
+        self.output = output
+
+    def as_dict(self) -> dict:
+        """
+        Get the run as dictionary for the metrics file
+
+        :rtype: dict
+        :returns: The task, start time, duration and error (or None)
+        """
+        return {'task': self.name, 'started': self.started, 'seconds': self.seconds, 'error': self.error}
+
+
+class MaintenanceScheduler:
+    """
+    Run the tasks when they are due
+    """
+
+    def __init__(self, tasks: Dict[str, float], lock: AdvisoryLock, metrics_file: Optional[str] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param Dict[str, float] tasks: The management commands to run, with their intervals in seconds
+        :param AdvisoryLock lock: The lock to hold while running tasks
+        :param Optional[str] metrics_file: File to append the runs to
+        :param clock: Monotonic clock in seconds
+        """
+        self.tasks = tasks
+        self.lock = lock
+        self.metrics_file = metrics_file
+        self.clock = clock
+        self.next_runs = {name: clock() for name in tasks}
+
+    def run_task(self, name: str) -> TaskRun:
+        """
+        Run one task, errors are caught and recorded
+
+        :param str name: The name of the management command
+        :rtype: TaskRun
+        :returns: The outcome
+        """
+        started = now().isoformat()
+        output = StringIO()
+        error = None
+        start = time.monotonic()
+        try:
+            call_command(name, stdout=output, stderr=output)
+        except Exception as exc:  # pylint: disable=broad-except  # One broken task must not stop the others
+            error = '{}: {}'.format(type(exc).__name__, str(exc))
+        run = TaskRun(name, started, time.monotonic() - start, error, output.getvalue())
+        self._record(run)
+        return run
+
+    def _record(self, run: TaskRun):
+        if run.error is None:
+            LOGGER.info('Maintenance task %s took %.3f seconds', run.name, run.seconds)
+        else:
+            LOGGER.error('Maintenance task %s failed after %.3f seconds: %s', run.name, run.seconds, run.error)
+        if self.metrics_file:
+            with open(self.metrics_file, 'a', encoding='utf-8') as metrics:
+                metrics.write(json.dumps(run.as_dict()) + '\n')
+
+    def get_due(self) -> List[str]:
+        """
+        Get the tasks that are due
+
+        :rtype: List[str]
+        :returns: The names of the due tasks
+        """
+        current = self.clock()
+        return [name for name, next_run in self.next_runs.items() if next_run <= current]
+
+    def run_due(self) -> Optional[List[TaskRun]]:
+        """
+        Run the due tasks, if the lock can be taken
+
+        :rtype: Optional[List[TaskRun]]
+        :returns: The runs, None if another node holds the lock
+        """
+        due = self.get_due()
+        if len(due) < 1:
+            return []
+        connection.close_if_unusable_or_obsolete()  # The connection may be broken since the last run
+        if not self.lock.acquire():
+            LOGGER.info('Maintenance skipped, another node holds the lock')
+            for name in due:
+                self.next_runs[name] = self.clock() + self.tasks[name]
+            return None
+        try:
+            runs = []
+            for name in due:
+                runs.append(self.run_task(name))
+                self.next_runs[name] = self.clock() + self.tasks[name]
+            return runs
+        finally:
+            self.lock.release()
+
+    def get_wait(self) -> float:
+        """
+        Get the seconds until the next task is due
+
+        :rtype: float
+        :returns: The seconds to wait, 0 if a task is due
+        """
+        if len(self.next_runs) < 1:
+            return 60.0
+        return max(min(self.next_runs.values()) - self.clock(), 0.0)
+
+    def run_forever(self, stop: Event, max_wait: float = 60.0):
+        """
+        Run the tasks until stopped
+
+        :param Event stop: Set to stop the scheduler
+        :param float max_wait: Maximum seconds to sleep at once
+        """
+        while not stop.is_set():
+            wait = max_wait
+            try:
+                self.run_due()
+                wait = min(self.get_wait(), max_wait)
+            except DatabaseError:  # E.g. a restart of the database, it may be back on the next try
+                LOGGER.exception('Maintenance failed, trying again in %.0f seconds', max_wait)
+            stop.wait(wait)
@@ -0,0 +1,111 @@
+"""
+Measure the login for all timing attack mitigations
+
+Every mitigation is measured with the same mix of known and unknown usernames. The password hashes run on the command's
+thread, so the CPU time includes them, and the rate limiter has no limits. The benchmark user only exists in a
+transaction that is rolled back. Run it on the production host, without other load, to choose LOGIN_TIMING_MITIGATION
+and LOGIN_TIMING_PADDING.
+"""
+import argparse
+from statistics import median
+from time import perf_counter, process_time
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.http import HttpRequest
+from django.utils.crypto import get_random_string
+
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.authlib.backend import TotpAuthenticationBackend, TIMING_MITIGATIONS
+from hub_app.authlib.hashing import HashingPool
+from hub_app.authlib.ratelimit import MemoryRateLimitStore, RateLimiter
+from hub_app.models import HubUser
+
+
+def get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    Get a percentile with the nearest-rank method
+
+    :param List[float] sorted_values: The values, sorted ascending
+    :param float percentile: The percentile, e.g. 90
+    :rtype: float
+    :returns: The value
+    """
+    rank = max(1, -(-len(sorted_values) * percentile // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Command(BaseCommand):
+    """
+    Management Command for measuring the login
+    """
+
+    help = _('Measure wall clock and CPU time per login attempt for all timing attack mitigations')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--attempts',
+            type=int, default=100,
+            help=_('Number of login attempts per mitigation, half of them with an unknown username')
+        )
+        parser.add_argument(
+            '--padding',
+            type=float, default=None,
+            help=_('Seconds of padding for the mitigation "padding", default: LOGIN_TIMING_PADDING')
+        )
+
+    @staticmethod
+    def measure(backend: TotpAuthenticationBackend, username: str, attempts: int) -> Tuple[List[float], float]:
+        """
+        Measure the login attempts
+
+        :param TotpAuthenticationBackend backend: The backend, set up with the mitigation to measure
+        :param str username: The known username
+        :param int attempts: Number of login attempts
+        :rtype: Tuple[List[float], float]
+        :returns: The sorted durations and the CPU time per attempt, in seconds
+        """
+        request = HttpRequest()
+        request.META['REMOTE_ADDR'] = '127.0.0.1'
+        durations = []
+        cpu_started = process_time()
+        for i in range(attempts):
+            started = perf_counter()
+            backend.authenticate(  # nosec
+                request,
+                username=username if i % 2 == 0 else 'unknown_{}'.format(username),
+                password='benchmark_pass',
+                one_time_pw='000000'
+            )
+            durations.append(perf_counter() - started)
+        return sorted(durations), (process_time() - cpu_started) / attempts
+
+    def handle(self, *args, **options):
+        attempts = options['attempts']
+        if attempts < 1:
+            raise CommandError(_('The number of attempts must be at least 1'))
+        padding = settings.LOGIN_TIMING_PADDING if options['padding'] is None else options['padding']
+        with transaction.atomic():
+            user = HubUser(username='benchmark_{}'.format(get_random_string(8).lower()), is_active=True)
+            user.set_password('benchmark_pass')  # nosec
+            user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+            user.save()
+            for mitigation in TIMING_MITIGATIONS:
+                backend = TotpAuthenticationBackend(
+                    mitigation=mitigation, padding=padding, rate_limiter=RateLimiter(MemoryRateLimitStore(), {}),
+                    hashing_pool=HashingPool(workers=0, max_pending=1, wait=0)
+                )
+                durations, cpu = Command.measure(backend, user.username, attempts)
+                self.stdout.write(_(
+                    '%(mitigation)s: p50 %(p50).1f ms, p90 %(p90).1f ms, p99 %(p99).1f ms, max %(max).1f ms, '
+                    'CPU %(cpu).1f ms per attempt'
+                ) % {
+                    'mitigation': mitigation, 'p50': median(durations) * 1000,
+                    'p90': get_percentile(durations, 90) * 1000, 'p99': get_percentile(durations, 99) * 1000,
+                    'max': durations[-1] * 1000, 'cpu': cpu * 1000,
+                })
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS(_('Done')))
@@ -0,0 +1,47 @@
+"""
+Check the Indexes of the hot queries
+
+Run this as a pre-flight step after the migrations. It explains the hot queries of the hub on the configured database
+and fails if a query scans a whole table.
+"""
+import argparse
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, router
+
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.maintenancelib.indexes import get_hot_queries, explain, find_sequential_scans
+
+
+class Command(BaseCommand):
+    """
+    Management Command for checking the query plans of the hot queries
+    """
+
+    help = _('Explain the hot queries and report sequential scans')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--show-plans',
+            action='store_true', default=False,
+            help=_('Show the query plans of all queries, not only of the failed ones')
+        )
+
+    def handle(self, *args, **options):
+        passed = True
+        for name, query_factory in get_hot_queries():
+            queryset = query_factory()
+            plan = explain(queryset)
+            scans = find_sequential_scans(connections[router.db_for_read(queryset.model)].vendor, plan)
+            self.stdout.write('* {}... '.format(name), ending='')
+            if len(scans) > 0:
+                passed = False
+                self.stdout.write(self.style.ERROR(_('sequential scan on %(tables)s') % {'tables': ', '.join(scans)}))
+            else:
+                self.stdout.write(self.style.SUCCESS(_('passed')))
+            if len(scans) > 0 or options['show_plans']:
+                self.stdout.write(plan)
+        if not passed:
+            raise CommandError(_('Some hot queries scan whole tables, check the indexes and the migrations'))
+        self.stdout.write(self.style.SUCCESS(_('Done')))
@@ -1,36 +1,28 @@
 """
 Clean up burned OTPs from database
 
-You should use a cron job to trigger this regularly.
+"runhubmaintenance" runs this regularly, otherwise use a cron job to trigger it. This is only required for the
+DatabaseReplayBackend, the other replay backends expire burned OTPs on their own.
 """
 import datetime
 
-from django.core.management import BaseCommand
+from django.db.models import QuerySet
 from django.utils.timezone import now
 
 from django.utils.translation import gettext_lazy as _
 
+from hub_app.maintenancelib.batch_delete import BatchDeleteCommand
 from hub_app.models import BurnedOtp
 
 
-class Command(BaseCommand):
+class Command(BatchDeleteCommand):
     """
     Management Command for cleaning up old burned OTPs
     """
 
     help = _('Delete burned OTPs older than 2 hours')
+    item_name = _('burned OTPs')
 
-    def handle_clean_burned_otp(self):
-        """
-        Remove burned OTPs that are older than 2 hours
-        """
+    def get_queryset(self) -> QuerySet:
         the_oldest_one_to_keep = now() - datetime.timedelta(hours=2)
-        old_entries = BurnedOtp.objects.filter(burned_timestamp__lt=the_oldest_one_to_keep)
-        count = old_entries.count()
-        self.stdout.write(_('Deleting %(count)s burned OTPs.') % {'count': count})
-        if count > 0:
-            old_entries.delete()
-        self.stdout.write(self.style.SUCCESS(_('Done')))
-
-    def handle(self, *args, **options):
-        self.handle_clean_burned_otp()
+        return BurnedOtp.objects.filter(burned_timestamp__lt=the_oldest_one_to_keep)
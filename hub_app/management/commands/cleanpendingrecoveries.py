@@ -1,27 +1,23 @@
 """
 Clean up pending credential recoveries from database
 
-You should use a cron job to trigger this regularly.
+"runhubmaintenance" runs this regularly, otherwise use a cron job to trigger it.
 """
-from django.core.management import BaseCommand
-from django.utils.timezone import now
+from django.db.models import QuerySet
 
 from django.utils.translation import gettext_lazy as _
 
+from hub_app.maintenancelib.batch_delete import BatchDeleteCommand
 from hub_app.models import PendingCredentialRecovery
 
 
-class Command(BaseCommand):
+class Command(BatchDeleteCommand):
     """
     Management Command for cleaning up expired pending credential recoveries
     """
 
     help = _('Delete pending credential recoveries older than 1 hour')
+    item_name = _('pending credential recoveries')
 
-    def handle(self, *args, **options):
-        expired_recoveries = PendingCredentialRecovery.objects.filter(valid_until__lt=now())
-        count = expired_recoveries.count()
-        self.stdout.write(_('Deleting %(count)s pending credential recoveries.') % {'count': count})
-        if count > 0:
-            expired_recoveries.delete()
-        self.stdout.write(self.style.SUCCESS(_('Done')))
+    def get_queryset(self) -> QuerySet:
+        return PendingCredentialRecovery.objects.expired()
@@ -1,30 +1,27 @@
 """
 Clean up pending registrations from database
 
-You should use a cron job to trigger this regularly.
+"runhubmaintenance" runs this regularly, otherwise use a cron job to trigger it.
 """
-from django.core.management import BaseCommand
+from django.db.models import QuerySet
 from django.utils.timezone import now
 
 from django.utils.translation import gettext_lazy as _
 
+from hub_app.maintenancelib.batch_delete import BatchDeleteCommand
 from hub_app.models import HubUser
 
 
-class Command(BaseCommand):
+class Command(BatchDeleteCommand):
     """
     Management Command for cleaning up expired pending registrations
     """
 
     help = _('Delete pending registrations older than 3 days')
+    item_name = _('user accounts with expired registrations')
 
-    def handle(self, *args, **options):
-        expired_user_registrations = HubUser.objects.filter(
+    def get_queryset(self) -> QuerySet:
+        return HubUser.objects.filter(
             pendingregistration__isnull=False,
             pendingregistration__valid_until__lt=now()
         )
-        count = expired_user_registrations.count()
-        self.stdout.write(_('Deleting %(count)s user accounts with expired registrations.') % {'count': count})
-        if count > 0:
-            expired_user_registrations.delete()
-        self.stdout.write(self.style.SUCCESS(_('Done')))
@@ -0,0 +1,53 @@
+"""
+Clean up expired sessions in batches
+
+This replaces the Django "clearsessions" command. With the session engines of the hub, the expired sessions are
+deleted in batches, each with its own short DELETE, so the session table is never locked for long. Other session
+engines are cleaned up the Django way.
+"""
+import argparse
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.sessionlib.coalescing import CoalescingSessionMixin
+
+
+class Command(BaseCommand):
+    """
+    Management Command for cleaning up expired sessions
+    """
+
+    help = _('Delete expired sessions in batches')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--batch-size',
+            type=int, default=1000,
+            help=_('Number of sessions to delete per batch')
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float, default=0.1,
+            help=_('Seconds to pause between two batches')
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError(_('The batch size must be at least 1'))
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        if issubclass(session_store, CoalescingSessionMixin):
+            count = session_store.clear_expired_in_batches(batch_size, max(options['sleep'], 0))
+            self.stdout.write(_('Deleted %(count)s expired sessions.') % {'count': count})
+        else:
+            try:
+                session_store.clear_expired()
+            except NotImplementedError as error:
+                raise CommandError(_('Session engine "%(engine)s" doesn\'t support clearing expired sessions.') % {
+                    'engine': settings.SESSION_ENGINE
+                }) from error
+        self.stdout.write(self.style.SUCCESS(_('Done')))
@@ -15,6 +15,7 @@ from django.core.management import BaseCommand, CommandError
 from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
+from hub_app.accountlib.lookups import users_by_username
 from hub_app.models import HubUser
 
 
@@ -95,29 +96,27 @@ class Command(BaseCommand):
 
         :raises CommandError: When something is wrong
         """
-        try:
-            HubUser.objects.get(username=username)
+        if users_by_username(username).exists():
             raise CommandError(_('The user "%(username)s" already exists.') % {'username': username})
-        except HubUser.DoesNotExist:
-            with transaction.atomic():
-                tx_id = transaction.savepoint()
-                try:
-                    superuser = HubUser.objects.create_superuser(
-                        username=username,
-                        password=password,
-                    )  # type: HubUser
-                    superuser.set_totp_secret(secret)
-                    superuser.save()
-                    self.stdout.write(self.style.SUCCESS(_('Superuser "%(username)s" created successfully') % {
-                        'username': username
-                    }))
-                    transaction.savepoint_commit(tx_id)
-                except ValueError as ex:
-                    transaction.savepoint_rollback(tx_id)
-                    raise CommandError(_('Unable to create user "%(username)s": %(message)s') % {
-                        'username': username,
-                        'message': str(ex)
-                    })
+        with transaction.atomic():
+            tx_id = transaction.savepoint()
+            try:
+                superuser = HubUser.objects.create_superuser(
+                    username=username,
+                    password=password,
+                )  # type: HubUser
+                superuser.set_totp_secret(secret)
+                superuser.save()
+                self.stdout.write(self.style.SUCCESS(_('Superuser "%(username)s" created successfully') % {
+                    'username': username
+                }))
+                transaction.savepoint_commit(tx_id)
+            except ValueError as ex:
+                transaction.savepoint_rollback(tx_id)
+                raise CommandError(_('Unable to create user "%(username)s": %(message)s') % {
+                    'username': username,
+                    'message': str(ex)
+                })
 
     def validate_input_and_create_superuser(self, username: str, password: str, secret: str):
         """
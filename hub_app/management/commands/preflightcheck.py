@@ -8,6 +8,8 @@ from typing import Callable
 from django.conf import settings
 from django.core.management import BaseCommand, CommandError
 
+from hub_app.accountlib.lookups import get_duplicate_usernames
+
 
 class Command(BaseCommand):
     """
@@ -70,11 +72,24 @@ class Command(BaseCommand):
             lambda: isinstance(settings.ALLOWED_HOSTS, list) and len(settings.ALLOWED_HOSTS) > 0
         )
 
+    def check_unique_usernames(self) -> bool:
+        """
+        Check if no username belongs to more than one user, ignoring the case (these users can't log in)
+
+        :rtype: bool
+        :returns: True, if all usernames are unique
+        """
+        duplicates = get_duplicate_usernames()
+        if duplicates:
+            self.stderr.write('Usernames of more than one user: {}'.format(', '.join(duplicates)))
+        return self._perform_check('unique usernames', lambda: len(duplicates) < 1)
+
     def handle(self, *args, **options):
         passed = True
         self.stdout.write('Performing a Pre-Flight Check...')
         passed = self.check_django_secret() and passed
         passed = self.check_debug() and passed
+        passed = self.check_unique_usernames() and passed
         self.stdout.write('Pre-Flight Check finished.')
         if passed:
             self.stdout.write(self.style.SUCCESS('Pre-flight Check PASSED'))
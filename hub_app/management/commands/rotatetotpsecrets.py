@@ -0,0 +1,142 @@
+"""
+Re-encrypt all TOTP secrets with the primary key of the keyring
+
+Run this after putting a new secret in front of TOTP_SECRET_KEYRING. The users are processed in small batches, each in
+its own short transaction, so the command can run while the hub is online. If a checkpoint file is given, the command
+resumes where an earlier run stopped.
+"""
+import argparse
+import os
+import time
+from typing import Optional, Tuple
+
+from cryptography.fernet import InvalidToken
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.authlib.crypt import SymmetricCrypt
+from hub_app.models import HubUser
+
+
+class Command(BaseCommand):
+    """
+    Management Command for re-encrypting the TOTP secrets
+    """
+
+    help = _('Re-encrypt all TOTP secrets with the primary key of the keyring')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--batch-size',
+            type=int, default=500,
+            help=_('Number of users to re-encrypt per transaction')
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float, default=0.1,
+            help=_('Seconds to pause between two batches')
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str, default=None,
+            help=_('File to store the progress in, an existing file is used to resume')
+        )
+
+    @staticmethod
+    def read_checkpoint(checkpoint: Optional[str]) -> int:
+        """
+        Get the last processed user id from the checkpoint file
+
+        :param Optional[str] checkpoint: Path to the checkpoint file
+        :rtype: int
+        :returns: The last processed user id, 0 if there is none
+        """
+        if checkpoint is None or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint, 'r', encoding='utf-8') as checkpoint_file:
+            content = checkpoint_file.read().strip()
+        try:
+            return int(content)
+        except ValueError as error:
+            raise CommandError(_('Invalid checkpoint file "%(file)s"') % {'file': checkpoint}) from error
+
+    @staticmethod
+    def write_checkpoint(checkpoint: Optional[str], last_id: int):
+        """
+        Save the last processed user id to the checkpoint file
+
+        :param Optional[str] checkpoint: Path to the checkpoint file
+        :param int last_id: The last processed user id
+        """
+        if checkpoint is None:
+            return
+        with open(checkpoint, 'w', encoding='utf-8') as checkpoint_file:
+            checkpoint_file.write(str(last_id))
+
+    def rotate_batch(self, crypt: SymmetricCrypt, last_id: int, batch_size: int) -> Tuple[int, int, int]:
+        """
+        Re-encrypt one batch of users
+
+        :param SymmetricCrypt crypt: The Cipher to use
+        :param int last_id: Only users with a greater id are processed
+        :param int batch_size: Maximum number of users to process
+        :rtype: Tuple[int, int, int]
+        :returns: The last processed user id, the number of rotated and the number of failed secrets
+        """
+        failed = 0
+        with transaction.atomic():
+            # Locked, so a secret set during the rotation is not overwritten with the old one
+            users = list(
+                HubUser.objects.select_for_update().filter(
+                    id__gt=last_id, totp_secret__isnull=False
+                ).order_by('id').only('id', 'username', 'totp_secret')[:batch_size]
+            )
+            if len(users) < 1:
+                return last_id, 0, 0
+            rotated_users = []
+            for user in users:
+                try:
+                    user.totp_secret = crypt.rotate(bytes(user.totp_secret))
+                    rotated_users.append(user)
+                except InvalidToken:
+                    failed += 1
+                    self.stderr.write(_('Unable to decrypt the TOTP secret of user "%(username)s"') % {
+                        'username': user.username
+                    })
+            HubUser.objects.bulk_update(rotated_users, ['totp_secret'])
+        return users[-1].id, len(rotated_users), failed
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError(_('The batch size must be at least 1'))
+        pause = max(options['sleep'], 0)
+        checkpoint = options['checkpoint']
+        crypt = SymmetricCrypt()
+        last_id = Command.read_checkpoint(checkpoint)
+        if last_id > 0:
+            self.stdout.write(_('Resuming after user id %(id)s.') % {'id': last_id})
+        total_rotated = 0
+        total_failed = 0
+        while True:
+            new_last_id, rotated, failed = self.rotate_batch(crypt, last_id, batch_size)
+            if new_last_id == last_id:
+                break
+            last_id = new_last_id
+            total_rotated += rotated
+            total_failed += failed
+            Command.write_checkpoint(checkpoint, last_id)
+            self.stdout.write(_('Re-encrypted %(count)s TOTP secrets up to user id %(id)s.') % {
+                'count': total_rotated, 'id': last_id
+            })
+            if pause > 0:
+                time.sleep(pause)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if total_failed > 0:
+            raise CommandError(_('%(count)s TOTP secrets could not be decrypted with the keyring.') % {
+                'count': total_failed
+            })
+        self.stdout.write(self.style.SUCCESS(_('Done')))
@@ -0,0 +1,66 @@
+"""
+Run the maintenance of the hub
+
+This replaces the cron jobs for the clean up commands. Run it as a service, on one or more nodes.
+"""
+import argparse
+import signal
+from threading import Event
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.maintenancelib.lock import AdvisoryLock
+from hub_app.maintenancelib.scheduler import MaintenanceScheduler
+
+
+class Command(BaseCommand):
+    """
+    Management Command for running the maintenance tasks on schedule
+    """
+
+    help = _('Run the clean up tasks at their intervals, until stopped')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--once',
+            action='store_true', default=False,
+            help=_('Run all tasks once and exit')
+        )
+        parser.add_argument(
+            '--max-wait',
+            type=float, default=60,
+            help=_('Maximum seconds to sleep between two checks for due tasks')
+        )
+
+    def handle(self, *args, **options):
+        tasks = settings.MAINTENANCE_TASKS
+        if any(interval <= 0 for interval in tasks.values()):
+            raise CommandError(_('The intervals of the maintenance tasks must be positive'))
+        scheduler = MaintenanceScheduler(
+            tasks,
+            AdvisoryLock(settings.MAINTENANCE_LOCK_NAME, lock_file=settings.MAINTENANCE_LOCK_FILE),
+            settings.MAINTENANCE_METRICS_FILE
+        )
+        if options['once']:
+            runs = scheduler.run_due()
+            if runs is None:
+                self.stdout.write(self.style.WARNING(_('Another node is running the maintenance.')))
+            else:
+                for run in runs:
+                    if run.error is None:
+                        self.stdout.write(_('%(task)s: %(seconds).3f seconds') % {
+                            'task': run.name, 'seconds': run.seconds
+                        })
+                    else:
+                        self.stdout.write(self.style.ERROR(_('%(task)s failed: %(error)s') % {
+                            'task': run.name, 'error': run.error
+                        }))
+        else:  # pragma: no cover  # Runs until it is stopped
+            stop = Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            scheduler.run_forever(stop, max(options['max_wait'], 1))
+        self.stdout.write(self.style.SUCCESS(_('Done')))
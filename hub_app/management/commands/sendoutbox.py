@@ -0,0 +1,51 @@
+"""
+Deliver the queued E-Mails of the outbox
+"""
+import argparse
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from django.utils.translation import gettext_lazy as _
+
+from hub_app.maillib.outbox import deliver_outbox
+
+
+class Command(BaseCommand):
+    """
+    Management Command for delivering the outbox
+    """
+
+    help = _('Deliver the queued E-Mails in batches')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--batch-size',
+            type=int, default=50,
+            help=_('Number of E-Mails to deliver per connection')
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true', default=False,
+            help=_('Keep running and deliver new E-Mails as they come')
+        )
+        parser.add_argument(
+            '--interval',
+            type=float, default=5,
+            help=_('Seconds to wait between two runs with --loop')
+        )
+
+    def _deliver(self, batch_size: int):
+        sent, failed = deliver_outbox(batch_size)
+        if sent + failed > 0:
+            self.stdout.write(_('Sent %(sent)s E-Mails, %(failed)s failed.') % {'sent': sent, 'failed': failed})
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError(_('The batch size must be at least 1'))
+        self._deliver(batch_size)
+        while options['loop']:  # pragma: no cover  # Runs until it is stopped
+            time.sleep(max(options['interval'], 0.1))
+            self._deliver(batch_size)
+        self.stdout.write(self.style.SUCCESS(_('Done')))
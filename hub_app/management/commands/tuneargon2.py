@@ -0,0 +1,150 @@
+"""
+Measure the Argon2 cost parameters for this host
+
+The command looks for the strongest parameters where one password hash stays below the target latency, with as much
+memory as the budget allows when all hashing workers are busy at the same time. Put the result in the settings
+ARGON2_TIME_COST, ARGON2_MEMORY_COST and ARGON2_PARALLELISM. Run it on the production host, without other load.
+"""
+import argparse
+import time
+from statistics import median
+from typing import Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from django.core.management import BaseCommand, CommandError
+from django.utils.crypto import get_random_string
+
+from django.utils.translation import gettext_lazy as _
+
+
+class Command(BaseCommand):
+    """
+    Management Command for tuning the Argon2 parameters
+    """
+
+    help = _('Measure the Argon2 cost parameters for a target latency and number of hashing workers')
+
+    def add_arguments(self, parser: argparse.ArgumentParser):
+        parser.add_argument(
+            '--target-ms',
+            type=float, default=250,
+            help=_('Maximum duration of one password hash in milliseconds')
+        )
+        parser.add_argument(
+            '--workers',
+            type=int, default=None,
+            help=_('Number of hashes running at the same time, default: PASSWORD_HASHING_WORKERS')
+        )
+        parser.add_argument(
+            '--memory-budget',
+            type=int, default=1024,
+            help=_('Memory in MiB for all hashes running at the same time')
+        )
+        parser.add_argument(
+            '--parallelism',
+            type=int, default=None,
+            help=_('Number of lanes per hash, default: ARGON2_PARALLELISM')
+        )
+        parser.add_argument(
+            '--max-time-cost',
+            type=int, default=10,
+            help=_('Highest number of iterations to try')
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int, default=3,
+            help=_('Number of measurements per candidate, the median is used')
+        )
+
+    @staticmethod
+    def measure(time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> float:
+        """
+        Measure the duration of one password hash, exactly like the password hasher calculates it
+
+        :param int time_cost: Number of iterations
+        :param int memory_cost: Memory usage in KiB
+        :param int parallelism: Number of lanes
+        :param int rounds: Number of measurements
+        :rtype: float
+        :returns: The median duration in seconds
+        """
+        hasher = type('CandidateArgon2PasswordHasher', (Argon2PasswordHasher,), {
+            'time_cost': time_cost, 'memory_cost': memory_cost, 'parallelism': parallelism
+        })()
+        durations = []
+        for _round in range(rounds):
+            password = get_random_string(16)
+            salt = hasher.salt()
+            started = time.perf_counter()
+            hasher.encode(password, salt)
+            durations.append(time.perf_counter() - started)
+        return median(durations)
+
+    def measure_candidate(self, time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> float:
+        """
+        Measure and report one candidate
+
+        :rtype: float
+        :returns: The median duration in seconds
+        """
+        duration = Command.measure(time_cost, memory_cost, parallelism, rounds)
+        self.stdout.write(_('t=%(time_cost)s, m=%(memory_cost)s KiB, p=%(parallelism)s: %(duration).1f ms') % {
+            'time_cost': time_cost, 'memory_cost': memory_cost, 'parallelism': parallelism,
+            'duration': duration * 1000
+        })
+        return duration
+
+    def tune(self, target: float, max_memory_cost: int, parallelism: int, max_time_cost: int,
+             rounds: int) -> Tuple[int, int, float]:
+        """
+        Find the parameters: first the memory cost with one iteration, then as many iterations as the target allows
+
+        :param float target: Maximum duration in seconds
+        :param int max_memory_cost: Highest memory usage in KiB
+        :param int parallelism: Number of lanes
+        :param int max_time_cost: Highest number of iterations
+        :param int rounds: Number of measurements per candidate
+        :rtype: Tuple[int, int, float]
+        :returns: The time cost, the memory cost and the measured duration in seconds
+        """
+        min_memory_cost = 8 * parallelism
+        memory_cost = max_memory_cost
+        duration = self.measure_candidate(1, memory_cost, parallelism, rounds)
+        while duration > target and memory_cost > min_memory_cost:
+            memory_cost = max(memory_cost // 2, min_memory_cost)
+            duration = self.measure_candidate(1, memory_cost, parallelism, rounds)
+        time_cost = 1
+        while time_cost < max_time_cost:
+            next_duration = self.measure_candidate(time_cost + 1, memory_cost, parallelism, rounds)
+            if next_duration > target:
+                break
+            time_cost += 1
+            duration = next_duration
+        return time_cost, memory_cost, duration
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        workers = options['workers'] or max(getattr(settings, 'PASSWORD_HASHING_WORKERS', 1), 1)
+        parallelism = options['parallelism'] or getattr(settings, 'ARGON2_PARALLELISM', None) or \
+            Argon2PasswordHasher.parallelism
+        numbers = (target, workers, parallelism, options['memory_budget'], options['max_time_cost'], options['rounds'])
+        if min(numbers) <= 0:
+            raise CommandError(_('All numbers must be positive'))
+        max_memory_cost = max(options['memory_budget'] * 1024 // workers, 8 * parallelism)
+        self.stdout.write(_('Measuring with up to %(memory_cost)s KiB per hash for %(workers)s workers.') % {
+            'memory_cost': max_memory_cost, 'workers': workers
+        })
+        time_cost, memory_cost, duration = self.tune(
+            target, max_memory_cost, parallelism, options['max_time_cost'], options['rounds']
+        )
+        if duration > target:
+            self.stderr.write(_('Even the cheapest parameters take longer than the target latency.'))
+        self.stdout.write(_('Capacity: about %(rate).1f password hashes per second with %(workers)s workers.') % {
+            'rate': workers / duration, 'workers': workers
+        })
+        self.stdout.write(_('Put these parameters in the settings:'))
+        self.stdout.write('ARGON2_TIME_COST = {}'.format(time_cost))
+        self.stdout.write('ARGON2_MEMORY_COST = {}'.format(memory_cost))
+        self.stdout.write('ARGON2_PARALLELISM = {}'.format(parallelism))
+        self.stdout.write(self.style.SUCCESS(_('Done')))
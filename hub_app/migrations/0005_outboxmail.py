@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub_app', '0004_pendingemailchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMail',
+            fields=[
+                ('uuid', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, verbose_name='UUID')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Created')),
+                ('from_email', models.CharField(max_length=255, verbose_name='From')),
+                ('recipients', models.TextField(verbose_name='Recipients')),
+                ('subject', models.CharField(max_length=255, verbose_name='Subject')),
+                ('body', models.TextField(blank=True, verbose_name='Body')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt', models.DateTimeField(blank=True, db_index=True, default=django.utils.timezone.now, null=True, verbose_name='Next Attempt')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last Error')),
+            ],
+            options={
+                'verbose_name': 'Outbox E-Mail',
+                'verbose_name_plural': 'Outbox E-Mails',
+                'permissions': (),
+                'default_permissions': ('change', 'delete'),
+            },
+        ),
+    ]
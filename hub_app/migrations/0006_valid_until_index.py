@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import hub_app.accountlib.email
+import hub_app.authlib.forgot_credentials
+import hub_app.reglib.validity
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub_app', '0005_outboxmail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingcredentialrecovery',
+            name='valid_until',
+            field=models.DateTimeField(db_index=True, default=hub_app.authlib.forgot_credentials.get_recovery_max_validity, verbose_name='Valid Until'),
+        ),
+        migrations.AlterField(
+            model_name='pendingemailchange',
+            name='valid_until',
+            field=models.DateTimeField(db_index=True, default=hub_app.accountlib.email.get_email_max_validity, verbose_name='Valid Until'),
+        ),
+        migrations.AlterField(
+            model_name='pendingregistration',
+            name='valid_until',
+            field=models.DateTimeField(db_index=True, default=hub_app.reglib.validity.get_registration_max_validity, verbose_name='Valid Until'),
+        ),
+    ]
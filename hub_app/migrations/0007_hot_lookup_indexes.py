@@ -0,0 +1,54 @@
+"""
+Indexes for the hot lookups
+
+The functional indexes on LOWER() are created with SQL, as Django before 3.2 can't declare them on the model. They are
+created on PostgreSQL, SQLite and MySQL (8.0.13 or newer); other databases don't get them.
+"""
+from django.db import migrations, models
+import django.utils.timezone
+
+FUNCTIONAL_INDEXES = (
+    # name, table, columns (the ones in LOWER() first)
+    ('hub_app_hubuser_username_lower', 'hub_app_hubuser', ('username',), ()),
+    ('hub_app_hubuser_email_lower_active', 'hub_app_hubuser', ('email',), ('is_active',)),
+)
+
+
+def create_functional_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite', 'mysql'):
+        return
+    quote = schema_editor.quote_name
+    for name, table, lower_columns, columns in FUNCTIONAL_INDEXES:
+        lower_template = '(LOWER({}))' if vendor == 'mysql' else 'LOWER({})'
+        parts = [lower_template.format(quote(column)) for column in lower_columns]
+        parts += [quote(column) for column in columns]
+        schema_editor.execute('CREATE INDEX {} ON {} ({})'.format(quote(name), quote(table), ', '.join(parts)))
+
+
+def drop_functional_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite', 'mysql'):
+        return
+    quote = schema_editor.quote_name
+    for name, table, _, _ in FUNCTIONAL_INDEXES:
+        if vendor == 'mysql':
+            schema_editor.execute('DROP INDEX {} ON {}'.format(quote(name), quote(table)))
+        else:
+            schema_editor.execute('DROP INDEX {}'.format(quote(name)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub_app', '0006_valid_until_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='burnedotp',
+            name='burned_timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Burned Date/Time'),
+        ),
+        migrations.RunPython(create_functional_indexes, drop_functional_indexes),
+    ]
@@ -0,0 +1,72 @@
+"""
+Normalized (lowercase) username and E-Mail address columns
+
+The new columns are filled in batches. Their indexes replace the functional indexes on LOWER() of migration 0007,
+which are dropped first. The login looks up the normalized username, so the migration stops if two users only differ in
+the case of their usernames; rename one of them and migrate again.
+"""
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BACKFILL_BATCH_SIZE = 1000
+
+functional_indexes = import_module('hub_app.migrations.0007_hot_lookup_indexes')
+
+
+def backfill_normalized_columns(apps, schema_editor):
+    users = apps.get_model('hub_app', 'HubUser')._default_manager.using(schema_editor.connection.alias)
+    last_pk = None
+    while True:
+        batch = users.order_by('pk').only('pk', 'username', 'email')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch[:BACKFILL_BATCH_SIZE])
+        if len(batch) < 1:
+            return
+        for user in batch:
+            user.username_normalized = user.username.lower()
+            user.email_normalized = (user.email or '').lower()
+        users.bulk_update(batch, ['username_normalized', 'email_normalized'])
+        last_pk = batch[-1].pk
+
+
+def check_duplicate_usernames(apps, schema_editor):
+    users = apps.get_model('hub_app', 'HubUser')._default_manager.using(schema_editor.connection.alias)
+    duplicates = list(
+        users.values('username_normalized').annotate(users=Count('pk')).filter(users__gt=1).order_by(
+            'username_normalized'
+        ).values_list('username_normalized', flat=True)
+    )
+    if duplicates:
+        raise ValueError(
+            'These usernames belong to more than one user, ignoring the case: {}. Rename all but one of the users of '
+            'each username, then migrate again.'.format(', '.join(duplicates))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hub_app', '0007_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        # Before the new columns, as SQLite rebuilds the table without them
+        migrations.RunPython(
+            functional_indexes.drop_functional_indexes, functional_indexes.create_functional_indexes
+        ),
+        migrations.AddField(
+            model_name='hubuser',
+            name='username_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Lowercase username for the lookups, maintained on save', max_length=150, verbose_name='Normalized Username'),
+        ),
+        migrations.AddField(
+            model_name='hubuser',
+            name='email_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Lowercase E-Mail address for the lookups, maintained on save', max_length=254, verbose_name='Normalized E-Mail Address'),
+        ),
+        migrations.RunPython(backfill_normalized_columns, migrations.RunPython.noop),
+        migrations.RunPython(check_duplicate_usernames, migrations.RunPython.noop),
+    ]
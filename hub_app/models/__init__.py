@@ -5,3 +5,4 @@ from .users import HubUser, BurnedOtp  # noqa: F401
 from .registration import PendingRegistration  # noqa: F401
 from .forgot_credentials import PendingCredentialRecovery  # noqa: F401
 from .my_account import PendingEMailChange  # noqa: F401
+from .outbox import OutboxMail  # noqa: F401
@@ -0,0 +1,61 @@
+"""
+Expiry of pending requests (registrations, credential recoveries and E-Mail changes)
+
+A pending request is only valid until its "valid_until". The queries of the views only see the live requests, and an
+expired request that is encountered is deleted right away, so nothing depends on how often the clean up runs.
+"""
+from django.db.models import Manager, QuerySet, Model
+from django.utils.timezone import now
+
+
+class LiveQuerySet(QuerySet):
+    """
+    QuerySet for models with an indexed "valid_until"
+    """
+
+    def live(self) -> 'LiveQuerySet':
+        """
+        Only the requests that are still valid
+
+        :rtype: LiveQuerySet
+        :returns: The filtered QuerySet
+        """
+        return self.filter(valid_until__gte=now())
+
+    def expired(self) -> 'LiveQuerySet':
+        """
+        Only the requests that are expired
+
+        :rtype: LiveQuerySet
+        :returns: The filtered QuerySet
+        """
+        return self.filter(valid_until__lt=now())
+
+    def get_live(self, *args, **kwargs) -> Model:
+        """
+        Get a valid request, an expired one is deleted on the way
+
+        :rtype: Model
+        :returns: The request
+        :raises DoesNotExist: If there is no such request, or if it is expired
+        """
+        pending = self.get(*args, **kwargs)
+        if pending.valid_until < now():
+            pending.delete_expired()
+            raise self.model.DoesNotExist('The request is expired')
+        return pending
+
+
+LiveManager = Manager.from_queryset(LiveQuerySet)  # pylint: disable=invalid-name
+
+
+class ExpiringModelMixin:  # pylint: disable=too-few-public-methods
+    """
+    Delete an expired request
+    """
+
+    def delete_expired(self):
+        """
+        Delete the expired request
+        """
+        self.delete()
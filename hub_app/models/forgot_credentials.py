@@ -8,10 +8,11 @@ from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
 from hub_app.authlib.forgot_credentials import get_recovery_max_validity, RECOVERY_CHOICES, get_recovery_key
+from hub_app.models.expiry import ExpiringModelMixin, LiveManager
 from hub_app.models.users import HubUser
 
 
-class PendingCredentialRecovery(Model):
+class PendingCredentialRecovery(ExpiringModelMixin, Model):
     """
     Keep Information about Credential Recovery
     """
@@ -26,8 +27,11 @@ class PendingCredentialRecovery(Model):
     user = OneToOneField(HubUser, unique=True, verbose_name=_('User'), blank=False, null=False, on_delete=CASCADE)
     recovery_type = CharField(max_length=16, choices=RECOVERY_CHOICES, null=False, blank=False)
     created = DateTimeField(_('Created'), blank=False, null=False, default=now)
-    valid_until = DateTimeField(_('Valid Until'), blank=False, null=False, default=get_recovery_max_validity)
+    valid_until = DateTimeField(_('Valid Until'), blank=False, null=False, db_index=True,
+                                default=get_recovery_max_validity)
     key = CharField(_('Credential Recovery Key'), max_length=255, blank=False, null=False, default=get_recovery_key)
 
+    objects = LiveManager()
+
     def __str__(self):
         return '{} ({})'.format(str(self.uuid), self.user.username)
@@ -8,10 +8,11 @@ from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
 from hub_app.accountlib.email import get_email_max_validity, get_email_key
+from hub_app.models.expiry import ExpiringModelMixin, LiveManager
 from hub_app.models.users import HubUser
 
 
-class PendingEMailChange(Model):
+class PendingEMailChange(ExpiringModelMixin, Model):
     """
     Keep Information about an E-Mail-Change
     """
@@ -26,8 +27,11 @@ class PendingEMailChange(Model):
     user = OneToOneField(HubUser, unique=True, verbose_name=_('User'), blank=False, null=False, on_delete=CASCADE)
     new_email = EmailField(null=False, blank=False)
     created = DateTimeField(_('Created'), blank=False, null=False, default=now)
-    valid_until = DateTimeField(_('Valid Until'), blank=False, null=False, default=get_email_max_validity)
+    valid_until = DateTimeField(_('Valid Until'), blank=False, null=False, db_index=True,
+                                default=get_email_max_validity)
     key = CharField(_('E_Mail Change Key'), max_length=255, blank=False, null=False, default=get_email_key)
 
+    objects = LiveManager()
+
     def __str__(self):
         return '{} ({})'.format(str(self.uuid), self.user.username)
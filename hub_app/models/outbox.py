@@ -0,0 +1,42 @@
+"""
+Models for the outbound E-Mails
+"""
+from uuid import uuid4
+
+from django.db.models import Model, UUIDField, DateTimeField, CharField, TextField, PositiveIntegerField
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxMail(Model):
+    """
+    An E-Mail waiting to be delivered by the "sendoutbox" command
+    """
+
+    class Meta:
+        verbose_name = _('Outbox E-Mail')
+        verbose_name_plural = _('Outbox E-Mails')
+        default_permissions = ('change', 'delete')
+        permissions = ()
+
+    uuid = UUIDField(_('UUID'), primary_key=True, blank=False, null=False, default=uuid4)
+    created = DateTimeField(_('Created'), blank=False, null=False, default=now)
+    from_email = CharField(_('From'), max_length=255, blank=False, null=False)
+    recipients = TextField(_('Recipients'), blank=False, null=False)
+    subject = CharField(_('Subject'), max_length=255, blank=False, null=False)
+    body = TextField(_('Body'), blank=True, null=False)
+    attempts = PositiveIntegerField(_('Attempts'), blank=False, null=False, default=0)
+    next_attempt = DateTimeField(_('Next Attempt'), blank=True, null=True, default=now, db_index=True)
+    last_error = TextField(_('Last Error'), blank=True, null=False, default='')
+
+    def get_recipients(self) -> list:
+        """
+        Get the recipients as list
+
+        :rtype: list
+        :returns: The E-Mail addresses of the recipients
+        """
+        return self.recipients.split('\n')
+
+    def __str__(self):
+        return '{} ({})'.format(str(self.uuid), self.subject)
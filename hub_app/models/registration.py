@@ -8,12 +8,13 @@ from django.utils.timezone import now
 
 from django.utils.translation import gettext_lazy as _
 
+from hub_app.models.expiry import ExpiringModelMixin, LiveManager
 from hub_app.models.users import HubUser
 from hub_app.reglib.key import get_registration_key
 from hub_app.reglib.validity import get_registration_max_validity
 
 
-class PendingRegistration(Model):
+class PendingRegistration(ExpiringModelMixin, Model):
     """
     Store pending Registrations
     """
@@ -27,8 +28,17 @@ class PendingRegistration(Model):
     uuid = UUIDField(_('UUID'), primary_key=True, blank=False, null=False, default=uuid4)
     user = OneToOneField(HubUser, unique=True, verbose_name=_('User'), blank=False, null=False, on_delete=CASCADE)
     created = DateTimeField(_('Created'), blank=False, null=False, default=now)
-    valid_until = DateTimeField(_('Valid Until'), blank=False, null=False, default=get_registration_max_validity)
+    valid_until = DateTimeField(_('Valid Until'), blank=False, null=False, db_index=True,
+                                default=get_registration_max_validity)
     key = CharField(_('Registration Key'), max_length=255, blank=False, null=False, default=get_registration_key)
 
+    objects = LiveManager()
+
+    def delete_expired(self):
+        """
+        Delete the user of the expired registration, like "cleanpendingregistrations" does
+        """
+        self.user.delete()
+
     def __str__(self):
         return '{} ({})'.format(str(self.uuid), self.user.username)
@@ -5,12 +5,14 @@ from typing import Optional
 from uuid import uuid4
 
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db.models import BinaryField, Model, UUIDField, ForeignKey, CASCADE, CharField, DateTimeField
 from django.utils.timezone import now
 
 from django.utils.translation import gettext_lazy as _
 
 from hub_app.authlib.crypt import SymmetricCrypt
+from hub_app.authlib.totp.qr_cache import invalidate_qr_codes
 from hub_app.authlib.totp.token import create_encrypted_random_totp_secret
 
 
@@ -26,6 +28,50 @@ class HubUser(AbstractUser):
         help_text=_('Encrypted TOTP Secret')
     )
 
+    username_normalized = CharField(
+        _('Normalized Username'),
+        max_length=150, blank=True, null=False, default='', db_index=True, editable=False,
+        help_text=_('Lowercase username for the lookups, maintained on save')
+    )
+
+    email_normalized = CharField(
+        _('Normalized E-Mail Address'),
+        max_length=254, blank=True, null=False, default='', db_index=True, editable=False,
+        help_text=_('Lowercase E-Mail address for the lookups, maintained on save')
+    )
+
+    NORMALIZED_FIELDS = {
+        'username': 'username_normalized',
+        'email': 'email_normalized',
+    }
+
+    def clean(self):
+        """
+        Usernames are unique ignoring the case, as the login ignores the case
+        """
+        super().clean()
+        username_normalized = str(self.username or '').lower()
+        if username_normalized and HubUser._default_manager.filter(
+                username_normalized=username_normalized
+        ).exclude(pk=self.pk).exists():
+            raise ValidationError({'username': _('A user with that username already exists.')})
+
+    def save(self, *args, **kwargs):
+        """
+        Save the user, with the normalized username and E-Mail address
+        """
+        deferred = self.get_deferred_fields()
+        update_fields = kwargs.get('update_fields')
+        for field_name, normalized_name in HubUser.NORMALIZED_FIELDS.items():
+            if field_name in deferred:
+                continue
+            setattr(self, normalized_name, str(getattr(self, field_name) or '').lower())
+            if update_fields is not None and field_name in update_fields and normalized_name not in update_fields:
+                update_fields = list(update_fields) + [normalized_name]
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def set_totp_secret(self, secret: bytes):
         """
         Set the TOTP Secret
@@ -39,6 +85,7 @@ class HubUser(AbstractUser):
         if len(secret) > 96:
             raise ValueError(_('Secret must not be larger than 96 bytes'))
         self.totp_secret = SymmetricCrypt().encrypt(secret)
+        invalidate_qr_codes(self.username)
 
     def get_totp_secret(self) -> Optional[bytes]:
         """
@@ -74,7 +121,7 @@ class BurnedOtp(Model):
     uuid = UUIDField(_('UUID'), primary_key=True, blank=False, null=False, default=uuid4)
     user = ForeignKey(HubUser, verbose_name=_('User'), blank=False, null=False, on_delete=CASCADE)
     token = CharField(_('OTP Token'), max_length=6, blank=False, null=False)
-    burned_timestamp = DateTimeField(_('Burned Date/Time'), blank=False, null=False, default=now)
+    burned_timestamp = DateTimeField(_('Burned Date/Time'), blank=False, null=False, default=now, db_index=True)
 
     def __str__(self):
         return '{} ({})'.format(self.token, self.user.username)
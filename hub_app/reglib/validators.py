@@ -4,7 +4,7 @@ Validators during registration process
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
-from hub_app.models import HubUser
+from hub_app.accountlib.lookups import users_by_username
 
 
 def validate_unique_username(value):
@@ -16,5 +16,5 @@ def validate_unique_username(value):
     username = str(value).strip().lower()
     if len(username) <= 3:
         raise ValidationError(_('This username is currently not available'))
-    if HubUser.objects.filter(username__iexact=username).exists():
+    if users_by_username(username).exists():
         raise ValidationError(_('"%(value)s" is currently not available'), params={'value': value})
@@ -0,0 +1,114 @@
+"""
+Cached, database-backed sessions with write coalescing and an optional local L1 layer
+
+Use with SESSION_ENGINE = 'hub_app.sessionlib.cached_db'. The sessions are written to the database and the cache
+SESSION_CACHE_ALIAS. If SESSION_L1_SIZE is greater than 0, the most recently used sessions are additionally kept in the
+memory of the process for SESSION_L1_TIMEOUT seconds. Other processes don't see the L1 layer, so only enable it for a
+single process or with sticky sessions.
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from hub_app.sessionlib.coalescing import CoalescingSessionMixin
+
+
+_L1_LOCK = Lock()
+_L1 = OrderedDict()  # type: OrderedDict[str, Tuple[float, bytes]]
+
+
+def _l1_get(session_key: str) -> Optional[bytes]:
+    """
+    Get the serialized session data from the L1 layer
+
+    :param str session_key: The session key
+    :rtype: Optional[bytes]
+    :returns: The serialized session data, None if unknown or expired
+    """
+    with _L1_LOCK:
+        entry = _L1.get(session_key, None)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _L1[session_key]
+            return None
+        _L1.move_to_end(session_key)
+        return entry[1]
+
+
+def _l1_set(session_key: str, data: bytes):
+    """
+    Put serialized session data in the L1 layer, the least recently used sessions are dropped
+
+    :param str session_key: The session key
+    :param bytes data: The serialized session data
+    """
+    size = getattr(settings, 'SESSION_L1_SIZE', 0)
+    if size < 1:
+        return
+    with _L1_LOCK:
+        _L1[session_key] = (time.monotonic() + settings.SESSION_L1_TIMEOUT, data)
+        _L1.move_to_end(session_key)
+        while len(_L1) > size:
+            _L1.popitem(last=False)
+
+
+def _l1_delete(session_key: str):
+    """
+    Drop a session from the L1 layer
+
+    :param str session_key: The session key
+    """
+    with _L1_LOCK:
+        _L1.pop(session_key, None)
+
+
+def clear_l1():
+    """
+    Drop all sessions from the L1 layer
+    """
+    with _L1_LOCK:
+        _L1.clear()
+
+
+@receiver(setting_changed)
+def _reset_l1(setting: str, **kwargs):  # pylint: disable=unused-argument
+    """
+    Start over if the L1 layer is configured differently
+    """
+    if setting in ('SESSION_L1_SIZE', 'SESSION_L1_TIMEOUT'):
+        clear_l1()
+
+
+class SessionStore(CoalescingSessionMixin, CachedDBStore):
+    """
+    The Django cached_db session store, with an L1 layer in front and without saving unchanged sessions
+    """
+
+    def load(self) -> dict:
+        if self.session_key is not None:
+            data = _l1_get(self.session_key)
+            if data is not None:
+                self._stored_data = data
+                return self.serializer().loads(data)
+        session_dict = super().load()
+        if self.session_key is not None and self._stored_data is not None and session_dict:
+            _l1_set(self.session_key, self._stored_data)
+        return session_dict
+
+    def save(self, must_create: bool = False):
+        super().save(must_create)
+        if self.session_key is not None and self._stored_data is not None:
+            _l1_set(self.session_key, self._stored_data)
+
+    def delete(self, session_key: Optional[str] = None):
+        key = session_key if session_key is not None else self.session_key
+        if key is not None:
+            _l1_delete(key)
+        super().delete(session_key)
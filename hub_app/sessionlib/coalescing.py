@@ -0,0 +1,96 @@
+"""
+Write coalescing for sessions
+
+Messages and the CSRF token live in the session, so many requests mark the session as modified without changing it.
+The session stores of the hub remember what is stored and skip the save if the session data is still the same.
+"""
+import time
+from typing import Optional
+
+from django.utils.timezone import now
+
+
+class CoalescingSessionMixin:
+    """
+    Skip saving sessions that did not change since they were loaded (or saved)
+
+    Must be mixed in before the Django session store.
+    """
+
+    _stored_data = None  # type: Optional[bytes]
+
+    def serialize(self, session_dict: dict) -> bytes:
+        """
+        Serialize the session data, without signing or compressing, for the comparison
+
+        :param dict session_dict: The session data
+        :rtype: bytes
+        :returns: The serialized data
+        """
+        return self.serializer().dumps(session_dict)
+
+    def load(self) -> dict:
+        """
+        Load the session and remember what is stored
+        """
+        session_dict = super().load()
+        self._stored_data = self.serialize(session_dict)
+        return session_dict
+
+    def is_unchanged(self) -> bool:
+        """
+        Check if the session data is the same as in the store
+
+        :rtype: bool
+        :returns: True, if saving the session would not change anything
+        """
+        if self.session_key is None or self._stored_data is None:
+            return False
+        return self.serialize(self._get_session()) == self._stored_data
+
+    def save(self, must_create: bool = False):
+        """
+        Save the session, if anything changed
+        """
+        if not must_create and self.is_unchanged():
+            return
+        super().save(must_create)
+        self._stored_data = self.serialize(self._get_session(no_load=must_create))
+
+    def delete(self, session_key: Optional[str] = None):
+        """
+        Delete the session, nothing is stored anymore
+        """
+        if session_key is None or session_key == self.session_key:
+            self._stored_data = None
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired_in_batches(cls, batch_size: int = 1000, pause: float = 0) -> int:
+        """
+        Delete the expired sessions from the database in batches, each batch with its own short DELETE
+
+        :param int batch_size: Maximum number of sessions per DELETE
+        :param float pause: Seconds to pause between two batches
+        :rtype: int
+        :returns: The number of deleted sessions
+        """
+        sessions = cls.get_model_class().objects
+        current_time = now()
+        deleted = 0
+        while True:
+            keys = list(
+                sessions.filter(expire_date__lt=current_time).values_list('session_key', flat=True)[:batch_size]
+            )
+            if len(keys) < 1:
+                return deleted
+            deleted += sessions.filter(session_key__in=keys).delete()[0]
+            if pause > 0:
+                time.sleep(pause)
+
+    @classmethod
+    def clear_expired(cls):
+        """
+        Delete the expired sessions in batches
+        """
+        cls.clear_expired_in_batches()
@@ -0,0 +1,14 @@
+"""
+Database-backed sessions with write coalescing
+
+Use with SESSION_ENGINE = 'hub_app.sessionlib.db'.
+"""
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from hub_app.sessionlib.coalescing import CoalescingSessionMixin
+
+
+class SessionStore(CoalescingSessionMixin, DBStore):
+    """
+    The Django database session store, but unchanged sessions are not saved
+    """
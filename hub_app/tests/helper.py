@@ -2,10 +2,13 @@
 Test Helper Collection
 """
 from django.conf import settings
+from django.core import mail
 from selenium.webdriver import FirefoxProfile
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxWebDriver
 
+from hub_app.maillib.outbox import deliver_outbox
+
 
 def firefox_webdriver_factory(accept_language: str = 'en-us, en') -> FirefoxWebDriver:
     """
@@ -22,3 +25,11 @@ def firefox_webdriver_factory(accept_language: str = 'en-us, en') -> FirefoxWebD
     selenium.implicitly_wait(15)
 
     return selenium
+
+
+def sent_mails() -> list:
+    """
+    Deliver the outbox of the hub and get the test outbox of Django
+    """
+    deliver_outbox()
+    return mail.outbox  # pylint: disable=no-member
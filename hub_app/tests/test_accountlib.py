@@ -1,10 +1,18 @@
 """
 Tests for the Account Lib
 """
-from django.test import SimpleTestCase, tag
+from base64 import b32encode
+from io import BytesIO
+from zipfile import ZipFile
+
+from django.test import SimpleTestCase, TestCase, tag
 from django.utils.timezone import now
 
 from hub_app.accountlib.email import get_email_key, get_email_max_validity
+from hub_app.accountlib.enrollment import format_secret, get_sheet_labels, render_enrollment_sheet, \
+    stream_enrollment_zip
+from hub_app.authlib.crypt import SymmetricCrypt
+from hub_app.models import HubUser
 
 
 class EMailChangeKeyGenerationTest(SimpleTestCase):
@@ -44,3 +52,45 @@ class EMailChangeValidityTest(SimpleTestCase):
         No need to test the datetime package...
         """
         self.assertGreater(get_email_max_validity(), now())
+
+
+class EnrollmentSheetTest(TestCase):
+    """
+    Test the export of the enrollment sheets
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            user = HubUser.objects.create_user(username='mr_enroll_{}'.format(i), first_name='Enroll', last_name=str(i))
+            user.set_totp_secret('SUPERSECRETSUPER-SUPERSECRETSUPER-{}'.format(i).encode('us-ascii'))
+            user.save()
+        HubUser.objects.create_user(username='mr_no_secret', totp_secret=None)
+
+    def test_sheet(self):
+        """
+        The sheet shows name, username and the grouped secret
+        """
+        secret = b'SUPERSECRETSUPER-SUPERSECRETSUPER-0'
+        username, sheet = render_enrollment_sheet(
+            get_sheet_labels(), 'mr_enroll_0', 'Enroll & Co', SymmetricCrypt().encrypt(secret)
+        )
+        sheet = sheet.decode('utf-8')
+        self.assertEqual('mr_enroll_0', username)
+        self.assertIn('Enroll &amp; Co', sheet)
+        self.assertIn(format_secret(b32encode(secret).decode('us-ascii')), sheet)
+        self.assertEqual('ABCD EFGH IJ', format_secret('ABCDEFGHIJ'))
+
+    def test_zip(self):
+        """
+        The archive is the same with and without worker processes, users without secret are skipped
+        """
+        archives = []
+        for workers in (0, 1):
+            with self.subTest(workers=workers):
+                parts = list(stream_enrollment_zip(HubUser.objects.all(), workers))
+                self.assertGreater(len(parts), 5)
+                with ZipFile(BytesIO(b''.join(parts))) as archive:
+                    self.assertEqual(['mr_enroll_{}.svg'.format(i) for i in range(5)], archive.namelist())
+                    archives.append([archive.read(name) for name in archive.namelist()])
+        self.assertEqual(archives[0], archives[1])
@@ -1,9 +1,17 @@
 """
 Tests for the authentication backend
 """
-from django.test import TestCase, RequestFactory
+from time import monotonic
+from unittest.mock import patch
 
-from hub_app.authlib.backend import TotpAuthenticationBackend
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from hub_app.authlib.backend import TotpAuthenticationBackend, get_dummy_password_hash
+from hub_app.authlib.hashing import HashingPool, check_and_rehash_password
 from hub_app.authlib.totp.token import get_possible_otps
 from hub_app.models.users import HubUser
 
@@ -434,3 +442,156 @@ class InactiveUserTest(TestCase):
                 one_time_pw=get_possible_otps(b'SUPERSECRETSUPER-SUPERSECRETSUPER', 0, 0)[0]
             )
         )
+
+
+class TimingMitigationTest(TestCase):
+    """
+    Test the configurable timing attack mitigation
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = HubUser.objects.create(
+            username='mr_right',
+            is_active=True,
+        )
+        cls.user.set_password('right_pass')  # nosec
+        cls.user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        cls.user.save()
+        cls.request_factory = RequestFactory()
+
+    def _authenticate(self, username: str):
+        return TotpAuthenticationBackend().authenticate(  # nosec
+            self.request_factory.get('/'),
+            username=username,
+            password='right_pass',
+            one_time_pw='123456'
+        )
+
+    def _authenticate_and_record_hashes(self, username: str):
+        with patch.object(HashingPool, 'run', autospec=True, side_effect=lambda pool, func, *args: func(*args)) as run:
+            self.assertIsNone(self._authenticate(username))
+        return [call_args[0][1:] for call_args in run.call_args_list]
+
+    @override_settings(LOGIN_TIMING_MITIGATION='dummy_hash')
+    def test_dummy_hash_for_unknown_user(self):
+        """
+        An unknown user costs exactly one password check against the dummy hash
+        """
+        hashes = self._authenticate_and_record_hashes('mr_unknown')
+        self.assertEqual([(check_and_rehash_password, 'right_pass', get_dummy_password_hash())], hashes)
+        self.assertTrue(identify_hasher(get_dummy_password_hash()))
+
+    @override_settings(LOGIN_TIMING_MITIGATION='dummy_hash')
+    def test_no_dummy_hash_for_known_user(self):
+        """
+        A known user costs only the check of the own password
+        """
+        hashes = self._authenticate_and_record_hashes('mr_right')
+        self.assertEqual([(check_and_rehash_password, 'right_pass', self.user.password)], hashes)
+
+    @override_settings(LOGIN_TIMING_MITIGATION='random_hashes')
+    def test_random_hashes(self):
+        """
+        The former behaviour is still available
+        """
+        hashes = self._authenticate_and_record_hashes('mr_unknown')
+        made = [func for func, *_args in hashes if func is make_password]
+        self.assertGreaterEqual(len(made), 1)
+        self.assertLessEqual(len(made), 4)
+        self.assertEqual(len(made) + 1, len(hashes))
+
+    @override_settings(LOGIN_TIMING_MITIGATION='padding', LOGIN_TIMING_PADDING=0.2)
+    def test_padding(self):
+        """
+        Even formally invalid attempts take at least the padding time
+        """
+        started = monotonic()
+        self.assertIsNone(TotpAuthenticationBackend().authenticate(
+            self.request_factory.get('/'), username='mr_right', password='right_pass', one_time_pw='1'
+        ))
+        self.assertGreaterEqual(monotonic() - started, 0.2)
+
+    @override_settings(LOGIN_TIMING_MITIGATION='unknown')
+    def test_unknown_mitigation(self):
+        """
+        Configuration errors are reported
+        """
+        self.assertRaises(ImproperlyConfigured, self._authenticate, 'mr_right')
+
+    @override_settings(LOGIN_TIMING_MITIGATION='padding', LOGIN_TIMING_PADDING=10)
+    def test_explicit_parameters(self):
+        """
+        Parameters given to the backend win over the settings
+        """
+        pool = HashingPool(workers=0, max_pending=1, wait=0)
+        backend = TotpAuthenticationBackend(mitigation='padding', padding=0, hashing_pool=pool)
+        with patch.object(pool, 'check_password', wraps=pool.check_password) as check_password:
+            started = monotonic()
+            self.assertIsNone(backend.authenticate(
+                self.request_factory.get('/'), username='mr_unknown', password='right_pass', one_time_pw='123456'
+            ))
+            self.assertLess(monotonic() - started, 10)
+        check_password.assert_called_once_with('right_pass', get_dummy_password_hash())
+        self.assertRaises(ValueError, TotpAuthenticationBackend, mitigation='unknown')
+
+    def test_dummy_hash_follows_hasher(self):
+        """
+        The dummy hash is created with the current default hasher
+        """
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            self.assertEqual('md5', identify_hasher(get_dummy_password_hash()).algorithm)
+        self.assertEqual('argon2', identify_hasher(get_dummy_password_hash()).algorithm)
+
+
+class QueryTest(TestCase):
+    """
+    Only the needed columns are loaded
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create(
+            username='mr_right', first_name='Right', last_name='Mr', email='mr_right@example.com', is_active=True
+        )
+        cls.user.set_password('right_pass')  # nosec
+        cls.user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        cls.user.save()
+
+    def test_login_with_one_query(self):
+        """
+        The login reads the user and the secret with one query, without unneeded columns
+        """
+        otp = get_possible_otps(b'SUPERSECRETSUPER-SUPERSECRETSUPER', 0, 0)[0]
+        with CaptureQueriesContext(connection) as queries:
+            user = TotpAuthenticationBackend().authenticate(
+                RequestFactory().get('/'), username='mr_right', password='right_pass', one_time_pw=otp
+            )
+        self.assertEqual(self.user, user)
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(1, len(selects))
+        self.assertIn('"totp_secret"', selects[0])
+        self.assertNotIn('"email"', selects[0])
+        with self.assertNumQueries(0):
+            self.assertEqual('Right', user.first_name)
+            self.assertTrue(user.get_session_auth_hash())
+
+    def test_get_user_without_secret(self):
+        """
+        The user of the session is loaded without the TOTP secret, it is only loaded on access
+        """
+        with CaptureQueriesContext(connection) as queries:
+            user = TotpAuthenticationBackend().get_user(self.user.pk)
+        self.assertEqual(self.user, user)
+        self.assertEqual(1, len(queries.captured_queries))
+        self.assertNotIn('"totp_secret"', queries.captured_queries[0]['sql'])
+        with self.assertNumQueries(1):
+            self.assertEqual(b'SUPERSECRETSUPER-SUPERSECRETSUPER', user.get_totp_secret())
+
+    def test_get_user_unknown_or_inactive(self):
+        """
+        Unknown or inactive users have no session
+        """
+        self.assertIsNone(TotpAuthenticationBackend().get_user(self.user.pk + 1000))
+        HubUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(TotpAuthenticationBackend().get_user(self.user.pk))
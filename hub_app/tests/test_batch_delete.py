@@ -0,0 +1,92 @@
+"""
+Tests for the batched deletion of the clean up commands
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from hub_app.maintenancelib.batch_delete import BatchDeleter
+from hub_app.models import HubUser, BurnedOtp, PendingRegistration
+
+
+class BatchDeleteTest(TestCase):
+    """
+    Delete in batches
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create(username='mr_batch')
+        for i in range(10):
+            BurnedOtp.objects.create(
+                user=cls.user, token=str(100000 + i),
+                burned_timestamp=now() - timedelta(hours=3 if i < 7 else 1)
+            )
+
+    def test_fast_delete(self):
+        """
+        Without cascades, primary key ranges are deleted without loading the rows
+        """
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('cleanburnedotp', '--batch-size=3', '--sleep=0', stdout=out)
+        self.assertRegex(out.getvalue(), r'Deleted 7 burned OTPs in [0-9.]+ seconds \([0-9]+ per second\)\.')
+        self.assertEqual(3, BurnedOtp.objects.count())
+        deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(3, len(deletes))
+        for delete in deletes:
+            self.assertIn('>=', delete)
+            self.assertNotIn(' IN (', delete)
+        self.assertEqual([], [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and '"token"' in query['sql']
+        ])
+
+    def test_cascade(self):
+        """
+        With cascades, the related objects are deleted batch by batch
+        """
+        for i in range(5):
+            user = HubUser.objects.create(username='mr_pending_{}'.format(i))
+            PendingRegistration.objects.create(user=user, valid_until=now() - timedelta(seconds=1))
+            BurnedOtp.objects.create(user=user, token='123456')
+        self.assertFalse(BatchDeleter(HubUser.objects.all()).can_fast_delete)
+        out = StringIO()
+        call_command('cleanpendingregistrations', '--batch-size=2', '--sleep=0', stdout=out)
+        self.assertIn('Deleted 5 user accounts with expired registrations', out.getvalue())
+        self.assertEqual(['mr_batch'], list(HubUser.objects.values_list('username', flat=True)))
+        self.assertEqual(0, PendingRegistration.objects.count())
+        self.assertEqual(10, BurnedOtp.objects.count())
+
+    def test_dry_run(self):
+        """
+        A dry run only counts
+        """
+        out = StringIO()
+        call_command('cleanburnedotp', '--dry-run', stdout=out)
+        self.assertIn('Would delete 7 burned OTPs.', out.getvalue())
+        self.assertEqual(10, BurnedOtp.objects.count())
+
+    def test_max_runtime(self):
+        """
+        The deletion stops after the maximum runtime, another run continues
+        """
+        expired = BurnedOtp.objects.filter(burned_timestamp__lt=now() - timedelta(hours=2))
+        result = BatchDeleter(expired, batch_size=3, max_runtime=0).run()
+        self.assertEqual(3, result.deleted)
+        self.assertFalse(result.complete)
+        result = BatchDeleter(expired, batch_size=3).run()
+        self.assertEqual(4, result.deleted)
+        self.assertTrue(result.complete)
+        self.assertGreater(result.rate, 0)
+
+    def test_batch_size(self):
+        """
+        The batch size must be positive
+        """
+        self.assertRaises(CommandError, call_command, 'cleanpendingrecoveries', '--batch-size=0', stdout=StringIO())
@@ -0,0 +1,59 @@
+"""
+Tests for the "benchmarklogin" command
+"""
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import SimpleTestCase, TestCase
+
+from hub_app.management.commands.benchmarklogin import get_percentile
+from hub_app.models import HubUser
+
+
+class BenchmarkLoginTest(TestCase):
+    """
+    Measure the login
+    """
+
+    def test_benchmark(self):
+        """
+        Every mitigation is reported, the benchmark user is gone afterwards
+        """
+        out = StringIO()
+        call_command('benchmarklogin', '--attempts=2', '--padding=0', stdout=out)
+        for mitigation in ('dummy_hash', 'padding', 'random_hashes'):
+            with self.subTest(mitigation=mitigation):
+                self.assertRegex(
+                    out.getvalue(), r'{}: p50 [0-9.]+ ms, p90 [0-9.]+ ms, p99 [0-9.]+ ms, max [0-9.]+ ms, CPU'.format(
+                        mitigation
+                    )
+                )
+        self.assertFalse(HubUser.objects.filter(username__startswith='benchmark_').exists())
+
+    def test_invalid_attempts(self):
+        """
+        At least one attempt is needed
+        """
+        self.assertRaises(CommandError, call_command, 'benchmarklogin', '--attempts=0', stdout=StringIO())
+
+
+class PercentileTest(SimpleTestCase):
+    """
+    Nearest-rank percentiles
+    """
+
+    def test_percentile(self):
+        """
+        Test some ranks
+        """
+        values = [float(i) for i in range(1, 21)]
+        test_items = (
+            # percentile, expected
+            (50, 10.0),
+            (90, 18.0),
+            (99, 20.0),
+            (1, 1.0),
+        )
+        for percentile, expected in test_items:
+            with self.subTest(percentile=percentile):
+                self.assertEqual(expected, get_percentile(values, percentile))
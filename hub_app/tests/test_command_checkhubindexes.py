@@ -0,0 +1,149 @@
+"""
+Tests for the "checkhubindexes" command
+"""
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.apps import apps
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, SimpleTestCase
+
+from hub_app.accountlib.lookups import get_duplicate_usernames, users_by_username, users_by_email
+from hub_app.maintenancelib.indexes import find_sequential_scans
+from hub_app.models import HubUser
+
+
+class CheckHubIndexesTest(TestCase):
+    """
+    Check the migrated test database
+    """
+
+    def test_passed(self):
+        """
+        All hot queries use an index
+        """
+        out = StringIO()
+        call_command('checkhubindexes', stdout=out)
+        self.assertNotIn('sequential scan', out.getvalue())
+        self.assertRegex(out.getvalue().strip(), r'(Done).{0,10}$')
+
+    def test_missing_index(self):
+        """
+        A missing index is reported with the query plan
+        """
+        if connection.vendor != 'sqlite':  # pragma: no cover  # The tests run on SQLite
+            self.skipTest('Only for SQLite')
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, HubUser._meta.db_table)
+            index_name = next(
+                name for name, constraint in constraints.items()
+                if constraint['index'] and constraint['columns'] == ['username_normalized']
+            )
+            cursor.execute('DROP INDEX {}'.format(connection.ops.quote_name(index_name)))
+        out = StringIO()
+        self.assertRaises(CommandError, call_command, 'checkhubindexes', stdout=out)
+        self.assertIn('username availability... sequential scan on hub_app_hubuser', out.getvalue())
+
+    def test_lookups(self):
+        """
+        The lookups ignore the case
+        """
+        HubUser.objects.create(username='mr_lookup', email='Mr_Lookup@Example.com')
+        self.assertEqual(['mr_lookup'], list(users_by_username('MR_LOOKUP').values_list('username', flat=True)))
+        self.assertEqual(['mr_lookup'], list(
+            users_by_email('mr_lookup@example.com').values_list('username', flat=True)
+        ))
+        self.assertFalse(users_by_username('mr_lookup_2').exists())
+
+
+class NormalizedColumnsTest(TestCase):
+    """
+    The normalized username and E-Mail address follow the user
+    """
+
+    def test_save(self):
+        """
+        Saving the user updates the normalized columns, also with "update_fields"
+        """
+        user = HubUser.objects.create(username='Mr_Normal', email='Mr_Normal@Example.com')
+        user.refresh_from_db()
+        self.assertEqual(('mr_normal', 'mr_normal@example.com'), (user.username_normalized, user.email_normalized))
+        user.email = 'Other@Example.com'
+        user.save(update_fields=['email'])
+        user.refresh_from_db()
+        self.assertEqual('other@example.com', user.email_normalized)
+        user = HubUser.objects.only('pk', 'first_name').get(pk=user.pk)
+        user.first_name = 'Normal'
+        user.save()
+        user.refresh_from_db()
+        self.assertEqual(('mr_normal', 'other@example.com'), (user.username_normalized, user.email_normalized))
+
+    def test_backfill(self):
+        """
+        The migration fills the columns of the existing users in batches
+        """
+        migration = import_module('hub_app.migrations.0008_normalized_user_columns')
+        for i in range(5):
+            HubUser.objects.create(username='Mr_Backfill_{}'.format(i), email='Mr_Backfill_{}@Example.com'.format(i))
+        HubUser.objects.update(username_normalized='', email_normalized='')
+        with patch.object(migration, 'BACKFILL_BATCH_SIZE', 2):
+            migration.backfill_normalized_columns(apps, SimpleNamespace(connection=connection))
+        self.assertFalse(HubUser.objects.filter(username_normalized='').exists())
+        for i in range(5):
+            with self.subTest(user=i):
+                self.assertEqual(1, users_by_username('MR_BACKFILL_{}'.format(i), users_by_email(
+                    'mr_backfill_{}@example.com'.format(i)
+                )).count())
+
+    def test_duplicate_usernames(self):
+        """
+        Users that only differ in the case of their usernames are found, also by the migration
+        """
+        migration = import_module('hub_app.migrations.0008_normalized_user_columns')
+        HubUser.objects.create(username='mr_twin')
+        self.assertEqual([], get_duplicate_usernames())
+        migration.check_duplicate_usernames(apps, SimpleNamespace(connection=connection))
+        HubUser.objects.create(username='Mr_Twin')
+        self.assertEqual(['mr_twin'], get_duplicate_usernames())
+        self.assertRaisesRegex(
+            ValueError, 'mr_twin', migration.check_duplicate_usernames, apps, SimpleNamespace(connection=connection)
+        )
+
+    def test_clean(self):
+        """
+        A new user must not only differ in the case of the username
+        """
+        HubUser.objects.create(username='mr_twin')
+        HubUser(username='mr_other').clean()
+        self.assertRaises(ValidationError, HubUser(username='Mr_Twin').clean)
+        HubUser.objects.get(username='mr_twin').clean()
+
+
+class FindSequentialScansTest(SimpleTestCase):
+    """
+    Read the query plans of the databases
+    """
+
+    def test_plans(self):
+        """
+        Sequential scans are found in the plans of every supported database
+        """
+        test_items = (
+            ('sqlite', '2 0 0 SCAN hub_app_hubuser', ['hub_app_hubuser']),
+            ('sqlite', '2 0 0 SCAN TABLE hub_app_hubuser', ['hub_app_hubuser']),
+            ('sqlite', '3 0 0 SEARCH hub_app_hubuser USING INDEX hub_app_hubuser_username_normalized_69f7b996 '
+                       '(username_normalized=?)', []),
+            ('postgresql', 'Seq Scan on hub_app_burnedotp  (cost=0.00..1.01 rows=1 width=60)', ['hub_app_burnedotp']),
+            ('postgresql', 'Index Scan using hub_app_burnedotp_burned_timestamp on hub_app_burnedotp', []),
+            ('mysql', '{"table": {"table_name": "hub_app_hubuser", "access_type": "ALL"}}', ['hub_app_hubuser']),
+            ('mysql', '{"table": {"table_name": "hub_app_hubuser", "access_type": "ref"}}', []),
+            ('oracle', 'TABLE ACCESS FULL', []),
+        )
+        for vendor, plan, expected in test_items:
+            with self.subTest(vendor=vendor, plan=plan):
+                self.assertEqual(expected, find_sequential_scans(vendor, plan))
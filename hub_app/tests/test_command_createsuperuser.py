@@ -100,6 +100,23 @@ class CreateSuperUserFromCommandLineTest(TestCase):
                 stdout=out
             )
 
+    def test_duplicate_ignoring_case(self):
+        """
+        The username is also taken if it only differs in the case, the login ignores the case
+        """
+        HubUser.objects.create_user(username='Test_User_Mixed')
+        with StringIO() as out:
+            self.assertRaisesRegex(  # nosec
+                CommandError,
+                r'(The\suser\s"test_user_mixed"\salready\sexists\.).{0,10}$',
+                call_command,
+                createsuperuser.Command(),
+                username='Test_User_Mixed',
+                password='12Test34$56oO.',
+                secret='SUPERSECRETSUPERSUPERSECRETSUPERSUPERSECRETSUPERSUPERSECRETSUPER',
+                stdout=out
+            )
+
 
 class CreateSuperUserFromUserInputTest(TestCase):
     """
@@ -8,6 +8,7 @@ from django.core.management import call_command, CommandError
 from django.test import override_settings, SimpleTestCase, TestCase
 
 from hub_app.management.commands import preflightcheck
+from hub_app.models import HubUser
 
 
 class PreflightcheckCommandTest(TestCase):
@@ -101,3 +102,22 @@ class PreflightcheckChecksTest(SimpleTestCase):
         """
         with redirect_stdout(StringIO()):
             self.assertTrue(preflightcheck.Command().check_allowed_hosts())
+
+
+class PreflightcheckDatabaseChecksTest(TestCase):
+    """
+    Test for the checks that require a database connection
+    """
+
+    def test_unique_usernames(self):
+        """
+        Test that the check fails if two users only differ in the case of their usernames
+        """
+        HubUser.objects.create(username='mr_twin')
+        with redirect_stdout(StringIO()):
+            self.assertTrue(preflightcheck.Command().check_unique_usernames())
+        HubUser.objects.create(username='Mr_Twin')
+        err = StringIO()
+        with redirect_stdout(StringIO()):
+            self.assertFalse(preflightcheck.Command(stderr=err).check_unique_usernames())
+        self.assertIn('mr_twin', err.getvalue())
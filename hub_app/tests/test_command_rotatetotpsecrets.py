@@ -0,0 +1,131 @@
+"""
+Tests for the "rotatetotpsecrets" command
+"""
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from cryptography.fernet import InvalidToken
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+
+from hub_app.authlib.crypt import SymmetricCrypt
+from hub_app.management.commands import rotatetotpsecrets
+from hub_app.models import HubUser
+
+OLD_SECRET = 'THE_OLD_SECRET_USED_FOR_THE_KEY_ROTATION_TEST_0000000000'  # nosec
+NEW_SECRET = 'THE_NEW_SECRET_USED_FOR_THE_KEY_ROTATION_TEST_1111111111'  # nosec
+
+
+def _secret_for(index: int) -> bytes:
+    return 'SECRET-FOR-USER-{:04d}-SECRET-FOR-USER-{:04d}'.format(index, index).encode('us-ascii')
+
+
+class RotateTotpSecretsTest(TestCase):
+    """
+    Re-encrypt the secrets with a new primary key
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with override_settings(TOTP_SECRET_KEYRING=[OLD_SECRET]):
+            for i in range(7):
+                user = HubUser.objects.create(username='mr_rotate_{}'.format(i))
+                user.set_totp_secret(_secret_for(i))
+                user.save()
+        HubUser.objects.create(username='mr_rotate_without_secret', totp_secret=None)
+
+    def _assert_readable_with(self, secret: str, readable: bool):
+        with override_settings(TOTP_SECRET_KEYRING=[secret]):
+            for i in range(7):
+                user = HubUser.objects.get(username='mr_rotate_{}'.format(i))
+                if readable:
+                    self.assertEqual(_secret_for(i), user.get_totp_secret())
+                else:
+                    self.assertRaises(InvalidToken, user.get_totp_secret)
+
+    def test_rotation(self):
+        """
+        After the rotation, the old key is not needed anymore
+        """
+        self._assert_readable_with(NEW_SECRET, False)
+        with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET, OLD_SECRET]):
+            with StringIO() as out:
+                call_command(rotatetotpsecrets.Command(), batch_size=3, sleep=0, stdout=out)
+                self.assertRegex(out.getvalue().strip(), r'(Done).{0,10}$')
+        self._assert_readable_with(NEW_SECRET, True)
+        self._assert_readable_with(OLD_SECRET, False)
+        self.assertIsNone(HubUser.objects.get(username='mr_rotate_without_secret').totp_secret)
+
+    def test_resume_from_checkpoint(self):
+        """
+        Users before the checkpoint are not touched, the checkpoint is removed afterwards
+        """
+        first_user_id = HubUser.objects.get(username='mr_rotate_0').id
+        with TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'rotation.checkpoint')
+            with open(checkpoint, 'w') as checkpoint_file:
+                checkpoint_file.write(str(first_user_id))
+            with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET, OLD_SECRET]):
+                with StringIO() as out:
+                    call_command(rotatetotpsecrets.Command(), sleep=0, checkpoint=checkpoint, stdout=out)
+                    self.assertIn('Resuming after user id {}'.format(first_user_id), out.getvalue())
+            self.assertFalse(os.path.exists(checkpoint))
+        with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET]):
+            self.assertRaises(InvalidToken, HubUser.objects.get(id=first_user_id).get_totp_secret)
+            self.assertEqual(_secret_for(1), HubUser.objects.get(username='mr_rotate_1').get_totp_secret())
+
+    def test_undecryptable_secret(self):
+        """
+        Secrets that can't be decrypted are reported, but all others are rotated
+        """
+        with override_settings(TOTP_SECRET_KEYRING=['A_SECRET_THAT_IS_NOT_PART_OF_THE_KEYRING_LATER_2222222222']):
+            HubUser.objects.create(username='mr_rotate_lost', totp_secret=SymmetricCrypt().encrypt(_secret_for(99)))
+        with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET, OLD_SECRET]):
+            with StringIO() as out, StringIO() as err:
+                self.assertRaisesMessage(
+                    CommandError,
+                    '1 TOTP secrets could not be decrypted with the keyring.',
+                    call_command, rotatetotpsecrets.Command(), sleep=0, stdout=out, stderr=err
+                )
+                self.assertIn('mr_rotate_lost', err.getvalue())
+        self._assert_readable_with(NEW_SECRET, True)
+
+    def test_invalid_batch_size(self):
+        """
+        The batch size must be positive
+        """
+        with StringIO() as out:
+            self.assertRaisesMessage(
+                CommandError, 'The batch size must be at least 1',
+                call_command, rotatetotpsecrets.Command(), batch_size=0, stdout=out
+            )
+
+
+class KeyringTest(TestCase):
+    """
+    Test the keyring handling of the symmetric crypt
+    """
+
+    def test_old_keys_can_decrypt(self):
+        """
+        Items encrypted with an older key stay readable
+        """
+        with override_settings(TOTP_SECRET_KEYRING=[OLD_SECRET]):
+            encrypted = SymmetricCrypt().encrypt(b'JustAString')
+        with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET, OLD_SECRET]):
+            self.assertEqual(b'JustAString', SymmetricCrypt().decrypt(encrypted))
+            rotated = SymmetricCrypt().rotate(encrypted)
+        with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET]):
+            self.assertRaises(InvalidToken, SymmetricCrypt().decrypt, encrypted)
+            self.assertEqual(b'JustAString', SymmetricCrypt().decrypt(rotated))
+
+    def test_empty_keyring_uses_secret_key(self):
+        """
+        Without a keyring, the SECRET_KEY is used
+        """
+        with override_settings(TOTP_SECRET_KEYRING=[]):
+            encrypted = SymmetricCrypt().encrypt(b'JustAString')
+        with override_settings(TOTP_SECRET_KEYRING=[NEW_SECRET]):
+            self.assertRaises(InvalidToken, SymmetricCrypt().decrypt, encrypted)
+        self.assertEqual(b'JustAString', SymmetricCrypt().decrypt(encrypted))
@@ -0,0 +1,159 @@
+"""
+Tests for the maintenance scheduler and the "runhubmaintenance" command
+"""
+import json
+import os
+from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection, OperationalError
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from hub_app.maintenancelib.lock import AdvisoryLock
+from hub_app.maintenancelib.scheduler import MaintenanceScheduler, TaskRun
+from hub_app.models import HubUser, BurnedOtp
+
+
+class FakeClock:  # pylint: disable=too-few-public-methods
+    """
+    Clock for the tests
+    """
+
+    def __init__(self):
+        self.time = 1000.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+class MaintenanceTest(TestCase):
+    """
+    Run the maintenance tasks
+    """
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.lock_file = os.path.join(self.directory.name, 'maintenance.lock')
+        self.metrics_file = os.path.join(self.directory.name, 'metrics.jsonl')
+        settings = override_settings(
+            MAINTENANCE_LOCK_FILE=self.lock_file, MAINTENANCE_METRICS_FILE=self.metrics_file,
+            MAINTENANCE_TASKS={'cleanburnedotp': 600, 'clearsessions': 3600}
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        user = HubUser.objects.create(username='mr_maintenance')
+        BurnedOtp.objects.create(user=user, token='123456', burned_timestamp=now() - timedelta(hours=3))
+
+    def _scheduler(self, tasks: dict, clock: FakeClock) -> MaintenanceScheduler:
+        return MaintenanceScheduler(tasks, AdvisoryLock('test', lock_file=self.lock_file), clock=clock)
+
+    def test_once(self):
+        """
+        All tasks run, the timings are written to the metrics file
+        """
+        out = StringIO()
+        call_command('runhubmaintenance', '--once', stdout=out)
+        self.assertRegex(out.getvalue(), r'cleanburnedotp: [0-9.]+ seconds')
+        self.assertRegex(out.getvalue(), r'clearsessions: [0-9.]+ seconds')
+        self.assertEqual(0, BurnedOtp.objects.count())
+        with open(self.metrics_file, encoding='utf-8') as metrics:
+            records = [json.loads(line) for line in metrics]
+        self.assertEqual(['cleanburnedotp', 'clearsessions'], [record['task'] for record in records])
+        for record in records:
+            self.assertIsNone(record['error'])
+            self.assertGreaterEqual(record['seconds'], 0)
+
+    def test_locked(self):
+        """
+        While another node holds the lock, nothing runs
+        """
+        other_node = AdvisoryLock('maintenance', lock_file=self.lock_file)
+        self.assertTrue(other_node.acquire())
+        self.addCleanup(other_node.release)
+        out = StringIO()
+        call_command('runhubmaintenance', '--once', stdout=out)
+        self.assertIn('Another node is running the maintenance.', out.getvalue())
+        self.assertEqual(1, BurnedOtp.objects.count())
+        self.assertFalse(os.path.exists(self.metrics_file))
+
+    def test_lock(self):
+        """
+        The lock is exclusive and can be taken again after the release
+        """
+        first = AdvisoryLock('maintenance', lock_file=self.lock_file)
+        second = AdvisoryLock('maintenance', lock_file=self.lock_file)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+    def test_intervals(self):
+        """
+        Every task runs at its own interval
+        """
+        clock = FakeClock()
+        scheduler = self._scheduler({'fast': 10, 'slow': 30}, clock)
+        test_items = (
+            # seconds since start, expected tasks to run
+            (0, ['fast', 'slow']),
+            (5, []),
+            (10, ['fast']),
+            (25, ['fast']),
+            (30, ['slow']),
+            (35, ['fast']),
+        )
+        with patch.object(MaintenanceScheduler, 'run_task', side_effect=lambda name: TaskRun(name, '', 0, None, '')):
+            for seconds, expected in test_items:
+                with self.subTest(seconds=seconds):
+                    clock.time = 1000.0 + seconds
+                    self.assertEqual(expected, [run.name for run in scheduler.run_due()])
+        self.assertEqual(10.0, scheduler.get_wait())
+
+    def test_failing_task(self):
+        """
+        A failing task is recorded and does not stop the others
+        """
+        scheduler = self._scheduler({'nosuchcommand': 60, 'cleanburnedotp': 60}, FakeClock())
+        runs = scheduler.run_due()
+        self.assertEqual(['nosuchcommand', 'cleanburnedotp'], [run.name for run in runs])
+        self.assertIn('CommandError', runs[0].error)
+        self.assertIsNone(runs[1].error)
+        self.assertEqual(0, BurnedOtp.objects.count())
+
+    def test_connection(self):
+        """
+        A broken or obsolete database connection is closed before every run, so the run connects again
+        """
+        scheduler = self._scheduler({'fast': 10}, FakeClock())
+        with patch.object(MaintenanceScheduler, 'run_task', side_effect=lambda name: TaskRun(name, '', 0, None, '')), \
+                patch.object(connection, 'close_if_unusable_or_obsolete') as close:
+            scheduler.run_due()
+            scheduler.next_runs['fast'] = 0
+            scheduler.run_due()
+        self.assertEqual(2, close.call_count)
+
+    def test_database_error(self):
+        """
+        A database outage is logged and does not stop the scheduler
+        """
+        scheduler = self._scheduler({'fast': 10}, FakeClock())
+        stop = Event()
+        waits = []
+
+        def wait(seconds: float):
+            waits.append(seconds)
+            stop.set()
+
+        with patch.object(MaintenanceScheduler, 'run_due', side_effect=OperationalError('Gone')), \
+                patch.object(stop, 'wait', side_effect=wait), \
+                self.assertLogs('hub_app.maintenance', level='ERROR') as logs:
+            scheduler.run_forever(stop, max_wait=30)
+        self.assertEqual([30], waits)
+        self.assertIn('OperationalError: Gone', logs.output[0])
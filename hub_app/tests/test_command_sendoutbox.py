@@ -0,0 +1,137 @@
+"""
+Tests for the E-Mail outbox and the "sendoutbox" command
+"""
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPServerDisconnected
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from hub_app.maillib.outbox import queue_mail, get_retry_delay, deliver_outbox
+from hub_app.models import OutboxMail, HubUser
+
+
+def _queue(count: int):
+    for i in range(count):
+        queue_mail(['user{}@example.com'.format(i)], 'test@example.com', 'Subject {}'.format(i), 'Body {}'.format(i))
+
+
+@override_settings(EMAIL_OUTBOX_RETRY_DELAY=60, EMAIL_OUTBOX_MAX_RETRY_DELAY=600, EMAIL_OUTBOX_MAX_ATTEMPTS=3)
+class SendOutboxTest(TestCase):
+    """
+    Deliver the outbox
+    """
+
+    def test_delivery(self):
+        """
+        Delivered E-Mails leave the outbox
+        """
+        _queue(5)
+        out = StringIO()
+        call_command('sendoutbox', '--batch-size=2', stdout=out)
+        self.assertIn('Sent 5 E-Mails, 0 failed.', out.getvalue())
+        self.assertEqual(0, OutboxMail.objects.count())
+        self.assertEqual(
+            ['Subject {}'.format(i) for i in range(5)], sorted(message.subject for message in mail.outbox)
+        )
+        self.assertEqual(['user0@example.com'], mail.outbox[0].to)
+        self.assertEqual('test@example.com', mail.outbox[0].from_email)
+
+    def test_one_connection_per_batch(self):
+        """
+        Every batch is sent over one connection
+        """
+        _queue(5)
+        with patch.object(EmailBackend, 'open', autospec=True) as open_connection:
+            self.assertEqual((5, 0), deliver_outbox(2))
+        self.assertEqual(3, open_connection.call_count)
+
+    def test_retry(self):
+        """
+        A failed E-Mail is tried again later, with growing delays, until it is given up
+        """
+        _queue(1)
+        with patch.object(EmailBackend, 'send_messages', side_effect=SMTPServerDisconnected('Gone')):
+            for attempts in (1, 2):
+                with self.subTest(attempts=attempts):
+                    self.assertEqual((0, 1), deliver_outbox())
+                    outbox_mail = OutboxMail.objects.get()
+                    self.assertEqual(attempts, outbox_mail.attempts)
+                    self.assertEqual('SMTPServerDisconnected: Gone', outbox_mail.last_error)
+                    self.assertEqual('Body 0', outbox_mail.body)
+                    self.assertGreater(outbox_mail.next_attempt, now() + get_retry_delay(attempts) - timedelta(5))
+                    self.assertEqual((0, 0), deliver_outbox())  # Not due yet
+                    OutboxMail.objects.update(next_attempt=now())
+            self.assertEqual((0, 1), deliver_outbox())
+        outbox_mail = OutboxMail.objects.get()
+        self.assertEqual(3, outbox_mail.attempts)
+        self.assertIsNone(outbox_mail.next_attempt)
+        self.assertEqual('', outbox_mail.body)
+        self.assertEqual((0, 0), deliver_outbox())
+        self.assertEqual(0, len(mail.outbox))
+
+    def test_connection_failure(self):
+        """
+        If no connection can be opened, the whole batch is tried again later
+        """
+        _queue(2)
+        with patch.object(EmailBackend, 'open', side_effect=ConnectionRefusedError('Refused')):
+            self.assertEqual((0, 2), deliver_outbox())
+        self.assertEqual([1, 1], list(OutboxMail.objects.values_list('attempts', flat=True)))
+
+    def test_retry_delay(self):
+        """
+        The delay doubles up to the maximum
+        """
+        test_items = ((1, 60), (2, 120), (3, 240), (4, 480), (5, 600), (10, 600))
+        for attempts, expected in test_items:
+            with self.subTest(attempts=attempts):
+                self.assertEqual(timedelta(seconds=expected), get_retry_delay(attempts))
+
+    def test_lease(self):
+        """
+        Claimed E-Mails are not claimed again while they are sent
+        """
+        _queue(1)
+        claimed = []
+
+        def send_messages(backend, messages):  # pylint: disable=unused-argument
+            claimed.append(deliver_outbox())
+            return len(messages)
+
+        with patch.object(EmailBackend, 'send_messages', autospec=True, side_effect=send_messages):
+            self.assertEqual((1, 0), deliver_outbox())
+        self.assertEqual([(0, 0)], claimed)
+
+    def test_batch_size(self):
+        """
+        The batch size must be positive
+        """
+        self.assertRaises(CommandError, call_command, 'sendoutbox', '--batch-size=0', stdout=StringIO())
+
+
+class QueuedInTransactionTest(TestCase):
+    """
+    The views only queue their E-Mails
+    """
+
+    def test_registration(self):
+        """
+        The registration queues the E-Mail, nothing is sent within the request
+        """
+        response = self.client.post(reverse('ha:reg:step.1'), {
+            'username': 'mr_queued', 'email': 'mr_queued@example.com', 'first_name': 'Queued', 'last_name': 'Mail'
+        })
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0, len(mail.outbox))
+        outbox_mail = OutboxMail.objects.get()
+        self.assertEqual('mr_queued@example.com', outbox_mail.recipients)
+        self.assertTrue(HubUser.objects.filter(username='mr_queued').exists())
+        self.assertEqual((1, 0), deliver_outbox())
+        self.assertEqual(['mr_queued@example.com'], mail.outbox[0].to)
@@ -0,0 +1,120 @@
+"""
+Tests for the "tuneargon2" command and the tuned Argon2 hasher
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, get_hasher, identify_hasher, make_password
+from django.core.management import call_command, CommandError
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+
+from hub_app.authlib.backend import TotpAuthenticationBackend
+from hub_app.authlib.totp.token import get_otp
+from hub_app.management.commands.tuneargon2 import Command
+from hub_app.models import HubUser
+
+OTP_SECRET = b'SUPERSECRETSUPER-SUPERSECRETSUPER'
+
+
+def _fake_measure(time_cost: int, memory_cost: int, *_args) -> float:
+    """
+    Pretend one iteration over 1 MiB takes 10 ms
+    """
+    return time_cost * memory_cost / 1024 * 0.01
+
+
+class TuneArgon2Test(SimpleTestCase):
+    """
+    Measuring the parameters
+    """
+
+    def _call(self, *args) -> str:
+        out = StringIO()
+        call_command('tuneargon2', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_real_measurement(self):
+        """
+        Small parameters are measured for real
+        """
+        out = self._call('--memory-budget=1', '--workers=1', '--parallelism=1', '--max-time-cost=2', '--rounds=1')
+        self.assertIn('ARGON2_TIME_COST = ', out)
+        self.assertIn('ARGON2_PARALLELISM = 1', out)
+        self.assertIn('password hashes per second', out)
+
+    def test_choice(self):
+        """
+        The memory is reduced until one iteration fits, then the iterations are raised as far as possible
+        """
+        test_items = (
+            # target, workers, budget, expected time cost, expected memory cost
+            (250, 1, 16, 1, 16384),  # One more iteration would be too slow
+            (250, 4, 16, 6, 4096),  # The budget is shared by the workers
+            (100, 1, 64, 1, 8192),  # Too much memory for the target, it is halved until it fits
+            (1000, 1, 1, 15, 1024),  # Up to the maximum time cost
+            (100, 1, 4, 2, 4096),
+        )
+        for target, workers, budget, expected_time_cost, expected_memory_cost in test_items:
+            with self.subTest(target=target, workers=workers, budget=budget), \
+                    patch.object(Command, 'measure', side_effect=_fake_measure):
+                out = self._call(
+                    '--target-ms={}'.format(target), '--workers={}'.format(workers),
+                    '--memory-budget={}'.format(budget), '--parallelism=1', '--max-time-cost=15'
+                )
+                self.assertIn('ARGON2_TIME_COST = {}\n'.format(expected_time_cost), out)
+                self.assertIn('ARGON2_MEMORY_COST = {}\n'.format(expected_memory_cost), out)
+
+    def test_invalid_arguments(self):
+        """
+        Only positive numbers make sense
+        """
+        for argument in ('--target-ms=0', '--workers=-1', '--memory-budget=0', '--rounds=0'):
+            with self.subTest(argument=argument):
+                self.assertRaises(CommandError, self._call, argument)
+
+
+@override_settings(ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024, ARGON2_PARALLELISM=1)
+class TunedArgon2PasswordHasherTest(TestCase):
+    """
+    The hasher uses the parameters from the settings, and outdated hashes are upgraded on login
+    """
+
+    def test_parameters(self):
+        """
+        The parameters are part of the hash
+        """
+        encoded = make_password('right_pass')
+        self.assertIn('$m=1024,t=1,p=1$', encoded)
+        self.assertFalse(get_hasher().must_update(encoded))
+        with override_settings(ARGON2_TIME_COST=2):
+            self.assertTrue(get_hasher().must_update(encoded))
+            self.assertIn('$m=1024,t=2,p=1$', make_password('right_pass'))
+
+    def test_django_defaults(self):
+        """
+        Without settings, the hashes of Django's Argon2 hasher stay valid
+        """
+        with override_settings(ARGON2_TIME_COST=None, ARGON2_MEMORY_COST=None, ARGON2_PARALLELISM=None):
+            django_hasher = Argon2PasswordHasher()
+            self.assertFalse(get_hasher().must_update(django_hasher.encode('right_pass', django_hasher.salt())))
+
+    def test_upgrade_on_login(self):
+        """
+        A successful login replaces a hash with other parameters
+        """
+        with override_settings(ARGON2_TIME_COST=2, ARGON2_MEMORY_COST=2048):
+            user = HubUser.objects.create_user(username='mr_outdated', password='right_pass')  # nosec
+        user.set_totp_secret(OTP_SECRET)
+        user.save()
+        self.assertIn('$m=2048,t=2,p=1$', user.password)
+        request = RequestFactory().get('/')
+        self.assertIsNone(TotpAuthenticationBackend().authenticate(
+            request, username='mr_outdated', password='wrong_pass', one_time_pw=get_otp(OTP_SECRET)
+        ))
+        self.assertIn('$m=2048,t=2,p=1$', HubUser.objects.get(pk=user.pk).password)
+        self.assertEqual(user, TotpAuthenticationBackend().authenticate(
+            request, username='mr_outdated', password='right_pass', one_time_pw=get_otp(OTP_SECRET)
+        ))
+        upgraded = HubUser.objects.get(pk=user.pk).password
+        self.assertIn('$m=1024,t=1,p=1$', upgraded)
+        self.assertEqual('argon2', identify_hasher(upgraded).algorithm)
@@ -7,7 +7,6 @@ from json import loads
 from urllib.parse import unquote
 
 from bs4 import BeautifulSoup
-from django.core import mail
 from django.core.signing import Signer
 from django.http import HttpResponse
 from django.test import TestCase
@@ -17,6 +16,7 @@ from hub_app.authlib.crypt import SymmetricCrypt
 from hub_app.authlib.forgot_credentials import get_recovery_key
 from hub_app.authlib.totp.token import get_otp
 from hub_app.models import HubUser, PendingRegistration, PendingCredentialRecovery
+from hub_app.tests.helper import sent_mails
 
 
 class CredentialRecoverySmokeTest(TestCase):
@@ -145,8 +145,8 @@ class BasicRecoveryTest(TestCase):
         """
         self.__check_screen_message(response)
         self.assertEqual(1, PendingCredentialRecovery.objects.count())
-        self.assertEqual(1, len(mail.outbox))
-        recovery_mail = mail.outbox[0]
+        self.assertEqual(1, len(sent_mails()))
+        recovery_mail = sent_mails()[0]
         self.assertTrue('Hi {}!'.format(first_name) in str(recovery_mail.body))
         self.assertEqual(email, ''.join(recovery_mail.to))
         extract_link_regex = re.compile(r'.*(?P<url>http(s)?://.*step-3.*?)\s.*', re.MULTILINE | re.UNICODE | re.DOTALL)
@@ -160,7 +160,7 @@ class BasicRecoveryTest(TestCase):
         """
         self.__check_screen_message(response)
         self.assertEqual(0, PendingCredentialRecovery.objects.count())
-        self.assertEqual(0, len(mail.outbox))
+        self.assertEqual(0, len(sent_mails()))
 
     def _check_no_success_duplicate(self, response: HttpResponse):
         """
@@ -168,7 +168,7 @@ class BasicRecoveryTest(TestCase):
         """
         self.__check_screen_message_duplicate(response)
         self.assertEqual(0, PendingCredentialRecovery.objects.count())
-        self.assertEqual(0, len(mail.outbox))
+        self.assertEqual(0, len(sent_mails()))
 
     def __extract_link(self, link: str):
         """
@@ -1,9 +1,10 @@
 """
 Testing the Symmetric Crypt Methods
 """
-from django.test import SimpleTestCase
+from cryptography.fernet import InvalidToken
+from django.test import SimpleTestCase, override_settings
 
-from hub_app.authlib.crypt import SymmetricCrypt
+from hub_app.authlib.crypt import SymmetricCrypt, get_cipher_suite, get_key_material
 
 
 class SymmetricCryptTest(SimpleTestCase):
@@ -28,3 +29,62 @@ class SymmetricCryptTest(SimpleTestCase):
                 self.assertNotEqual(test_item, encrypted_test_item)
                 self.assertIsNotNone(encrypted_test_item)
                 self.assertIsNotNone(decrypted_test_item)
+
+
+class CipherRegistryTest(SimpleTestCase):
+    """
+    Test the process-wide Cipher Suite registry
+    """
+
+    def test_cipher_is_reused(self):
+        """
+        Two instances share the same Cipher Suite
+        """
+        self.assertIs(SymmetricCrypt().cipher_suite, SymmetricCrypt().cipher_suite)
+
+    def test_cipher_follows_secret_key(self):
+        """
+        A changed SECRET_KEY leads to another Cipher Suite
+        """
+        encrypted = SymmetricCrypt().encrypt(b'JustAString')
+        with override_settings(SECRET_KEY='ANOTHER_SECRET_KEY_THAT_IS_LONG_ENOUGH_FOR_THE_TEST_0000000'):  # nosec
+            self.assertRaises(InvalidToken, SymmetricCrypt().decrypt, encrypted)
+        self.assertEqual(b'JustAString', SymmetricCrypt().decrypt(encrypted))
+
+    def test_registry_is_cleared_on_setting_change(self):
+        """
+        Changing the SECRET_KEY drops the cached Cipher Suites
+        """
+        cipher_suite = SymmetricCrypt().cipher_suite
+        with override_settings(SECRET_KEY='ANOTHER_SECRET_KEY_THAT_IS_LONG_ENOUGH_FOR_THE_TEST_0000000'):  # nosec
+            self.assertIsNot(cipher_suite, SymmetricCrypt().cipher_suite)
+        self.assertIsNot(cipher_suite, SymmetricCrypt().cipher_suite)
+        self.assertIs(get_cipher_suite(get_key_material()), SymmetricCrypt().cipher_suite)
+
+
+class BulkCryptTest(SimpleTestCase):
+    """
+    Test the bulk API
+    """
+
+    def test_many_in_out(self):
+        """
+        Encrypt and decrypt many items at once
+        """
+        test_items = [
+            b'DSJFBSHDFBSMDBFMJERFSMDNBVMSESjhdfkshdfhjkeskjedfnskdj',
+            b'SUPER-SECRET-SUPER-SECRET-MEGA-SECRET-MORE-SECRET-EVEN-MORE',
+            b'JustAString',
+        ]
+        crypt = SymmetricCrypt()
+        encrypted_items = crypt.encrypt_many(test_items)
+        self.assertEqual(len(test_items), len(encrypted_items))
+        self.assertEqual(test_items, crypt.decrypt_many(encrypted_items))
+        self.assertEqual(test_items, [crypt.decrypt(item) for item in encrypted_items])
+
+    def test_many_empty(self):
+        """
+        Nothing in, nothing out
+        """
+        self.assertEqual([], SymmetricCrypt().encrypt_many([]))
+        self.assertEqual([], SymmetricCrypt().decrypt_many(iter([])))
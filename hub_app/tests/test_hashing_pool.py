@@ -0,0 +1,163 @@
+"""
+Tests for the password hashing pool
+"""
+import asyncio
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password, identify_hasher
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from hub_app.authlib.hashing import HashingPool, HashingPoolSaturated, check_and_rehash_password, \
+    get_hashing_pool, check_user_password, set_user_password
+from hub_app.authlib.totp.token import get_otp
+from hub_app.models.users import HubUser
+
+
+class HashingPoolTest(SimpleTestCase):
+    """
+    Hashing inline and in worker processes
+    """
+
+    def test_make_and_check(self):
+        """
+        Both modes create valid hashes and check them
+        """
+        for workers in (0, 1):
+            with self.subTest(workers=workers):
+                pool = HashingPool(workers, 2, 1)
+                try:
+                    encoded = pool.make_password('right_pass')
+                    self.assertEqual('argon2', identify_hasher(encoded).algorithm)
+                    self.assertEqual((True, None), pool.check_password('right_pass', encoded))
+                    self.assertEqual((False, None), pool.check_password('wrong_pass', encoded))
+                finally:
+                    pool.shutdown()
+
+    def test_async(self):
+        """
+        The async entry points give the same results
+        """
+        for workers in (0, 1):
+            with self.subTest(workers=workers):
+                pool = HashingPool(workers, 2, 1)
+                try:
+                    loop = asyncio.new_event_loop()
+                    try:
+                        encoded = loop.run_until_complete(pool.amake_password('right_pass'))
+                        self.assertEqual(
+                            (True, None), loop.run_until_complete(pool.acheck_password('right_pass', encoded))
+                        )
+                    finally:
+                        loop.close()
+                finally:
+                    pool.shutdown()
+
+    @override_settings(PASSWORD_HASHERS=[
+        'hub_app.authlib.hashers.TunedArgon2PasswordHasher', 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+    ])
+    def test_rehash(self):
+        """
+        An outdated hash is replaced only if the password is correct
+        """
+        encoded = make_password('right_pass', hasher='pbkdf2_sha256')
+        correct, new_encoded = check_and_rehash_password('right_pass', encoded)
+        self.assertTrue(correct)
+        self.assertEqual('argon2', identify_hasher(new_encoded).algorithm)
+        self.assertEqual((False, None), check_and_rehash_password('wrong_pass', encoded))
+
+    def test_saturation(self):
+        """
+        Without a free slot, the pool gives up after the configured wait
+        """
+        pool = HashingPool(0, 1, 0.01)
+        pool._acquire()  # pylint: disable=protected-access
+        try:
+            with self.assertRaises(HashingPoolSaturated):
+                pool.make_password('right_pass')
+            loop = asyncio.new_event_loop()
+            try:
+                with self.assertRaises(HashingPoolSaturated):
+                    loop.run_until_complete(pool.amake_password('right_pass'))
+            finally:
+                loop.close()
+        finally:
+            pool._slots.release()  # pylint: disable=protected-access
+        self.assertTrue(pool.make_password('right_pass'))
+
+    def test_configuration(self):
+        """
+        The pool follows the settings
+        """
+        with override_settings(PASSWORD_HASHING_WORKERS=0, PASSWORD_HASHING_WAIT=0.25):
+            pool = get_hashing_pool()
+            self.assertIs(pool, get_hashing_pool())
+            self.assertEqual(0, pool.workers)
+            self.assertEqual(0.25, pool.wait)
+        self.assertIsNot(pool, get_hashing_pool())
+
+
+class UserPasswordTest(TestCase):
+    """
+    Setting and checking user passwords through the pool
+    """
+
+    def test_set_and_check(self):
+        """
+        The user is usable with the normal Django API as well
+        """
+        user = HubUser(username='mr_right')
+        set_user_password(user, 'right_pass')
+        user.save()
+        self.assertTrue(user.check_password('right_pass'))
+        self.assertTrue(check_user_password(user, 'right_pass'))
+        self.assertFalse(check_user_password(user, 'wrong_pass'))
+
+    def test_unusable_password(self):
+        """
+        Users without password never match
+        """
+        user = HubUser.objects.create(username='mr_unusable')
+        user.set_unusable_password()
+        user.save()
+        with patch.object(HashingPool, 'run') as run:
+            self.assertFalse(check_user_password(user, 'right_pass'))
+            run.assert_not_called()
+
+    @override_settings(PASSWORD_HASHERS=[
+        'hub_app.authlib.hashers.TunedArgon2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'
+    ])
+    def test_upgrade_outdated_hash(self):
+        """
+        An outdated hash is upgraded on a successful check
+        """
+        user = HubUser.objects.create(username='mr_outdated', password=make_password('right_pass', hasher='md5'))
+        self.assertFalse(check_user_password(user, 'wrong_pass'))
+        self.assertEqual('md5', identify_hasher(HubUser.objects.get(pk=user.pk).password).algorithm)
+        self.assertTrue(check_user_password(user, 'right_pass'))
+        self.assertEqual('argon2', identify_hasher(HubUser.objects.get(pk=user.pk).password).algorithm)
+
+
+class SaturatedLoginTest(TestCase):
+    """
+    A saturated pool is answered fast with "429 Too Many Requests"
+    """
+
+    otp_secret = b's0methingSecr3tKes$ToUseInTestAndAlsoExtraLong!'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create_user(username='mr_right', password='right_pass')  # nosec
+        cls.user.set_totp_secret(cls.otp_secret)
+        cls.user.save()
+
+    def test_login(self):
+        """
+        Login with a saturated pool
+        """
+        with patch.object(HashingPool, '_acquire', side_effect=HashingPoolSaturated()):
+            response = self.client.post('/hub/auth/login', {
+                'username': 'mr_right', 'password': 'right_pass', 'otp': get_otp(self.otp_secret)
+            })
+        self.assertEqual(429, response.status_code)
+        self.assertEqual('5', response['Retry-After'])
+        self.assertNotIn('_auth_user_id', self.client.session)
@@ -0,0 +1,247 @@
+"""
+Tests for the login rate limiting
+"""
+import os
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from bs4 import BeautifulSoup
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+
+from hub_app.authlib.backend import TotpAuthenticationBackend
+from hub_app.authlib.hashing import HashingPool
+from hub_app.authlib.ratelimit import BaseRateLimitStore, MemoryRateLimitStore, SqliteRateLimitStore, \
+    CacheRateLimitStore, RateLimiter, get_client_ip, get_rate_limiter
+from hub_app.authlib.totp.token import get_otp
+from hub_app.models import HubUser
+
+OTP_SECRET = b'SUPERSECRETSUPER-SUPERSECRETSUPER'
+
+
+class RateLimitStoreTestMixin:
+    """
+    Tests every store has to pass
+    """
+
+    def create_store(self) -> BaseRateLimitStore:
+        """
+        Create the store to test
+        """
+        raise NotImplementedError()
+
+    def test_counts(self):
+        """
+        Only the previous and the current window are reported
+        """
+        store = self.create_store()
+        self.assertEqual((0, 0), store.get_counts('ip:a', 10))
+        for window, times in ((8, 4), (9, 2), (10, 3)):
+            for _ in range(times):
+                store.increment('ip:a', window, 60)
+        store.increment('ip:b', 10, 60)
+        self.assertEqual((2, 3), store.get_counts('ip:a', 10))
+        self.assertEqual((3, 0), store.get_counts('ip:a', 11))
+        self.assertEqual((0, 1), store.get_counts('ip:b', 10))
+
+    def test_reset(self):
+        """
+        A reset only affects the given key
+        """
+        store = self.create_store()
+        store.increment('ip:a', 9, 60)
+        store.increment('ip:a', 10, 60)
+        store.increment('ip:b', 10, 60)
+        store.reset('ip:a', 10)
+        self.assertEqual((0, 0), store.get_counts('ip:a', 10))
+        self.assertEqual((0, 1), store.get_counts('ip:b', 10))
+
+
+class MemoryRateLimitStoreTest(RateLimitStoreTestMixin, SimpleTestCase):
+    """
+    Test the in-process store
+    """
+
+    def create_store(self) -> BaseRateLimitStore:
+        return MemoryRateLimitStore()
+
+    def test_expiry(self):
+        """
+        Counters that were not changed within their TTL are forgotten
+        """
+        store = MemoryRateLimitStore()
+        with patch('hub_app.authlib.ratelimit.time.time', return_value=1000.0):
+            store.increment('ip:a', 10, 60)
+        with patch('hub_app.authlib.ratelimit.time.time', return_value=1061.0):
+            store.increment('ip:b', 10, 60)
+        self.assertEqual((0, 0), store.get_counts('ip:a', 10))
+        self.assertEqual((0, 1), store.get_counts('ip:b', 10))
+
+
+class SqliteRateLimitStoreTest(RateLimitStoreTestMixin, SimpleTestCase):
+    """
+    Test the shared SQLite store
+    """
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def create_store(self) -> BaseRateLimitStore:
+        return SqliteRateLimitStore(os.path.join(self.directory.name, 'rate-limit.sqlite3'))
+
+    def test_shared(self):
+        """
+        Two stores on the same file see the same counters
+        """
+        self.create_store().increment('ip:a', 10, 60)
+        self.assertEqual((0, 1), self.create_store().get_counts('ip:a', 10))
+
+
+class CacheRateLimitStoreTest(RateLimitStoreTestMixin, SimpleTestCase):
+    """
+    Test the Django cache store
+    """
+
+    def setUp(self) -> None:
+        caches['default'].clear()
+
+    def create_store(self) -> BaseRateLimitStore:
+        return CacheRateLimitStore('default')
+
+
+class RateLimiterTest(SimpleTestCase):
+    """
+    Test the sliding window
+    """
+
+    def test_sliding_window(self):
+        """
+        Failures of the previous window count by the part that still overlaps with the sliding window
+        """
+        limiter = RateLimiter(MemoryRateLimitStore(), {'ip': (3, 100)})
+        keys = RateLimiter.get_keys(RequestFactory().get('/'), 'mr_right')
+        test_items = (
+            # time, failures to register, expected to be limited afterwards
+            (1000.0, 2, False),
+            (1050.0, 1, True),
+            (1100.0, 0, True),  # The previous window still counts completely
+            (1150.0, 0, False),  # Only half of the previous window counts
+            (1180.0, 2, False),  # 20 % of 3 plus 2 new ones
+            (1190.0, 1, True),  # 10 % of 3 plus 3 new ones
+            (1300.0, 0, False),
+        )
+        for current_time, failures, expected in test_items:
+            with self.subTest(time=current_time), patch.object(RateLimiter, 'now', return_value=current_time):
+                for _ in range(failures):
+                    limiter.register_failure(keys)
+                self.assertEqual(expected, limiter.is_limited(keys))
+
+    def test_keys(self):
+        """
+        The keys depend on the IP address and the username, but don't contain them
+        """
+        request = RequestFactory().get('/', REMOTE_ADDR='192.0.2.1')
+        keys = RateLimiter.get_keys(request, 'mr_right')
+        self.assertEqual({'ip', 'username', 'ip_username'}, set(keys.keys()))
+        self.assertNotIn('mr_right', ''.join(keys.values()))
+        self.assertNotIn('192.0.2.1', ''.join(keys.values()))
+        other_ip = RateLimiter.get_keys(RequestFactory().get('/', REMOTE_ADDR='192.0.2.2'), 'mr_right')
+        self.assertEqual(keys['username'], other_ip['username'])
+        self.assertNotEqual(keys['ip'], other_ip['ip'])
+        self.assertNotEqual(keys['ip_username'], other_ip['ip_username'])
+
+    def test_client_ip(self):
+        """
+        Behind proxies, the client address is taken from the header, counted from the right
+        """
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.1, 192.0.2.1')
+        self.assertEqual('10.0.0.1', get_client_ip(request))
+        with override_settings(LOGIN_RATE_LIMIT_CLIENT_IP_HEADER='HTTP_X_FORWARDED_FOR'):
+            self.assertEqual('192.0.2.1', get_client_ip(request))
+            with override_settings(LOGIN_RATE_LIMIT_TRUSTED_PROXIES=2):
+                self.assertEqual('198.51.100.1', get_client_ip(request))
+            with override_settings(LOGIN_RATE_LIMIT_TRUSTED_PROXIES=3):
+                self.assertEqual('10.0.0.1', get_client_ip(request))
+            self.assertEqual('10.0.0.1', get_client_ip(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')))
+
+    def test_configuration(self):
+        """
+        The limiter follows the settings
+        """
+        with override_settings(LOGIN_RATE_LIMITS={'username': [3, 60]},
+                               LOGIN_RATE_LIMIT_STORE='hub_app.authlib.ratelimit.CacheRateLimitStore'):
+            limiter = get_rate_limiter()
+            self.assertIs(limiter, get_rate_limiter())
+            self.assertIsInstance(limiter.store, CacheRateLimitStore)
+            self.assertEqual({'username': (3, 60)}, limiter.limits)
+        self.assertIsNot(limiter, get_rate_limiter())
+
+
+class RateLimitedLoginTest(TestCase):
+    """
+    Limited logins are rejected before any password hash
+    """
+
+    def setUp(self) -> None:
+        limits = override_settings(LOGIN_RATE_LIMITS={'ip_username': (2, 60), 'username': (4, 60)})
+        limits.enable()  # A fresh limiter for every test
+        self.addCleanup(limits.disable)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create_user(username='mr_right', password='right_pass')  # nosec
+        cls.user.set_totp_secret(OTP_SECRET)
+        cls.user.save()
+
+    def _authenticate(self, password: str, ip_address: str = '192.0.2.1'):
+        return TotpAuthenticationBackend().authenticate(
+            RequestFactory().get('/', REMOTE_ADDR=ip_address),
+            username='Mr_Right', password=password, one_time_pw=get_otp(OTP_SECRET)
+        )
+
+    def test_lockout(self):
+        """
+        After too many failures, even the right password is rejected without hashing
+        """
+        self.assertIsNone(self._authenticate('wrong_pass'))
+        self.assertIsNone(self._authenticate('wrong_pass'))
+        with patch.object(HashingPool, 'run') as run:
+            self.assertRaises(PermissionDenied, self._authenticate, 'right_pass')
+            run.assert_not_called()
+        self.assertIsNone(self._authenticate('wrong_pass', '192.0.2.2'))
+        self.assertIsNone(self._authenticate('wrong_pass', '192.0.2.3'))
+        with patch.object(HashingPool, 'run') as run:
+            self.assertRaises(PermissionDenied, self._authenticate, 'right_pass', '192.0.2.4')
+            run.assert_not_called()
+
+    def test_success_resets_pair(self):
+        """
+        A successful login forgets the failures of the pair of IP address and username
+        """
+        self.assertIsNone(self._authenticate('wrong_pass'))
+        self.assertEqual(self.user, self._authenticate('right_pass'))
+        self.assertIsNone(self._authenticate('wrong_pass'))
+        self.assertFalse(get_rate_limiter().is_limited(
+            RateLimiter.get_keys(RequestFactory().get('/', REMOTE_ADDR='192.0.2.1'), 'mr_right')
+        ))
+
+    def test_login_view(self):
+        """
+        The login page answers with "429 Too Many Requests"
+        """
+        for expected_status in (200, 200, 429):
+            response = self.client.post('/hub/auth/login', {
+                'username': 'mr_right', 'password': 'wrong_pass', 'otp': get_otp(OTP_SECRET)
+            })
+            self.assertEqual(expected_status, response.status_code)
+        soup = BeautifulSoup(response.content.decode('utf-8'), 'html.parser').find('form', attrs={
+            'data-ui-relevance': 'main-login'
+        }).find_next('div', attrs={
+            'role': 'alert',
+            'class': 'alert alert-danger'
+        })
+        self.assertEqual('Too many failed login attempts. Please try again later.', soup.text.strip())
@@ -0,0 +1,77 @@
+"""
+Tests for the registry of the E-Mail templates
+"""
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import translation
+
+from hub_app.maillib.templates import MAIL_TEMPLATES, MailTemplateRegistry, get_mail_templates, render_mail
+
+
+class MailTemplateRegistryTest(SimpleTestCase):
+    """
+    The templates are compiled once and rendered without the template loaders
+    """
+
+    def test_all_templates(self):
+        """
+        Every template is compiled for every language and renders its variables
+        """
+        registry = MailTemplateRegistry(MAIL_TEMPLATES, ('en', 'de'))
+        registry.load()
+        test_items = (
+            ('registration', {'reg_url': 'https://example.com/reg', 'first_name': 'Reg'}),
+            ('recovery', {'recovery_url': 'https://example.com/rec', 'first_name': 'Rec'}),
+            ('email-change', {'change_url': 'https://example.com/change', 'first_name': 'Change'}),
+        )
+        for name, context in test_items:
+            for language in ('en', 'de'):
+                with self.subTest(name=name, language=language), translation.override(language):
+                    body = registry.render(name, context)
+                    for value in context.values():
+                        self.assertIn(value, body)
+
+    def test_no_loading(self):
+        """
+        Rendering neither loads nor compiles a template
+        """
+        registry = get_mail_templates()
+        with patch('hub_app.maillib.templates.select_template') as select_template, translation.override('de-de'):
+            body = registry.render('registration', {'reg_url': 'https://example.com/<reg>', 'first_name': 'Reg'})
+            select_template.assert_not_called()
+        self.assertIn('https://example.com/<reg>', body)  # No escaping in plain text
+
+    def test_language_variant(self):
+        """
+        A language-specific version of the template is preferred
+        """
+        registry = MailTemplateRegistry({'test': 'hub_app/registration/reg-email.txt'}, ('en',))
+        with patch('hub_app.maillib.templates.select_template') as select_template:
+            registry.load()
+        select_template.assert_called_once_with([
+            'hub_app/registration/reg-email.en.txt', 'hub_app/registration/reg-email.txt'
+        ])
+
+    def test_metrics(self):
+        """
+        Renders are counted and timed
+        """
+        registry = MailTemplateRegistry(MAIL_TEMPLATES, ('en',))
+        self.assertEqual({'count': 0, 'total_seconds': 0.0, 'average_seconds': 0.0}, registry.get_metrics())
+        for _ in range(3):
+            registry.render('recovery', {'recovery_url': 'https://example.com/rec', 'first_name': 'Rec'})
+        metrics = registry.get_metrics()
+        self.assertEqual(3, metrics['count'])
+        self.assertGreater(metrics['total_seconds'], 0.0)
+        self.assertAlmostEqual(metrics['total_seconds'] / 3, metrics['average_seconds'])
+
+    def test_reset(self):
+        """
+        The registry follows the settings
+        """
+        registry = get_mail_templates()
+        self.assertIs(registry, get_mail_templates())
+        with override_settings(LANGUAGES=(('en', 'English'),)):
+            self.assertIsNot(registry, get_mail_templates())
+            self.assertIn('Hi Reg!', render_mail('registration', {'reg_url': '', 'first_name': 'Reg'}))
@@ -6,7 +6,6 @@ from urllib.parse import unquote
 from uuid import uuid4
 
 from django.conf import settings
-from django.core import mail
 from django.core.mail import EmailMessage
 from django.core.signing import Signer
 from django.urls import reverse
@@ -15,6 +14,7 @@ from urllib3.util import parse_url
 from hub_app.accountlib.email import get_email_key
 from hub_app.authlib.totp.token import get_otp
 from hub_app.models import HubUser, PendingEMailChange
+from hub_app.tests.helper import sent_mails
 from hub_app.tests.test_myaccount import MyAccountTest
 
 
@@ -101,7 +101,7 @@ class PersonalEMailPageTest(MyAccountTest):
                 }, follow=False)
                 self.assertEqual(0, PendingEMailChange.objects.count())
                 self.assertEqual(200, response.status_code)
-                self.assertEqual(0, len(mail.outbox))
+                self.assertEqual(0, len(sent_mails()))
                 self.assertEqual(current_email, HubUser.objects.get(id=self.normal_user.id).email)
         with self.subTest('Now with a good e-mail address'):
             response = self.client.post(self.url, data={
@@ -109,7 +109,7 @@ class PersonalEMailPageTest(MyAccountTest):
             }, follow=False)
             self.assertEqual(200, response.status_code)
             self.assertEqual(new_email, PendingEMailChange.objects.first().new_email)
-            self.assertEqual(1, len(mail.outbox))
+            self.assertEqual(1, len(sent_mails()))
             self.assertEqual(current_email, HubUser.objects.get(id=self.normal_user.id).email)
             self.assertEqual(1, PendingEMailChange.objects.count())
         more_tries = (
@@ -121,13 +121,13 @@ class PersonalEMailPageTest(MyAccountTest):
                 response = self.client.post(self.url, data={
                     'new_email': good
                 }, follow=False)
-                self.assertEqual(1, len(mail.outbox))
+                self.assertEqual(1, len(sent_mails()))
                 self.assertEqual(1, PendingEMailChange.objects.count())
                 self.assertEqual(200, response.status_code)
                 self.assertEqual(current_email, HubUser.objects.get(id=self.normal_user.id).email)
                 self.assertEqual(new_email, PendingEMailChange.objects.first().new_email)
         with self.subTest(msg='Checking E-Mail'):
-            confirm_mail = mail.outbox[0]  # type: EmailMessage
+            confirm_mail = sent_mails()[0]  # type: EmailMessage
             self.assertEqual(settings.EMAIL_VERIFICATION_SUBJECT, confirm_mail.subject)
             self.assertEqual(settings.EMAIL_VERIFICATION_FROM, confirm_mail.from_email)
             self.assertEqual([new_email], confirm_mail.to)
@@ -171,7 +171,7 @@ class PersonalEMailPageTest(MyAccountTest):
         with self.subTest(msg='Check if database is still OK'):
             self.assertEqual(1, PendingEMailChange.objects.count())
             self.assertEqual(new_email, PendingEMailChange.objects.first().new_email)
-            self.assertEqual(1, len(mail.outbox))
+            self.assertEqual(1, len(sent_mails()))
             self.assertEqual(current_email, HubUser.objects.get(id=self.normal_user.id).email)
         bad_uuid = str(uuid4())
         bad_confirms = (
@@ -198,7 +198,7 @@ class PersonalEMailPageTest(MyAccountTest):
                 self.assertEqual(current_email, HubUser.objects.get(id=self.normal_user.id).email)
                 self.assertEqual(1, PendingEMailChange.objects.count())
                 self.assertEqual(new_email, PendingEMailChange.objects.first().new_email)
-                self.assertEqual(1, len(mail.outbox))
+                self.assertEqual(1, len(sent_mails()))
         with self.subTest(msg='Confirming'):
             url_parts = parse_url(next_link)
             end_point = url_parts.path
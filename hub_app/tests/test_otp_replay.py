@@ -0,0 +1,267 @@
+"""
+Tests for the OTP replay backends
+"""
+import os
+import time
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from threading import Barrier, Thread
+from unittest.mock import patch
+
+from django.db import connection, connections, OperationalError
+from django.test import TestCase, SimpleTestCase, RequestFactory, override_settings, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from hub_app.authlib.backend import TotpAuthenticationBackend
+from hub_app.authlib.replay import MemoryReplayBackend, SqliteReplayBackend, DatabaseReplayBackend, \
+    get_replay_backend, BaseReplayBackend
+from hub_app.authlib.totp.token import get_possible_otps
+from hub_app.models import HubUser, BurnedOtp
+
+
+class ReplayBackendTestMixin:
+    """
+    Common tests for all TTL based backends
+    """
+
+    def create_backend(self, ttl: int) -> BaseReplayBackend:
+        """
+        Create the backend to test
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def test_burn_once(self):
+        """
+        An OTP can only be burned once
+        """
+        backend = self.create_backend(90)
+        self.assertTrue(backend.burn(1, '123456'))
+        self.assertFalse(backend.burn(1, '123456'))
+        self.assertTrue(backend.burn(1, '654321'))
+        self.assertTrue(backend.burn(2, '123456'))
+        self.assertFalse(backend.burn(2, '123456'))
+
+    def test_expiry(self):
+        """
+        After the TTL, the OTP is forgotten
+        """
+        backend = self.create_backend(90)
+        with patch.object(BaseReplayBackend, 'now', return_value=1000000.0):
+            self.assertTrue(backend.burn(1, '123456'))
+        with patch.object(BaseReplayBackend, 'now', return_value=1000089.0):
+            self.assertFalse(backend.burn(1, '123456'))
+            self.assertTrue(backend.burn(1, '111111'))
+        with patch.object(BaseReplayBackend, 'now', return_value=1000090.0):
+            self.assertTrue(backend.burn(1, '123456'))
+            self.assertFalse(backend.burn(1, '111111'))
+
+
+class MemoryReplayBackendTest(ReplayBackendTestMixin, SimpleTestCase):
+    """
+    Test the in-process backend
+    """
+
+    def create_backend(self, ttl: int) -> BaseReplayBackend:
+        return MemoryReplayBackend(ttl)
+
+    def test_expired_entries_are_removed(self):
+        """
+        The memory does not grow with expired entries
+        """
+        backend = MemoryReplayBackend(90)
+        with patch.object(BaseReplayBackend, 'now', return_value=1000000.0):
+            for i in range(100):
+                backend.burn(i, '123456')
+        with patch.object(BaseReplayBackend, 'now', return_value=1000100.0):
+            backend.burn(1, '654321')
+        self.assertEqual(1, len(getattr(backend, '_burned')))
+
+
+class SqliteReplayBackendTest(ReplayBackendTestMixin, SimpleTestCase):
+    """
+    Test the shared SQLite backend
+    """
+
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def create_backend(self, ttl: int) -> BaseReplayBackend:
+        return SqliteReplayBackend(ttl, os.path.join(self.directory.name, 'replay.sqlite3'))
+
+    def test_shared_between_instances(self):
+        """
+        Two instances (like two workers) on the same file see the same burned OTPs
+        """
+        first = self.create_backend(90)
+        second = self.create_backend(90)
+        self.assertTrue(first.burn(1, '123456'))
+        self.assertFalse(second.burn(1, '123456'))
+
+    def test_sweep(self):
+        """
+        Every now and then, all expired entries are removed
+        """
+        backend = self.create_backend(90)
+        backend.expire_every = 3
+        with patch.object(BaseReplayBackend, 'now', return_value=1000000.0):
+            backend.burn(1, '111111')
+            backend.burn(1, '222222')
+        with patch.object(BaseReplayBackend, 'now', return_value=1000100.0):
+            backend.burn(1, '333333')
+        connection = getattr(backend, '_database').get_connection()
+        self.assertEqual(1, connection.execute('SELECT COUNT(*) FROM burned_otp').fetchone()[0])
+
+
+class DatabaseReplayBackendTest(TestCase):
+    """
+    Test the database backend
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create(username='mr_replay')
+
+    def test_burn_once(self):
+        """
+        An OTP can only be burned once and is stored in the database
+        """
+        backend = DatabaseReplayBackend(90)
+        self.assertTrue(backend.burn(self.user.pk, '123456'))
+        self.assertFalse(backend.burn(self.user.pk, '123456'))
+        self.assertEqual(1, BurnedOtp.objects.filter(user=self.user, token='123456').count())
+
+    def test_reburn_after_one_hour(self):
+        """
+        An OTP burned more than one hour ago can be burned again, without an IntegrityError
+        """
+        BurnedOtp.objects.create(user=self.user, token='123456', burned_timestamp=now() - timedelta(minutes=61))
+        BurnedOtp.objects.create(user=self.user, token='654321', burned_timestamp=now() - timedelta(minutes=59))
+        backend = DatabaseReplayBackend(90)
+        self.assertTrue(backend.burn(self.user.pk, '123456'))
+        self.assertFalse(backend.burn(self.user.pk, '123456'))
+        self.assertFalse(backend.burn(self.user.pk, '654321'))
+        self.assertEqual(2, BurnedOtp.objects.filter(user=self.user).count())
+
+    def test_burn_is_a_single_insert(self):
+        """
+        Burning a fresh OTP needs no SELECT before the INSERT
+        """
+        backend = DatabaseReplayBackend(90)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(backend.burn(self.user.pk, '123456'))
+        statements = [query['sql'].split(' ', 1)[0].upper() for query in queries.captured_queries]
+        self.assertEqual(['INSERT'], [statement for statement in statements if statement in ('SELECT', 'INSERT')])
+
+
+class ConcurrentLoginTest(TransactionTestCase):
+    """
+    Parallel logins with the same OTP
+    """
+
+    parallel_logins = 6
+
+    def setUp(self) -> None:
+        self.user = HubUser.objects.create(username='mr_parallel', is_active=True)
+        self.user.set_password('right_pass')  # nosec
+        self.user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        self.user.save()
+
+    def _run_in_parallel(self, func) -> list:
+        """
+        Run the function in parallel threads, all starting at the same time
+        """
+        barrier = Barrier(self.parallel_logins)
+        results = []
+        errors = []
+
+        def call_with_retry():
+            # The shared in-memory SQLite database of the tests reports lock conflicts at once instead of waiting
+            # for the busy timeout like a file database does, so the call is repeated in that case
+            for _ in range(100):
+                try:
+                    return func()
+                except OperationalError as ex:
+                    if 'locked' not in str(ex):
+                        raise
+                    time.sleep(0.01)
+            return func()
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(call_with_retry())
+            except Exception as ex:  # pylint: disable=broad-except  # pragma: no cover  # Reported below
+                errors.append(ex)
+            finally:
+                connections.close_all()
+
+        threads = [Thread(target=worker) for _ in range(self.parallel_logins)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(self.parallel_logins, len(results))
+        return results
+
+    def test_only_one_burn_wins(self):
+        """
+        Exactly one of the parallel burns succeeds, the others are rejected without an error
+        """
+        backend = DatabaseReplayBackend(90)
+        results = self._run_in_parallel(lambda: backend.burn(self.user.pk, '123456'))
+        self.assertEqual(1, len([result for result in results if result]))
+        self.assertEqual(1, BurnedOtp.objects.filter(user=self.user, token='123456').count())
+
+    def test_only_one_login_wins(self):
+        """
+        Exactly one of the parallel logins succeeds, the others are rejected without an error
+        """
+        otp = get_possible_otps(b'SUPERSECRETSUPER-SUPERSECRETSUPER', 0, 0)[0]
+        results = self._run_in_parallel(lambda: TotpAuthenticationBackend().authenticate(
+            RequestFactory().get('/'), username='mr_parallel', password='right_pass', one_time_pw=otp
+        ))
+        self.assertEqual(1, len([result for result in results if result is not None]))
+        self.assertEqual(1, BurnedOtp.objects.filter(user=self.user, token=otp).count())
+
+
+class ReplayBackendConfigurationTest(TestCase):
+    """
+    Test the backend selection
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create(username='mr_replay', is_active=True)
+        cls.user.set_password('right_pass')  # nosec
+        cls.user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        cls.user.save()
+
+    def test_default_backend(self):
+        """
+        The database is used by default
+        """
+        self.assertIsInstance(get_replay_backend(), DatabaseReplayBackend)
+        self.assertIs(get_replay_backend(), get_replay_backend())
+
+    @override_settings(OTP_REPLAY_BACKEND='hub_app.authlib.replay.MemoryReplayBackend', OTP_REPLAY_TTL=60)
+    def test_memory_backend_login(self):
+        """
+        With the memory backend, the login writes no burned OTP to the database, but replays are still rejected
+        """
+        backend = get_replay_backend()
+        self.assertIsInstance(backend, MemoryReplayBackend)
+        self.assertEqual(60, backend.ttl)
+        otp = get_possible_otps(b'SUPERSECRETSUPER-SUPERSECRETSUPER', 0, 0)[0]
+        request = RequestFactory().get('/')
+        self.assertEqual(self.user, TotpAuthenticationBackend().authenticate(
+            request, username='mr_replay', password='right_pass', one_time_pw=otp
+        ))
+        self.assertIsNone(TotpAuthenticationBackend().authenticate(
+            request, username='mr_replay', password='right_pass', one_time_pw=otp
+        ))
+        self.assertEqual(0, BurnedOtp.objects.count())
@@ -0,0 +1,99 @@
+"""
+Tests for the lazy expiry of pending registrations, credential recoveries and E-Mail changes
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from hub_app.authlib.totp.token import get_otp
+from hub_app.models import HubUser, PendingRegistration, PendingCredentialRecovery, PendingEMailChange, OutboxMail
+
+SECRET = b'SUPERSECRETSUPER-SUPERSECRETSUPER'
+
+
+class LiveQuerySetTest(TestCase):
+    """
+    Live and expired requests
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [HubUser.objects.create(username='mr_pending_{}'.format(i)) for i in range(4)]
+        for i, user in enumerate(cls.users):
+            PendingCredentialRecovery.objects.create(
+                user=user, recovery_type='password', valid_until=now() + timedelta(minutes=-1 if i < 3 else 1)
+            )
+
+    def test_filters(self):
+        """
+        The filters split the requests by their validity
+        """
+        self.assertEqual(1, PendingCredentialRecovery.objects.live().count())
+        self.assertEqual(3, PendingCredentialRecovery.objects.expired().count())
+
+    def test_get_live(self):
+        """
+        An expired request is deleted when it is encountered
+        """
+        self.assertEqual(self.users[3], PendingCredentialRecovery.objects.get_live(user=self.users[3]).user)
+        self.assertRaises(PendingCredentialRecovery.DoesNotExist,
+                          PendingCredentialRecovery.objects.get_live, user=self.users[0])
+        self.assertFalse(PendingCredentialRecovery.objects.filter(user=self.users[0]).exists())
+        self.assertEqual(4, HubUser.objects.count())
+
+    def test_expired_registration(self):
+        """
+        An expired registration is deleted with its user
+        """
+        user = HubUser.objects.create(username='mr_registration')
+        registration = PendingRegistration.objects.create(user=user, valid_until=now() - timedelta(seconds=1))
+        self.assertRaises(
+            PendingRegistration.DoesNotExist, PendingRegistration.objects.get_live, uuid=registration.uuid
+        )
+        self.assertFalse(HubUser.objects.filter(username='mr_registration').exists())
+
+
+class ExpiredRequestTest(TestCase):
+    """
+    Expired requests don't block new ones
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create_user(
+            username='mr_expired', password='right_pass', email='mr_expired@example.com', first_name='Expired'
+        )  # nosec
+        cls.user.set_totp_secret(SECRET)
+        cls.user.save()
+
+    def test_new_recovery(self):
+        """
+        A new recovery replaces an expired one
+        """
+        expired = PendingCredentialRecovery.objects.create(
+            user=self.user, recovery_type='password', valid_until=now() - timedelta(seconds=1)
+        )
+        self.client.get('/hub/auth/forgot-credentials/step-1')
+        self.client.post('/hub/auth/forgot-credentials/step-1', {'step1': 'password'})
+        response = self.client.post('/hub/auth/forgot-credentials/step-2/password', {
+            'email': 'mr_expired@example.com', 'username': 'mr_expired', 'otp': get_otp(SECRET)
+        })
+        self.assertEqual(200, response.status_code)
+        recovery = PendingCredentialRecovery.objects.get(user=self.user)
+        self.assertNotEqual(expired.uuid, recovery.uuid)
+        self.assertGreater(recovery.valid_until, now())
+        self.assertEqual(['mr_expired@example.com'], [mail.recipients for mail in OutboxMail.objects.all()])
+
+    def test_new_email_change(self):
+        """
+        An expired E-Mail change does not prevent a new one
+        """
+        PendingEMailChange.objects.create(
+            user=self.user, new_email='old@example.com', valid_until=now() - timedelta(seconds=1)
+        )
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('ha:acc:personal.email'), {'new_email': 'new@example.com'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('new@example.com', PendingEMailChange.objects.get(user=self.user).new_email)
@@ -0,0 +1,116 @@
+"""
+Tests for the cache of rendered QR codes
+"""
+from base64 import b32encode, b64encode
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from hub_app.authlib.totp import qr_cache
+from hub_app.authlib.totp.qr_cache import QrCodeCache, get_qr_code_key, get_qr_code_cache, render_qr_code, \
+    render_qr_code_data_uri
+from hub_app.models import HubUser
+
+SECRET = b32encode(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+
+
+class QrCodeCacheTest(SimpleTestCase):
+    """
+    Test the LRU cache
+    """
+
+    def test_key(self):
+        """
+        The key depends on every parameter, but doesn't contain the secret
+        """
+        key = get_qr_code_key('mr_qr', SECRET, 'png', 8)
+        self.assertNotIn(SECRET.decode('us-ascii'), key)
+        test_items = (
+            ('mr_qr_2', SECRET, 'png', 8),
+            ('mr_qr', b32encode(b'OTHERSECRETOTHER-OTHERSECRETOTHER'), 'png', 8),
+            ('mr_qr', SECRET, 'svg', 8),
+            ('mr_qr', SECRET, 'png', 4),
+        )
+        for params in test_items:
+            with self.subTest(params=params):
+                self.assertNotEqual(key, get_qr_code_key(*params))
+        with override_settings(SECRET_KEY='another-secret-key-for-the-hmac-of-the-qr-codes'):
+            self.assertNotEqual(key, get_qr_code_key('mr_qr', SECRET, 'png', 8))
+
+    def test_lru(self):
+        """
+        The least recently used QR codes are dropped
+        """
+        cache = QrCodeCache(2)
+        cache.put('a', 'mr_a', b'A')
+        cache.put('b', 'mr_b', b'B')
+        self.assertEqual(b'A', cache.get('a'))
+        cache.put('c', 'mr_c', b'C')
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(b'A', cache.get('a'))
+        self.assertEqual(b'C', cache.get('c'))
+
+    def test_invalidate(self):
+        """
+        Only the QR codes of the user are dropped
+        """
+        cache = QrCodeCache(4)
+        cache.put('a1', 'mr_a', b'A1')
+        cache.put('a2', 'mr_a', b'A2')
+        cache.put('b', 'mr_b', b'B')
+        cache.invalidate('mr_a')
+        self.assertEqual((None, None, b'B'), (cache.get('a1'), cache.get('a2'), cache.get('b')))
+
+    @override_settings(QR_CODE_CACHE_SIZE=0)
+    def test_disabled(self):
+        """
+        Without cache, every QR code is rendered
+        """
+        renderer = Mock(wraps=qr_cache.RENDERERS['png'])
+        with patch.dict(qr_cache.RENDERERS, png=renderer):
+            render_qr_code('mr_qr', SECRET, 'png', 8)
+            render_qr_code('mr_qr', SECRET, 'png', 8)
+        self.assertEqual(2, renderer.call_count)
+        self.assertEqual(0, len(get_qr_code_cache()))
+
+
+class RenderQrCodeTest(TestCase):
+    """
+    Test the rendering through the cache
+    """
+
+    def setUp(self) -> None:
+        get_qr_code_cache().clear()
+
+    def test_rendered_once(self):
+        """
+        The same QR code is rendered only once
+        """
+        renderer = Mock(wraps=qr_cache.RENDERERS['svg'])
+        with patch.dict(qr_cache.RENDERERS, svg=renderer):
+            first = render_qr_code('mr_qr', SECRET, 'svg', 16)
+            self.assertEqual(first, render_qr_code('mr_qr', SECRET, 'svg', 16))
+        self.assertEqual(1, renderer.call_count)
+        self.assertTrue(first[1].startswith(b'<?xml'))
+
+    def test_new_secret(self):
+        """
+        Setting a new secret drops the QR codes of the user
+        """
+        user = HubUser.objects.create(username='mr_qr')
+        render_qr_code('mr_qr', SECRET, 'png', 8)
+        render_qr_code('mr_other', SECRET, 'png', 8)
+        self.assertEqual(2, len(get_qr_code_cache()))
+        user.set_totp_secret(b'OTHERSECRETOTHER-OTHERSECRETOTHER')
+        self.assertEqual(1, len(get_qr_code_cache()))
+
+    def test_data_uri(self):
+        """
+        The data URI is cached as well
+        """
+        data_uri = render_qr_code_data_uri('mr_qr', SECRET, 'png', 8)
+        _, data = render_qr_code('mr_qr', SECRET, 'png', 8)
+        self.assertEqual('data:image/png;base64,{}'.format(b64encode(data).decode('us-ascii')), data_uri)
+        with patch.dict(qr_cache.RENDERERS, png=None):
+            self.assertEqual(data_uri, render_qr_code_data_uri('mr_qr', SECRET, 'png', 8))
@@ -1,14 +1,20 @@
 """
 Simple Smoke Tests for the QR code generator
 """
+import re
 from base64 import b32encode
+from io import BytesIO
 
 from django.test import SimpleTestCase
+from PIL import Image
 from qrcode.image.base import BaseImage
 from qrcode.image.pil import PilImage
 from qrcode.image.svg import SvgPathImage, SvgPathFillImage
 
-from hub_app.authlib.totp.qr import create_transparent_svg_qr_code, create_png_qr_code, create_svg_qr_code
+from hub_app.authlib.totp.qr import create_transparent_svg_qr_code, create_png_qr_code, create_svg_qr_code, \
+    create_fast_png_qr_code, create_fast_svg_qr_code, create_qr_code, get_qr_code_version, render_svg_path
+
+SECRET = b32encode(b'SOME-EASY-TEST-DATA-WITH-SOME-BYTES-OF-LENGTH-HOW-COOL-THIS-IS!')
 
 
 class QrCodeGenerationSmokeTest(SimpleTestCase):
@@ -37,3 +43,57 @@ class QrCodeGenerationSmokeTest(SimpleTestCase):
                     img,
                     concrete_type
                 )
+
+
+class FastQrCodeTest(SimpleTestCase):
+    """
+    Test the renderers without Pillow
+    """
+
+    def test_version(self):
+        """
+        The smallest version for the payload is chosen
+        """
+        test_items = (
+            # payload length, expected version
+            (1, 1),
+            (11, 1),
+            (12, 2),
+            (46, 4),
+            (47, 5),
+            (60, 5),
+            (61, 6),
+            (1663, 40),
+        )
+        for payload_length, expected in test_items:
+            with self.subTest(payload_length=payload_length):
+                self.assertEqual(expected, get_qr_code_version(payload_length))
+        self.assertRaises(ValueError, get_qr_code_version, 1664)
+
+    def test_png(self):
+        """
+        The PNG has the same pixels as the one made by Pillow
+        """
+        with BytesIO() as buffer:
+            create_png_qr_code('test_user', SECRET, block_size=3).save(buffer)
+            expected = Image.open(BytesIO(buffer.getvalue())).convert('1')
+        image = Image.open(BytesIO(create_fast_png_qr_code('test_user', SECRET, block_size=3)))
+        self.assertEqual(('1', expected.size), (image.mode, image.size))
+        self.assertEqual(expected.tobytes(), image.convert('1').tobytes())
+
+    def test_svg(self):
+        """
+        The SVG has one path, with one rectangle per run of dark modules
+        """
+        svg = render_svg_path([
+            [False, True, True, False],
+            [True, True, True, True],
+            [True, False, False, True],
+            [False, False, False, False],
+        ], 10).decode('us-ascii')
+        self.assertIn('width="40" height="40" viewBox="0 0 4 4"', svg)
+        self.assertEqual(['M1 0h2v1h-2z', 'M0 1h4v1h-4z', 'M0 2h1v1h-1z', 'M3 2h1v1h-1z'], re.findall(r'M[^M"]+', svg))
+        svg = create_fast_svg_qr_code('test_user', SECRET, block_size=8).decode('us-ascii')
+        size = len(create_qr_code('test_user', SECRET).get_matrix())
+        self.assertIn('width="{0}" height="{0}"'.format(size * 8), svg)
+        self.assertEqual(1, svg.count('<path '))
@@ -7,7 +7,6 @@ from uuid import uuid4
 from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
-from django.core import mail
 from django.core.mail import EmailMessage
 from django.core.signing import Signer
 from django.test import TestCase, tag
@@ -16,7 +15,7 @@ from selenium.webdriver.firefox.webdriver import WebDriver
 
 from hub_app.authlib.totp.token import get_otp
 from hub_app.models import HubUser, PendingRegistration
-from hub_app.tests.helper import firefox_webdriver_factory
+from hub_app.tests.helper import firefox_webdriver_factory, sent_mails
 
 
 class RegistrationSmokeTest(TestCase):
@@ -152,8 +151,8 @@ class RegistrationRoundTripTest(StaticLiveServerTestCase):
         """
         Check the mails that has been sent
         """
-        self.assertEqual(1, len(mail.outbox))
-        reg_mail = mail.outbox[0]  # type: EmailMessage
+        self.assertEqual(1, len(sent_mails()))
+        reg_mail = sent_mails()[0]  # type: EmailMessage
         self.assertEqual(['test@test.org'], reg_mail.to)
         self.assertEqual(settings.EMAIL_REGISTRATION_FROM, reg_mail.from_email)
         self.assertEqual(settings.EMAIL_REGISTRATION_SUBJECT, reg_mail.subject)
@@ -0,0 +1,180 @@
+"""
+Tests for the session engines of the hub and the "clearsessions" command
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from hub_app.authlib.totp.token import get_otp
+from hub_app.models import HubUser
+from hub_app.sessionlib import db, cached_db
+
+
+def _session_writes(queries: CaptureQueriesContext) -> list:
+    return [
+        query['sql'] for query in queries.captured_queries
+        if 'django_session' in query['sql'] and not query['sql'].startswith('SELECT')
+    ]
+
+
+class CoalescingSessionTest(TestCase):
+    """
+    Unchanged sessions are not saved
+    """
+
+    def _create_session(self) -> str:
+        session = db.SessionStore()
+        session['messages'] = '[]'
+        session['_csrftoken'] = 'token'
+        session.save()
+        return session.session_key
+
+    def test_unchanged(self):
+        """
+        Writing the same values again does not save
+        """
+        session = db.SessionStore(self._create_session())
+        session['messages'] = '[]'
+        session['_csrftoken'] = 'token'
+        self.assertTrue(session.modified)
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual([], _session_writes(queries))
+
+    def test_changed(self):
+        """
+        Changes are saved, and the next save of the same values is skipped again
+        """
+        session_key = self._create_session()
+        session = db.SessionStore(session_key)
+        session['_csrftoken'] = 'new_token'
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual(1, len(_session_writes(queries)))
+        self.assertEqual('new_token', db.SessionStore(session_key)['_csrftoken'])
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual([], _session_writes(queries))
+
+    def test_new_and_cycled_sessions(self):
+        """
+        New sessions and new keys are always saved
+        """
+        session = db.SessionStore(self._create_session())
+        old_key = session.session_key
+        session.cycle_key()
+        self.assertNotEqual(old_key, session.session_key)
+        self.assertEqual('token', db.SessionStore(session.session_key)['_csrftoken'])
+        self.assertFalse(Session.objects.filter(session_key=old_key).exists())
+
+    def test_login_flow(self):
+        """
+        Only the requests that really change the session write it
+        """
+        user = HubUser.objects.create_user(username='mr_session', password='right_pass', first_name='S')  # nosec
+        user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        user.save()
+        self.client.post('/hub/auth/login', {
+            'username': 'mr_session', 'password': 'right_pass', 'otp': get_otp(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        })
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/hub/')  # Shows and removes the welcome message
+        self.assertEqual(1, len(_session_writes(queries)))
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(200, self.client.get('/hub/').status_code)
+            self.assertEqual([], _session_writes(queries))
+
+
+@override_settings(SESSION_ENGINE='hub_app.sessionlib.cached_db', SESSION_L1_SIZE=2, SESSION_L1_TIMEOUT=60)
+class CachedSessionTest(TestCase):
+    """
+    Sessions in the cache and the L1 layer
+    """
+
+    def setUp(self) -> None:
+        caches['default'].clear()
+        cached_db.clear_l1()
+
+    def _create_session(self, value: str) -> str:
+        session = cached_db.SessionStore()
+        session['value'] = value
+        session.save()
+        return session.session_key
+
+    def test_l1(self):
+        """
+        The L1 layer answers without the cache and the database
+        """
+        session_key = self._create_session('first')
+        caches['default'].clear()
+        with self.assertNumQueries(0):
+            self.assertEqual('first', cached_db.SessionStore(session_key)['value'])
+
+    def test_lru(self):
+        """
+        The least recently used sessions are dropped from the L1 layer
+        """
+        first, second, third = (self._create_session(value) for value in ('first', 'second', 'third'))
+        caches['default'].clear()
+        with self.assertNumQueries(0):
+            self.assertEqual('third', cached_db.SessionStore(third)['value'])
+            self.assertEqual('second', cached_db.SessionStore(second)['value'])
+        with self.assertNumQueries(1):
+            self.assertEqual('first', cached_db.SessionStore(first)['value'])
+
+    @override_settings(SESSION_L1_SIZE=0)
+    def test_without_l1(self):
+        """
+        Without the L1 layer, the cache and then the database answer
+        """
+        session_key = self._create_session('first')
+        with self.assertNumQueries(0):
+            self.assertEqual('first', cached_db.SessionStore(session_key)['value'])
+        caches['default'].clear()
+        with self.assertNumQueries(1):
+            self.assertEqual('first', cached_db.SessionStore(session_key)['value'])
+
+    def test_changes_and_delete(self):
+        """
+        Changes reach the L1 layer, deleted sessions are gone
+        """
+        session_key = self._create_session('first')
+        session = cached_db.SessionStore(session_key)
+        session['value'] = 'changed'
+        session.save()
+        self.assertEqual('changed', cached_db.SessionStore(session_key)['value'])
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertEqual([], _session_writes(queries))
+        session.delete()
+        self.assertNotIn('value', cached_db.SessionStore(session_key))
+
+
+class ClearSessionsTest(TestCase):
+    """
+    Expired sessions are deleted in batches
+    """
+
+    def test_clear(self):
+        """
+        Only the expired sessions are deleted
+        """
+        for i in range(7):
+            Session.objects.create(
+                session_key='session{}'.format(i), session_data='',
+                expire_date=now() + timedelta(hours=-1 if i < 5 else 1)
+            )
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('clearsessions', '--batch-size=2', '--sleep=0', stdout=out)
+        self.assertIn('Deleted 5 expired sessions.', out.getvalue())
+        self.assertEqual(['session5', 'session6'], sorted(Session.objects.values_list('session_key', flat=True)))
+        self.assertEqual(3, len([query for query in queries.captured_queries if query['sql'].startswith('DELETE')]))
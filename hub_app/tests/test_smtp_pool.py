@@ -0,0 +1,204 @@
+"""
+Tests for the pooled SMTP backend, against a small local SMTP stand-in
+"""
+import smtplib
+import socketserver
+import threading
+from email import message_from_bytes
+
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from hub_app.maillib.outbox import queue_mail, deliver_outbox
+from hub_app.maillib.smtp import PooledEmailBackend, get_smtp_pool, close_smtp_pools
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for smtplib
+    """
+
+    def _reply(self, line: str):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.server.register(self.connection)
+        self._reply('220 localhost SMTP stand-in')
+        for raw_line in self.rfile:
+            command = raw_line.decode('ascii').strip().upper()
+            if command.startswith('EHLO') or command.startswith('HELO'):
+                self._reply('250 localhost')
+            elif command.startswith('DATA'):
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data_line in self.rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    lines.append(data_line)
+                self.server.messages.append(message_from_bytes(b''.join(lines)))
+                self._reply('250 OK')
+            elif command.startswith('QUIT'):
+                self._reply('221 Bye')
+                return
+            elif command.split(' ')[0] in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self._reply('250 OK')
+            else:
+                self._reply('500 Unknown command')
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server counting connections and collecting messages
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SmtpHandler)
+        self.connections = []
+        self.messages = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self) -> int:
+        """
+        Get the port of the stand-in
+        """
+        return self.server_address[1]
+
+    def register(self, connection):
+        """
+        Remember a client connection
+        """
+        self.connections.append(connection)
+
+    def drop_connections(self):
+        """
+        Hang up on all clients
+        """
+        for connection in self.connections:
+            try:
+                connection.shutdown(2)
+            except OSError:
+                pass
+
+    def stop(self):
+        """
+        Stop the stand-in
+        """
+        self.drop_connections()
+        self.shutdown()
+        self.server_close()
+
+
+class SmtpStandInMixin:
+    """
+    Run a stand-in for every test
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.server = SmtpStandIn()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(close_smtp_pools)
+
+    def _message(self, number: int) -> EmailMessage:
+        return EmailMessage('Subject {}'.format(number), 'Body', 'from@example.com', ['to@example.com'])
+
+    def _backend(self, fail_silently: bool = False) -> PooledEmailBackend:
+        return PooledEmailBackend(host='127.0.0.1', port=self.server.port, username='', password='',
+                                  use_tls=False, use_ssl=False, timeout=5, fail_silently=fail_silently)
+
+
+@override_settings(EMAIL_POOL_SIZE=2, EMAIL_POOL_TIMEOUT=0.1, EMAIL_POOL_CHECK_AFTER=60, EMAIL_POOL_MAX_IDLE=300)
+class PooledEmailBackendTest(SmtpStandInMixin, SimpleTestCase):
+    """
+    Connections are reused
+    """
+
+    def test_reuse(self):
+        """
+        Backends share the connection of the pool
+        """
+        for number in range(3):
+            self.assertEqual(1, self._backend().send_messages([self._message(number)]))
+        self.assertEqual(1, len(self.server.connections))
+        self.assertEqual(
+            ['Subject 0', 'Subject 1', 'Subject 2'], [message['Subject'] for message in self.server.messages]
+        )
+        self.assertEqual(1, get_smtp_pool(self._backend()).idle_count)
+
+    def test_batch(self):
+        """
+        All messages of a call are sent over one connection
+        """
+        self.assertEqual(5, self._backend().send_messages([self._message(number) for number in range(5)]))
+        self.assertEqual(1, len(self.server.connections))
+        self.assertEqual(5, len(self.server.messages))
+
+    def test_bounded(self):
+        """
+        No more than EMAIL_POOL_SIZE connections are used at once
+        """
+        backends = [self._backend(), self._backend()]
+        for backend in backends:
+            self.assertTrue(backend.open())
+        self.assertRaises(smtplib.SMTPException, self._backend().open)
+        self.assertIsNone(self._backend(fail_silently=True).open())
+        backends[0].close()
+        self.assertEqual(1, self._backend().send_messages([self._message(0)]))
+        self.assertEqual(2, len(self.server.connections))
+
+    @override_settings(EMAIL_POOL_CHECK_AFTER=0)
+    def test_health_check(self):
+        """
+        Idle connections are checked, dead ones are replaced
+        """
+        self._backend().send_messages([self._message(0)])
+        self.server.drop_connections()
+        self.assertEqual(1, self._backend().send_messages([self._message(1)]))
+        self.assertEqual(2, len(self.server.connections))
+
+    @override_settings(EMAIL_POOL_MAX_IDLE=0)
+    def test_max_idle(self):
+        """
+        Connections idle for too long are closed
+        """
+        self._backend().send_messages([self._message(0)])
+        self._backend().send_messages([self._message(1)])
+        self.assertEqual(2, len(self.server.connections))
+
+    def test_broken_connection(self):
+        """
+        A connection that failed while sending is not reused
+        """
+        backend = self._backend()
+        backend.open()
+        self.server.drop_connections()
+        self.assertRaises(smtplib.SMTPServerDisconnected, backend.send_messages, [self._message(0)])
+        self.assertEqual(1, backend.send_messages([self._message(1)]))
+        backend.close()
+        self.assertEqual(['Subject 1'], [message['Subject'] for message in self.server.messages])
+        self.assertEqual(2, len(self.server.connections))
+        self.assertEqual(1, get_smtp_pool(backend).idle_count)
+
+
+class PooledOutboxTest(SmtpStandInMixin, TestCase):
+    """
+    The outbox uses one pooled connection for all batches
+    """
+
+    def test_outbox(self):
+        """
+        All batches of the outbox share a connection
+        """
+        with override_settings(EMAIL_BACKEND='hub_app.maillib.smtp.PooledEmailBackend', EMAIL_HOST='127.0.0.1',
+                               EMAIL_PORT=self.server.port, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+                               EMAIL_USE_TLS=False, EMAIL_USE_SSL=False):
+            for number in range(5):
+                queue_mail(['to{}@example.com'.format(number)], 'from@example.com', 'Subject', 'Body')
+            self.assertEqual((5, 0), deliver_outbox(2))
+        self.assertEqual(5, len(self.server.messages))
+        self.assertEqual(1, len(self.server.connections))
@@ -0,0 +1,102 @@
+"""
+Test the OTP verification
+"""
+import os
+from random import SystemRandom
+from timeit import repeat
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, tag
+
+from hub_app.authlib.totp.token import find_otp_offset, verify_otp, get_possible_otps, get_otp
+
+
+RFC_6238_SECRET = b'12345678901234567890'
+FROZEN_CLOCK = 'hub_app.authlib.totp.token.time.time'
+
+
+class FindOtpOffsetTest(SimpleTestCase):
+    """
+    Test the offset search
+    """
+
+    def test_rfc_6238_vectors(self):
+        """
+        Test against the SHA1 test vectors of RFC 6238 (last six digits)
+        """
+        test_items = (
+            (1111111109, '081804'),
+            (1111111111, '050471'),
+            (1234567890, '005924'),
+            (2000000000, '279037'),
+        )
+        for timestamp, token in test_items:
+            with self.subTest(msg='Testing "{}" at {}'.format(token, timestamp)):
+                self.assertEqual(0, find_otp_offset(RFC_6238_SECRET, token, timestamp=timestamp))
+                self.assertEqual(-1, find_otp_offset(RFC_6238_SECRET, token, timestamp=timestamp + 30))
+                self.assertEqual(1, find_otp_offset(RFC_6238_SECRET, token, timestamp=timestamp - 30))
+                self.assertIsNone(find_otp_offset(RFC_6238_SECRET, token, timestamp=timestamp + 90))
+
+    def test_matches_possible_otps(self):
+        """
+        Every token of the window is found at its offset
+        """
+        secret = bytes(SystemRandom().getrandbits(8) for _ in range(72))
+        with patch(FROZEN_CLOCK, return_value=1234567890.0):  # Generate and verify within the same 30 seconds step
+            tokens = get_possible_otps(secret, -10, 10)
+            for offset, token in zip(range(-10, 11), tokens):
+                if tokens.index(token) != offset + 10:  # pragma: no cover  # Collisions within the window are possible
+                    continue
+                with self.subTest(msg='Testing offset {}'.format(offset)):
+                    self.assertEqual(offset, find_otp_offset(secret, token, -10, 10))
+
+    def test_invalid_tokens(self):
+        """
+        Formally invalid tokens never match
+        """
+        test_items = (None, '', '12345', '1234567', 'abcdef', ' 12345', '12345\n', '१२३४५६', 123456)
+        for token in test_items:
+            with self.subTest(msg='Testing with "{}"'.format(token)):
+                self.assertIsNone(find_otp_offset(RFC_6238_SECRET, token, -10, 10))
+                self.assertFalse(verify_otp(RFC_6238_SECRET, token))
+
+    def test_verify_otp(self):
+        """
+        The current token is valid, a token from far away is not
+        """
+        with patch(FROZEN_CLOCK, return_value=1234567890.0):
+            self.assertTrue(verify_otp(RFC_6238_SECRET, get_otp(RFC_6238_SECRET)))
+            self.assertTrue(verify_otp(RFC_6238_SECRET, get_otp(RFC_6238_SECRET, 3), 0, 3))
+            far_away = get_otp(RFC_6238_SECRET, 1000)
+            if far_away not in get_possible_otps(RFC_6238_SECRET):  # pragma: no branch  # Collisions are possible
+                self.assertFalse(verify_otp(RFC_6238_SECRET, far_away))
+
+
+@tag('slow')
+@skipUnless(os.environ.get('HUB_BENCHMARKS'), 'Benchmarks only run with HUB_BENCHMARKS=1')
+class VerifierBenchmarkTest(SimpleTestCase):
+    """
+    Compare the verifier with the list based check for a large window (like the one of "Test your App")
+
+    Wall clock comparisons are unreliable on shared machines, so the benchmark is opt-in.
+    """
+
+    def test_large_window(self):
+        """
+        The verifier must not be slower than building the list of all tokens
+        """
+        secret = bytes(SystemRandom().getrandbits(8) for _ in range(72))
+        token = get_otp(secret, 10)
+
+        def list_based():
+            return token in [get_otp(secret, offset) for offset in range(-10, 11)]
+
+        def verifier_based():
+            return verify_otp(secret, token, -10, 10)
+
+        list_time = min(repeat(list_based, number=2000, repeat=5))
+        verifier_time = min(repeat(verifier_based, number=2000, repeat=5))
+        self.assertGreater(list_time / verifier_time, 1.0, msg='list based {:.4f}s, verifier {:.4f}s'.format(
+            list_time, verifier_time
+        ))
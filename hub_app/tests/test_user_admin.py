@@ -1,12 +1,15 @@
 """
 Test a roundtrip though the user admin
 """
-from base64 import b32decode
+from base64 import b32decode, b32encode
+from io import BytesIO
 from time import sleep
+from zipfile import ZipFile
 
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
 from django.test import tag, TestCase
 from django.urls import reverse
+from PIL import Image
 from selenium.webdriver.firefox.webdriver import WebDriver
 
 from hub_app.authlib.totp.token import get_otp
@@ -246,3 +249,66 @@ class OtpAdminTest(TestCase):
                     'file_type': file_type
                 }))
                 self.assertEqual(expected, response.status_code)
+
+    def test_qr_code_etag(self):
+        """
+        The QR code is revalidated with its ETag, a new secret changes it
+        """
+        url = reverse('ha:admin:views.qr', kwargs={'user_id': '3', 'file_type': 'svg'})
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('image/svg+xml', response['Content-Type'])
+        etag = response['ETag']
+        self.assertNotIn('no-store', response['Cache-Control'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.content)
+        self.client.get(reverse('ha:admin:actions.regenerate-otp-secret', kwargs={'user_id': '3'}))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test_qr_code_negotiation(self):
+        """
+        Without a file type, the format follows the Accept header; the size follows "?size="
+        """
+        url = reverse('ha:admin:views.qr.negotiated', kwargs={'user_id': '3'})
+        test_items = (
+            # accept, size, expected content type, expected width
+            ('', '', 'image/png', 219),  # 73 modules of 3 pixels
+            ('image/svg+xml,image/*;q=0.8', '', 'image/svg+xml', 219),
+            ('image/png;q=0.5, image/svg+xml;q=0.9', '150', 'image/svg+xml', 146),
+            ('image/png, image/svg+xml;q=0.9', '10', 'image/png', 73),
+            ('text/html', '100000', 'image/png', 2044),
+            ('image/svg+xml', 'large', 'image/svg+xml', 219),
+        )
+        for accept, size, expected_type, expected_width in test_items:
+            with self.subTest(accept=accept, size=size):
+                response = self.client.get(url, {'size': size} if size else {}, HTTP_ACCEPT=accept)
+                self.assertEqual(200, response.status_code)
+                self.assertEqual(expected_type, response['Content-Type'])
+                self.assertIn('Accept', response['Vary'])
+                if expected_type == 'image/png':
+                    self.assertEqual(expected_width, Image.open(BytesIO(response.content)).size[0])
+                else:
+                    self.assertIn(' width="{}" '.format(expected_width), response.content.decode('us-ascii')[:200])
+
+    def test_export_enrollment_sheets(self):
+        """
+        The action streams a ZIP archive with the sheets of the selected users that have a secret
+        """
+        user_ids = list(HubUser.objects.order_by('id').values_list('id', flat=True))
+        response = self.client.post(reverse('admin:hub_app_hubuser_changelist'), {
+            'action': 'export_enrollment_sheets',
+            '_selected_action': [str(user_id) for user_id in user_ids],
+        })
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertEqual('application/zip', response['Content-Type'])
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="enrollment-sheets-[0-9-]+\.zip"$')
+        with ZipFile(BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(
+                ['dumb_user_regenerate.svg', 'test_otp_stuff_superuser.svg'], sorted(archive.namelist())
+            )
+            sheet = archive.read('test_otp_stuff_superuser.svg').decode('utf-8')
+        self.assertIn(b32encode(self.test_superuser_secret).decode('us-ascii')[:4], sheet)
@@ -0,0 +1,113 @@
+"""
+Tests for the cache of the authenticated user
+"""
+import pickle  # nosec
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from hub_app.authlib.user_cache import UserSnapshot, get_user_cache_key
+from hub_app.models import HubUser
+
+
+class UserCacheTest(TestCase):
+    """
+    The user of the session is taken from the cache
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = HubUser.objects.create_user(
+            username='mr_cached', password='right_pass', first_name='Cached', email='mr_cached@example.com'
+        )  # nosec
+        cls.user.set_totp_secret(b'SUPERSECRETSUPER-SUPERSECRETSUPER')
+        cls.user.save()
+
+    def setUp(self) -> None:
+        caches['users'].clear()
+        self.client.force_login(self.user)
+
+    def _user_queries(self, url: str) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(200, self.client.get(url).status_code)
+        return [query['sql'] for query in queries.captured_queries if 'hub_app_hubuser' in query['sql']]
+
+    def test_no_user_query(self):
+        """
+        Only the first request loads the user
+        """
+        for url in ('/hub/', '/hub/my-account/', '/hub/my-account/personal', '/hub/my-account/credentials'):
+            with self.subTest(url=url):
+                caches['users'].clear()
+                self.assertEqual(1, len(self._user_queries(url)))
+                self.assertEqual([], self._user_queries(url))
+
+    def test_invalidation_on_save(self):
+        """
+        A saved user is loaded again
+        """
+        self._user_queries('/hub/')
+        self.assertIsNotNone(caches['users'].get(get_user_cache_key(self.user.pk)))
+        user = HubUser.objects.get(pk=self.user.pk)
+        user.first_name = 'Changed'
+        user.save()
+        self.assertIsNone(caches['users'].get(get_user_cache_key(self.user.pk)))
+        self.assertEqual(1, len(self._user_queries('/hub/')))
+        self.assertIn('Changed', self.client.get('/hub/').content.decode('utf-8'))
+
+    def test_invalidation_on_delete(self):
+        """
+        A deleted user is not authenticated anymore
+        """
+        self._user_queries('/hub/')
+        HubUser.objects.get(pk=self.user.pk).delete()
+        self.assertIsNone(caches['users'].get(get_user_cache_key(self.user.pk)))
+        self.assertFalse(self.client.get('/hub/').wsgi_request.user.is_authenticated)
+
+    def test_session_hash(self):
+        """
+        A snapshot only matches sessions with the same session auth hash; other sessions end
+        """
+        other = HubUser.objects.get(pk=self.user.pk)
+        other.set_password('other_pass')  # nosec
+        HubUser.objects.filter(pk=self.user.pk).update(password=other.password)  # Without signal
+        caches['users'].set(get_user_cache_key(self.user.pk), UserSnapshot.from_user(other))
+        self.assertFalse(self.client.get('/hub/').wsgi_request.user.is_authenticated)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_inactive_snapshot(self):
+        """
+        A snapshot of an inactive user is not used, like the backend would not return the user
+        """
+        inactive = HubUser.objects.defer('totp_secret').get(pk=self.user.pk)
+        inactive.is_active = False
+        HubUser.objects.filter(pk=self.user.pk).update(is_active=False)  # Without signal
+        caches['users'].set(get_user_cache_key(self.user.pk), UserSnapshot.from_user(inactive))
+        self.assertFalse(self.client.get('/hub/').wsgi_request.user.is_authenticated)
+        self.assertIsNone(caches['users'].get(get_user_cache_key(self.user.pk)))
+
+    @override_settings(USER_CACHE=None)
+    def test_disabled(self):
+        """
+        Without cache, every request loads the user
+        """
+        self.assertEqual(1, len(self._user_queries('/hub/')))
+        self.assertEqual(1, len(self._user_queries('/hub/')))
+
+    def test_snapshot(self):
+        """
+        The snapshot survives the cache and creates a complete user, the secret is loaded on access
+        """
+        user = HubUser.objects.defer('totp_secret').get(pk=self.user.pk)
+        snapshot = pickle.loads(pickle.dumps(UserSnapshot.from_user(user)))  # nosec
+        self.assertNotIn('totp_secret', snapshot.field_names)
+        restored = snapshot.to_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.pk, restored.pk)
+            self.assertEqual('mr_cached', restored.username)
+            self.assertEqual('mr_cached@example.com', restored.email)
+            self.assertTrue(restored.is_active)
+        with self.assertNumQueries(1):
+            self.assertEqual(b'SUPERSECRETSUPER-SUPERSECRETSUPER', restored.get_totp_secret())
@@ -3,7 +3,7 @@ URL Config for the hub_app, which is the main app
 """
 from django.conf.urls import url
 from django.urls import path
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import never_cache, cache_control
 
 from hub_app.views.admin import RegenerateOtpSecretView, QrCodeByUser, OtpAssistantView
 from hub_app.views.auth import LogoutView, LoginView
@@ -48,9 +48,14 @@ ADMIN_URLS = ([
         never_cache(RegenerateOtpSecretView.as_view()),
         name='actions.regenerate-otp-secret'
     ),
+    url(
+        r'^views/otp-qr/(?P<user_id>\d+)$',
+        cache_control(private=True, no_cache=True)(QrCodeByUser.as_view()),  # Revalidated with the ETag
+        name='views.qr.negotiated'
+    ),
     url(
         r'^views/otp-qr/(?P<user_id>\d+)\.(?P<file_type>svg|png)$',
-        never_cache(QrCodeByUser.as_view()),
+        cache_control(private=True, no_cache=True)(QrCodeByUser.as_view()),  # Revalidated with the ETag
         name='views.qr'
     ),
     url(
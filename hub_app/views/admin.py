@@ -2,23 +2,55 @@
 Additional Admin Views
 """
 from base64 import b32encode
+from typing import Optional
 
+from django.conf import settings
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.views import View
 from django.views.generic import TemplateView
 
 from hub_app.authlib.crypt import SymmetricCrypt
-from hub_app.authlib.totp.qr import create_png_qr_code, create_transparent_svg_qr_code
+from hub_app.authlib.totp.qr import get_qr_code_size
+from hub_app.authlib.totp.qr_cache import render_qr_code, CONTENT_TYPES
 from hub_app.authlib.totp.token import create_random_totp_secret
 from hub_app.models import HubUser
 from hub_app.navlib.next_url import get_next
 
 
+def get_accepted_file_type(accept: str, default: str) -> str:
+    """
+    Choose the QR code format from an Accept header
+
+    :param str accept: The Accept header, may be empty
+    :param str default: The format if the header prefers none of the formats
+    :rtype: str
+    :returns: The format, "png" or "svg"
+    """
+    best_file_type, best_quality = default, 0.0
+    for media_range in accept.split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        for file_type, content_type in CONTENT_TYPES.items():
+            if media_type == content_type and quality > best_quality:
+                best_file_type, best_quality = file_type, quality
+    return best_file_type
+
+
 class QrCodeByUser(PermissionRequiredMixin, View):
     """
     Show User's QR Code
+
+    Without a file type in the URL, the format is negotiated with the Accept header. The size in pixels can be
+    requested with "?size="; it is rounded down to whole blocks.
     """
 
     http_method_names = ['get']
@@ -27,25 +59,46 @@ class QrCodeByUser(PermissionRequiredMixin, View):
     )
     raise_exception = True
 
-    actions = {
-        'png': (lambda d, u: create_png_qr_code(u, d, block_size=4), 'image/png'),
-        'svg': (lambda d, u: create_transparent_svg_qr_code(u, d, block_size=64), 'image/svg+xml'),
-    }
+    default_file_type = 'png'
 
-    def get(self, request, user_id: int, file_type: str):
+    @staticmethod
+    def get_size(request) -> int:
         """
-        Handle GET
+        Get the requested size in pixels
+
+        :param HttpRequest request: The request
+        :rtype: int
+        :returns: The size, the default size if none or an invalid one is requested
+        """
+        try:
+            size = int(request.GET.get('size', ''))
+        except ValueError:
+            return settings.QR_CODE_DEFAULT_SIZE
+        return max(1, min(size, settings.QR_CODE_MAX_SIZE))
+
+    def get(self, request, user_id: int, file_type: Optional[str] = None):
+        """
+        Handle GET, with ETag and conditional GET
         """
-        (method, content_type) = self.actions[file_type]
+        negotiated = file_type is None
+        if negotiated:
+            file_type = get_accepted_file_type(request.META.get('HTTP_ACCEPT', ''), self.default_file_type)
         try:
             user_obj = HubUser.objects.get(id=user_id)  # type: HubUser
         except HubUser.DoesNotExist:
             raise Http404()
         if not user_obj.totp_secret:
             raise Http404()
-        qr_code = method(b32encode(SymmetricCrypt().decrypt(user_obj.totp_secret)), user_obj.username)
-        response = HttpResponse(content_type=content_type)
-        qr_code.save(response)
+        secret = b32encode(user_obj.get_totp_secret())
+        block_size = max(1, self.get_size(request) // get_qr_code_size(user_obj.username, secret))
+        etag, qr_code = render_qr_code(user_obj.username, secret, file_type, block_size)
+        etag = '"{}"'.format(etag)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(qr_code, content_type=CONTENT_TYPES[file_type])
+        response['ETag'] = etag
+        if negotiated:
+            patch_vary_headers(response, ('Accept',))
         return response
 
 
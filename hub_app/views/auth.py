@@ -10,6 +10,8 @@ from django.utils.translation import gettext_lazy as _
 from django.urls import reverse_lazy
 from django.views import View
 
+from hub_app.authlib.backend import TotpAuthenticationBackend
+from hub_app.authlib.ratelimit import RateLimiter, get_rate_limiter
 from hub_app.forms.auth import UsernamePasswordOtpForm
 from hub_app.navlib.next_url import get_next
 
@@ -52,14 +54,15 @@ class LoginView(View):
             return redirect(reverse_lazy('ha:auth:login'), permanent=False)
         return super(LoginView, self).dispatch(request, *args, **kwargs)
 
-    def _show_form(self, request: HttpRequest, form: UsernamePasswordOtpForm = UsernamePasswordOtpForm()):
+    def _show_form(self, request: HttpRequest, form: UsernamePasswordOtpForm = UsernamePasswordOtpForm(),
+                   status: int = 200):
         """
         Send the form to the client
         """
         return render(request, self.template_name, {
             'form': form,
             'next_url': get_next(request),
-        }, content_type=self.content_type)
+        }, content_type=self.content_type, status=status)
 
     def get(self, request: HttpRequest) -> HttpResponse:
         """
@@ -75,6 +78,11 @@ class LoginView(View):
         if not form.is_valid():
             return self._show_form(request, form)
         data = form.clean()
+        if get_rate_limiter().is_limited(
+                RateLimiter.get_keys(request, TotpAuthenticationBackend.clean_username(data['username']))
+        ):
+            form.add_error(None, _('Too many failed login attempts. Please try again later.'))
+            return self._show_form(request, form, status=429)
         user = authenticate(
             request,
             username=data['username'],
@@ -13,23 +13,24 @@ from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMessage
 from django.core.signing import Signer, BadSignature
 from django.db import transaction, DatabaseError
 from django.http import HttpRequest, HttpResponseForbidden
 from django.shortcuts import redirect, render
-from django.template.loader import get_template
 from django.urls import reverse_lazy, reverse
-from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 
+from hub_app.accountlib.lookups import users_by_email, get_recoverable_users
 from hub_app.authlib.crypt import SymmetricCrypt
-from hub_app.authlib.totp.token import get_possible_otps, create_random_totp_secret
+from hub_app.authlib.hashing import check_user_password, set_user_password
+from hub_app.authlib.totp.token import verify_otp, create_random_totp_secret
 from hub_app.forms.forgot_credentials import ForgottenCredentialsStep1Form, \
     ForgottenCredentialsStep2LostPasswordForm, ForgottenCredentialsStep2LostUsernameForm, \
     ForgottenCredentialsStep2LostOtpForm, ForgottenCredentialsStep3BaseForm, ForgottenCredentialsStep3NewPasswordForm, \
     ForgottenCredentialsStep3ConfirmOtpForm
+from hub_app.maillib.outbox import queue_mail
+from hub_app.maillib.templates import render_mail
 from hub_app.models import HubUser, PendingCredentialRecovery
 
 
@@ -126,14 +127,14 @@ class ForgotCredentialsSecondStepView(View):
         """
         Verify that the password matches the user
         """
-        return user.check_password(password)
+        return check_user_password(user, password)
 
     @staticmethod
     def verify_otp(user: HubUser, otp: str):
         """
         Verify that the OTP matches the user
         """
-        return otp in get_possible_otps(user.get_totp_secret())
+        return verify_otp(user.get_totp_secret(), otp)
 
     @staticmethod
     def verify_username(user: HubUser, username: str):
@@ -149,6 +150,7 @@ class ForgotCredentialsSecondStepView(View):
         with transaction.atomic():
             tx_id = transaction.savepoint()
             try:
+                PendingCredentialRecovery.objects.filter(user=user).expired().delete()
                 recovery = PendingCredentialRecovery.objects.create(
                     user=user,
                     recovery_type=lost
@@ -167,17 +169,16 @@ class ForgotCredentialsSecondStepView(View):
                 quote(signed_recovery_key)
             )
             try:
-                recovery_mail = EmailMessage(
+                queue_mail(
                     to=[user.email],
                     from_email=settings.EMAIL_RECOVERY_FROM,
                     subject=settings.EMAIL_RECOVERY_SUBJECT,
-                    body=get_template('hub_app/auth/forgot-credentials/recovery-email.txt').render({
+                    body=render_mail('recovery', {
                         'recovery_url': recovery_link,
                         'first_name': user.first_name,
                     })
                 )
-                recovery_mail.send(fail_silently=False)
-            except (OSError, ValueError):  # pragma: no cover  # Safeguard for mail sending errors and template errors
+            except (DatabaseError, ValueError):  # pragma: no cover  # Safeguard for outbox errors and template errors
                 transaction.savepoint_rollback(tx_id)
                 return self.report(request)
             transaction.savepoint_commit(tx_id)
@@ -226,11 +227,7 @@ class ForgotCredentialsSecondStepView(View):
             'otp-secret': self.handle_lost_otp_secret,
         }
         try:
-            user = HubUser.objects.filter(
-                is_active=True, pendingregistration__isnull=True, pendingcredentialrecovery__isnull=True
-            ).get(
-                email__iexact=form.cleaned_data['email'].strip().lower()
-            )
+            user = users_by_email(form.cleaned_data['email'].strip(), get_recoverable_users()).get()
         except HubUser.DoesNotExist:
             return self.report(request)
         except HubUser.MultipleObjectsReturned:
@@ -288,8 +285,8 @@ class ForgotCredentialsThirdStepView(View):
             return self.report(request, 'invalid-link')
         try:
             pending_recovery = PendingCredentialRecovery.objects.filter(
-                user__is_active=True, valid_until__gte=now()
-            ).get(uuid=recovery)  # type: PendingCredentialRecovery
+                user__is_active=True
+            ).get_live(uuid=recovery)  # type: PendingCredentialRecovery
         except PendingCredentialRecovery.DoesNotExist:
             return self.report(request, 'invalid-link')
         if pending_recovery.key != auth:  # pragma: no cover  # Safeguard, can only happen with compromised security key
@@ -340,8 +337,8 @@ class ForgotCredentialsSetNewPasswordView(View):
             return self.send_form(request, form, recovery_str)
         try:
             recovery_data = PendingCredentialRecovery.objects.filter(
-                user__is_active=True, valid_until__gte=now(), recovery_type='password'
-            ).get(uuid=recovery, key=auth)  # type: PendingCredentialRecovery
+                user__is_active=True, recovery_type='password'
+            ).get_live(uuid=recovery, key=auth)  # type: PendingCredentialRecovery
         except PendingCredentialRecovery.DoesNotExist:  # pragma: no cover  # Database Safeguard
             form.add_error(None, _('The request for Credential Recovery is invalid.') + ' ' +
                            _('Please contact our support team. Error Code: %(code)s') % {'code': 'EA02'})
@@ -354,7 +351,7 @@ class ForgotCredentialsSetNewPasswordView(View):
             return self.send_form(request, form, recovery_str)
         with transaction.atomic():
             tx_id = transaction.savepoint()
-            user.set_password(form.cleaned_data['password'])
+            set_user_password(user, form.cleaned_data['password'])
             user.save()
             recovery_data.delete()
             transaction.savepoint_commit(tx_id)
@@ -398,8 +395,8 @@ class ForgotCredentialsRevealNewOtpSecret(View):
         try:
             auth = Signer(salt=recovery_str).unsign(form.cleaned_data['auth'])
             user = PendingCredentialRecovery.objects.filter(
-                user__is_active=True, valid_until__gte=now(), recovery_type='otp-secret'
-            ).get(uuid=recovery, key=auth).user
+                user__is_active=True, recovery_type='otp-secret'
+            ).get_live(uuid=recovery, key=auth).user
         except PendingCredentialRecovery.DoesNotExist:  # pragma: no cover  # Database Safeguard
             return deny_step(request, 'EA05')
         except (ValueError, BadSignature):  # pragma: no cover  # Manipulation Safeguard
@@ -458,8 +455,8 @@ class ForgotCredentialsConfirmNewOtpSecret(View):
         try:
             auth = Signer(salt=recovery_str).unsign(auth_form.cleaned_data['auth'])
             recovery_data = PendingCredentialRecovery.objects.filter(
-                user__is_active=True, valid_until__gte=now(), recovery_type='otp-secret'
-            ).get(uuid=recovery, key=auth)
+                user__is_active=True, recovery_type='otp-secret'
+            ).get_live(uuid=recovery, key=auth)
             user = recovery_data.user
         except PendingCredentialRecovery.DoesNotExist:  # pragma: no cover  # Database Safeguard
             return deny_step(request, 'EA12')
@@ -468,7 +465,7 @@ class ForgotCredentialsConfirmNewOtpSecret(View):
         form = ForgottenCredentialsStep3ConfirmOtpForm(request.POST)
         if not form.is_valid():
             return self.show_form(request, new_secret, user.username, recovery_str, form)
-        if form.cleaned_data['otp'] not in get_possible_otps(new_secret):
+        if not verify_otp(new_secret, form.cleaned_data['otp']):
             form.add_error('otp', _('This one time password is not valid.'))
             return self.show_form(request, new_secret, user.username, recovery_str, form)
         with transaction.atomic():
@@ -503,8 +500,8 @@ class ForgotCredentialsRevealUsername(View):
         try:
             auth = Signer(salt=recovery_str).unsign(auth_form.cleaned_data['auth'])
             recovery_obj = PendingCredentialRecovery.objects.filter(
-                user__is_active=True, valid_until__gte=now(), recovery_type='username'
-            ).get(uuid=recovery, key=auth)
+                user__is_active=True, recovery_type='username'
+            ).get_live(uuid=recovery, key=auth)
         except PendingCredentialRecovery.DoesNotExist:  # pragma: no cover  # Safeguard
             return deny_step(request, 'EA21')
         except (ValueError, BadSignature):  # pragma: no cover  # Safeguard
@@ -12,22 +12,22 @@ from django.contrib.auth import logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMessage
 from django.core.signing import Signer, BadSignature
 from django.db import DatabaseError, transaction
 from django.http import HttpRequest, JsonResponse
 from django.shortcuts import render, redirect
-from django.template.loader import get_template
 from django.urls import reverse
-from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic import TemplateView
 
 from hub_app.authlib.crypt import SymmetricCrypt
-from hub_app.authlib.totp.token import create_encrypted_random_totp_secret, get_possible_otps
+from hub_app.authlib.hashing import check_user_password, set_user_password
+from hub_app.authlib.totp.token import create_encrypted_random_totp_secret, verify_otp
 from hub_app.forms.my_account import PasswordChangeForm, NewOtpSecretForm, SetNameInformationForm, SetEMailForm, \
     SetEMailKeyForm
+from hub_app.maillib.outbox import queue_mail
+from hub_app.maillib.templates import render_mail
 from hub_app.models import HubUser, PendingEMailChange
 
 
@@ -94,11 +94,11 @@ class MyAccountCredentialsPasswordView(LoginRequiredMixin, View):
             additional_errors = True
         if additional_errors:
             return self._send_password_change_form(request, form)
-        if not request.user.check_password(form.cleaned_data['old_password']):
+        if not check_user_password(request.user, form.cleaned_data['old_password']):
             form.add_error('old_password', _('This is not your current password'))
             return self._send_password_change_form(request, form)
         try:
-            request.user.set_password(form.cleaned_data['new_password1'])
+            set_user_password(request.user, form.cleaned_data['new_password1'])
             request.user.save()
         except DatabaseError as db_error:  # pragma: no cover  # Database Safeguard
             form.add_error(None, _('Unable to save the password: %(error)s') % {'error': db_error})
@@ -175,7 +175,7 @@ class MyAccountCredentialsOtpSecretView(LoginRequiredMixin, View):
             form.add_error(None, _('No Secret set. Please create a new secret first.'))
             return self._send_otp_form(request, form)
         secret = SymmetricCrypt().decrypt(b64decode(secret.encode('us-ascii')))
-        if form.cleaned_data['otp_confirm'] not in get_possible_otps(secret):
+        if not verify_otp(secret, form.cleaned_data['otp_confirm']):
             form.add_error('otp_confirm', _('One-time password invalid'))
             return self._send_otp_form(request, form)
         del request.session['encrypted_new_totp_secret']
@@ -274,7 +274,7 @@ class MyAccountPersonalEMailView(LoginRequiredMixin, View):
         Test if a user can change ones E-Mail Address
         """
         try:
-            PendingEMailChange.objects.get(user=request.user)
+            PendingEMailChange.objects.get_live(user=request.user)
             return False
         except PendingEMailChange.DoesNotExist:
             return True
@@ -329,19 +329,18 @@ class MyAccountPersonalEMailView(LoginRequiredMixin, View):
                     }),
                     quote(signed_change_code)
                 )
-                verification_mail = EmailMessage(
+                queue_mail(
                     to=[email],
                     from_email=settings.EMAIL_VERIFICATION_FROM,
                     subject=settings.EMAIL_VERIFICATION_SUBJECT,
-                    body=get_template('hub_app/my-account/change-email.txt').render({
+                    body=render_mail('email-change', {
                         'change_url': url,
                         'first_name': request.user.first_name,
                     })
                 )
-                verification_mail.send(fail_silently=False)
                 transaction.savepoint_commit(tx_id)
                 return self._send_email_form(request, success=True)
-            except (DatabaseError, OSError, ValueError):  # pragma: no cover  # Database Safeguard
+            except (DatabaseError, ValueError):  # pragma: no cover  # Database Safeguard
                 transaction.savepoint_rollback(tx_id)
                 form.add_error(None,
                                _("We're experiencing problems creating your change request. Please try again later."))
@@ -380,9 +379,7 @@ class MyAccountPersonalEMailVerifyView(LoginRequiredMixin, View):
         if not form.is_valid():
             return self._send_confirmation_form(request, change, form, link_error=True)
         try:
-            change_request = PendingEMailChange.objects.filter(
-                user=request.user, valid_until__gte=now()
-            ).get(uuid=change)
+            change_request = PendingEMailChange.objects.filter(user=request.user).get_live(uuid=change)
         except PendingEMailChange.DoesNotExist:
             return self._send_confirmation_form(request, change, form, link_error=True)
         try:
@@ -401,9 +398,7 @@ class MyAccountPersonalEMailVerifyView(LoginRequiredMixin, View):
         if not form.is_valid():
             return self._send_confirmation_form(request, change, form)
         try:
-            change_request = PendingEMailChange.objects.filter(
-                user=request.user, valid_until__gte=now()
-            ).get(uuid=change)
+            change_request = PendingEMailChange.objects.filter(user=request.user).get_live(uuid=change)
         except PendingEMailChange.DoesNotExist:
             form.add_error(None, _("There is no E-Mail change waiting to be completed. Maybe it's already expired."))
             return self._send_confirmation_form(request, change, form)
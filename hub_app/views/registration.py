@@ -10,19 +10,19 @@ from django.contrib.auth import logout
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMessage
 from django.core.signing import Signer, BadSignature
 from django.db import transaction, DatabaseError
 from django.http import HttpRequest
 from django.shortcuts import render
-from django.template.loader import get_template
 from django.urls import reverse
-from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 
-from hub_app.authlib.totp.token import get_possible_otps
+from hub_app.authlib.hashing import set_user_password
+from hub_app.authlib.totp.token import verify_otp
 from hub_app.forms.registration import RegistrationStep1Form, RegistrationStep2UrlForm, RegistrationStep2Form
+from hub_app.maillib.outbox import queue_mail
+from hub_app.maillib.templates import render_mail
 from hub_app.models import HubUser, PendingRegistration
 
 
@@ -102,17 +102,16 @@ class RegistrationFirstStepView(UserPassesTestMixin, View):
                 quote(signed_reg_code)
             )
             try:
-                registration_mail = EmailMessage(
+                queue_mail(
                     to=[email],
                     from_email=settings.EMAIL_REGISTRATION_FROM,
                     subject=settings.EMAIL_REGISTRATION_SUBJECT,
-                    body=get_template('hub_app/registration/reg-email.txt').render({
+                    body=render_mail('registration', {
                         'reg_url': url,
                         'first_name': first_name,
                     })
                 )
-                registration_mail.send(fail_silently=False)
-            except (OSError, ValueError):  # pragma: no cover  # Safeguard for mail sending errors and template errors
+            except (DatabaseError, ValueError):  # pragma: no cover  # Safeguard for outbox errors and template errors
                 transaction.savepoint_rollback(tx_id)
                 form.add_error(
                     None,
@@ -169,8 +168,8 @@ class RegistrationSecondStepView(UserPassesTestMixin, View):
             return render(request, self.bad_link_template_name, {}, content_type=self.content_type)
         try:
             pending = PendingRegistration.objects.filter(
-                valid_until__gte=now(), user__is_active=True, user__totp_secret__isnull=False
-            ).select_related('user').get(uuid=pending_uuid)  # type: PendingRegistration
+                user__is_active=True, user__totp_secret__isnull=False
+            ).select_related('user').get_live(uuid=pending_uuid)  # type: PendingRegistration
         except PendingRegistration.DoesNotExist:
             return render(request, self.bad_link_template_name, {}, content_type=self.content_type)
         if pending_key != pending.key:
@@ -217,7 +216,7 @@ class RegistrationSecondStepView(UserPassesTestMixin, View):
             return self._send_form(request, form)
         # Check the OTP
         otp = form.cleaned_data['otp']
-        if otp not in get_possible_otps(b64decode(request.session['registration_step2_totp'].encode('ascii'))):
+        if not verify_otp(b64decode(request.session['registration_step2_totp'].encode('ascii')), otp):
             form.add_error('otp', _('Your one time password has expired'))
             form.add_error('password1', _('Please re-enter your password'))
             return self._send_form(request, form)
@@ -226,8 +225,8 @@ class RegistrationSecondStepView(UserPassesTestMixin, View):
             tx_id = transaction.savepoint()
             try:
                 pending = PendingRegistration.objects.filter(
-                    valid_until__gte=now(), user__is_active=True, user__totp_secret__isnull=False, user=user
-                ).select_related('user').get(uuid=form.cleaned_data['reg'])  # type: PendingRegistration
+                    user__is_active=True, user__totp_secret__isnull=False, user=user
+                ).select_related('user').get_live(uuid=form.cleaned_data['reg'])  # type: PendingRegistration
             except PendingRegistration.DoesNotExist:  # pragma: no cover  # Safeguard for deletion in-between
                 transaction.savepoint_rollback(tx_id)
                 return render(request, self.bad_link_template_name, {}, content_type=self.content_type)
@@ -241,7 +240,7 @@ class RegistrationSecondStepView(UserPassesTestMixin, View):
                 transaction.savepoint_rollback(tx_id)
                 return render(request, self.bad_link_template_name, {}, content_type=self.content_type)
             pending.delete()
-            user.set_password(form.cleaned_data['password1'])
+            set_user_password(user, form.cleaned_data['password1'])
             user.save()
             transaction.savepoint_commit(tx_id)
         logout(request)
@@ -9,7 +9,7 @@ from django.shortcuts import render
 from django.utils.timezone import now
 from django.views import View
 
-from hub_app.authlib.totp.token import get_possible_otps
+from hub_app.authlib.totp.token import get_possible_otps, verify_otp
 from hub_app.forms.support import TestYourAppOtpForm
 
 
@@ -55,6 +55,6 @@ class TestYourAppView(View):
         if not form.is_valid():
             return self._send_template(request, form)
         chosen_otp = form.cleaned_data['otp_to_be_tested']
-        success = chosen_otp in get_possible_otps(self.secret)
+        success = verify_otp(self.secret, chosen_otp)
         list_of_otps = get_possible_otps(self.secret, -10, 10)
         return self._send_template(request, form, True, chosen_otp, list_of_otps, success)
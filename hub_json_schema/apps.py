@@ -12,3 +12,10 @@ class HubJsonSchemaConfig(AppConfig):
     """
     name = 'hub_json_schema'
     verbose_name = _('* Passiopeia Hub JSON Schema')
+
+    def ready(self):
+        """
+        Serialize the schemas
+        """
+        from hub_json_schema.registry import Registry  # pylint: disable=import-outside-toplevel
+        Registry()
@@ -1,8 +1,24 @@
 """
 Registry for JSON Schema
+
+The schemas never change while the hub runs, so the registry serializes every schema and example once, when the app is
+ready, together with a strong ETag and compressed variants (gzip, and Brotli if the "brotli" package is installed).
 """
+import gzip
+import json
+from hashlib import sha256
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+
 from hub_json_schema.published_schema import PUBLISHED
 
+try:
+    import brotli
+except ImportError:  # pragma: no cover  # Brotli is optional
+    brotli = None  # pylint: disable=invalid-name
+
 
 class Singleton(type):
     """
@@ -17,7 +33,57 @@ class Singleton(type):
         return cls._instances[cls]
 
 
-class Registry(metaclass=Singleton):  # pylint: disable=too-few-public-methods
+class SerializedJson:  # pylint: disable=too-few-public-methods
+    """
+    A JSON document, serialized and compressed once
+    """
+
+    __slots__ = ('content_type', 'etag', 'encodings')
+
+    def __init__(self, data, content_type: str):
+        """
+        :param data: The JSON data
+        :param str content_type: The content type of the document
+        """
+        content = json.dumps(data, cls=DjangoJSONEncoder, indent=2).encode('utf-8')
+        self.content_type = content_type
+        self.etag = sha256(content).hexdigest()
+        self.encodings = {
+            'identity': content,
+            'gzip': SerializedJson.gzip_compress(content),
+        }  # type: Dict[str, bytes]
+        if brotli is not None:  # pragma: no cover  # Brotli is optional
+            self.encodings['br'] = brotli.compress(content)
+
+    @staticmethod
+    def gzip_compress(content: bytes) -> bytes:
+        """
+        Compress with gzip, without a timestamp, so the result is the same on every node (gzip.compress() only takes
+        the mtime since Python 3.8)
+
+        :param bytes content: The content
+        :rtype: bytes
+        :returns: The compressed content
+        """
+        with BytesIO() as buffer:
+            with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as gzip_file:
+                gzip_file.write(content)
+            return buffer.getvalue()
+
+    def get_etag(self, encoding: str) -> str:
+        """
+        Get the strong ETag of an encoding
+
+        :param str encoding: The encoding, "identity", "gzip" or "br"
+        :rtype: str
+        :returns: The ETag, with quotes
+        """
+        if encoding == 'identity':
+            return '"{}"'.format(self.etag)
+        return '"{}-{}"'.format(self.etag, encoding)
+
+
+class Registry(metaclass=Singleton):
     """
     Define the singleton Registry
     """
@@ -27,6 +93,7 @@ class Registry(metaclass=Singleton):  # pylint: disable=too-few-public-methods
         Initialize from the published classes
         """
         self.__registry = {}
+        self.__serialized = {}
         for schema in PUBLISHED:
             version = str(schema.schema_version)
             name = schema.schema_name
@@ -38,6 +105,22 @@ class Registry(metaclass=Singleton):  # pylint: disable=too-few-public-methods
                 'def': schema.schema_definition,
                 'example': schema.example,
             }
+            self.__serialized[(name, version, False)] = SerializedJson(
+                schema.schema_definition, 'application/schema+json'
+            )
+            if schema.example is not None:
+                self.__serialized[(name, version, True)] = SerializedJson(schema.example, 'application/json')
+        self.__listing = [
+            {
+                'sortable_name': name,
+                'schema_versions': [
+                    {
+                        'sortable_version': version,
+                        'has_example': schema_data.get('example', None) is not None,
+                    } for version, schema_data in versions.items()
+                ],
+            } for name, versions in self.__registry.items()
+        ]
 
     @property
     def schemas(self):
@@ -45,3 +128,22 @@ class Registry(metaclass=Singleton):  # pylint: disable=too-few-public-methods
         Access to the Schema
         """
         return self.__registry
+
+    @property
+    def listing(self) -> List[dict]:
+        """
+        The names and versions of all schemas, for the list view
+        """
+        return self.__listing
+
+    def get_serialized(self, name: str, version: str, example: bool = False) -> Optional[SerializedJson]:
+        """
+        Get a serialized schema or example
+
+        :param str name: The name of the schema
+        :param str version: The version of the schema
+        :param bool example: Get the example instead of the schema
+        :rtype: Optional[SerializedJson]
+        :returns: The serialized document, None if there is none
+        """
+        return self.__serialized.get((name, version, example), None)
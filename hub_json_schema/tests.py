@@ -1,14 +1,19 @@
 """
 Tests for the JSON Schema App
 """
+import gzip
+import json
+from unittest import skipIf
+
 from bs4 import BeautifulSoup
 from django.conf import settings
-from django.http import JsonResponse
 from django.test import SimpleTestCase, TestCase
 from jsonschema import Draft7Validator, RefResolver
 
 from hub_json_schema.published_schema import PUBLISHED
+from hub_json_schema.registry import Registry, brotli
 from hub_json_schema.schema.base.schema import JsonSchema
+from hub_json_schema.views import get_accepted_encoding
 
 
 class PublishedSchemaTest(SimpleTestCase):
@@ -76,7 +81,8 @@ class SchemaViewTest(TestCase):
             with self.subTest(msg='Testing example link "{}"'.format(link)):
                 response = self.client.get(link, follow=False)
                 self.assertEqual(200, response.status_code)
-                self.assertIsInstance(response, JsonResponse)
+                self.assertEqual('application/json', response['Content-Type'])
+                self.assertIsInstance(json.loads(response.content.decode('utf-8')), dict)
 
     def test_non_existing_schema_name(self):
         """
@@ -100,6 +106,95 @@ class SchemaViewTest(TestCase):
         self.assertEqual(404, response.status_code)
 
 
+class SerializedSchemaTest(SimpleTestCase):
+    """
+    Test the pre-serialized responses
+    """
+
+    url = '/schema/type-username-v1'
+
+    def test_content(self):
+        """
+        The response is the serialized schema, with ETag and cache headers
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(Registry().schemas['type-username']['1']['def'], json.loads(response.content.decode('utf-8')))
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{64}"$')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age={}'.format(settings.JSON_SCHEMA_MAX_AGE), response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_not_modified(self):
+        """
+        A known ETag is answered with "304 Not Modified"
+        """
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.content)
+        self.assertEqual(etag, response['ETag'])
+        self.assertEqual(200, self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code)
+
+    def test_gzip(self):
+        """
+        Clients that accept gzip get the compressed variant, with its own ETag
+        """
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+        self.assertEqual('gzip', response['Content-Encoding'])
+        self.assertEqual(plain.content, gzip.decompress(response.content))
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+
+    def test_refused_gzip(self):
+        """
+        Clients that refuse gzip with q=0 get the plain document
+        """
+        for accept_encoding in ('gzip;q=0, identity', 'gzip;q=0', 'gzip;q=0.5, identity;q=1'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                json.loads(response.content)
+
+    @skipIf(brotli is None, 'Brotli is not installed')
+    def test_brotli(self):  # pragma: no cover  # Brotli is optional
+        """
+        Clients that accept Brotli get the Brotli variant
+        """
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual('br', response['Content-Encoding'])
+        self.assertEqual(plain.content, brotli.decompress(response.content))
+
+
+class AcceptedEncodingTest(SimpleTestCase):
+    """
+    Choose the content coding from the Accept-Encoding header
+    """
+
+    def test_accepted_encoding(self):
+        """
+        Test some headers
+        """
+        test_items = (
+            # Accept-Encoding, expected coding
+            ('', 'identity'),
+            ('gzip', 'gzip'),
+            ('gzip, br', 'br'),
+            ('br;q=0.5, gzip', 'gzip'),
+            ('deflate, gzip;q=0.8', 'gzip'),
+            ('gzip;q=0, identity', 'identity'),
+            ('GZIP;q=0.3, identity;q=0.2', 'gzip'),
+            ('*', 'br'),
+            ('*;q=0.5, br;q=0', 'gzip'),
+            ('gzip;q=invalid', 'identity'),
+        )
+        for accept_encoding, expected in test_items:
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(expected, get_accepted_encoding(accept_encoding, ['br', 'gzip']))
+
+
 class ValidateAllSchemasAndExamplesTest(SimpleTestCase):
     """
     Validate all examples with a JSON schema validation
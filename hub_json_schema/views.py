@@ -1,14 +1,48 @@
 """
 Views for the JSON Schema Delivery
 """
-from django.http import HttpRequest, Http404, JsonResponse
+from typing import Iterable
+
+from django.conf import settings
+from django.http import HttpRequest, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.views import View
 from django.views.generic import TemplateView
 
 from hub_json_schema.registry import Registry
 
 
-class JsonSchemaResponse(JsonResponse):
+def get_accepted_encoding(accept_encoding: str, encodings: Iterable[str]) -> str:
+    """
+    Choose the content coding from an Accept-Encoding header
+
+    Codings with q=0 are refused by the client. "identity" only wins if the header lists it with a higher quality.
+
+    :param str accept_encoding: The Accept-Encoding header, may be empty
+    :param Iterable[str] encodings: The available codings besides "identity", in the order of preference
+    :rtype: str
+    :returns: The coding, "identity" if the header accepts none of the codings
+    """
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    best_encoding, best_quality = 'identity', qualities.get('identity', 0.0)
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+class JsonSchemaResponse(HttpResponse):
     """
     A JSON schema response
     """
@@ -26,44 +60,40 @@ class ListJSONSchemasView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super(ListJSONSchemasView, self).get_context_data(**kwargs)
-        schema_list = []
-        for schema_name, schema_versions in Registry().schemas.items():
-            schema_version_list = []
-            for schema_version, schema_data in schema_versions.items():
-                schema_version_list.append({
-                    'sortable_version': schema_version,
-                    'has_example': schema_data.get('example', None) is not None
-                })
-            schema_info = {
-                'sortable_name': schema_name,
-                'schema_versions': schema_version_list,
-            }
-            schema_list.append(schema_info)
-        context['schema_list'] = schema_list
+        context['schema_list'] = Registry().listing
         return context
 
 
 class JSONSchemaView(View):
     """
     Show a JSON Schema
+
+    The schemas and examples are serialized once by the Registry; the view only picks the encoding and checks the ETag.
     """
 
     http_method_names = ['get']
 
+    encodings = ('br', 'gzip')
+
     def get(self, request: HttpRequest, schema: str, version: str, example: str = None):
         """
         Send the schema
         """
-        registry = Registry()
-        schema = registry.schemas.get(schema, None)
-        if schema is None:
-            raise Http404()
-        version = schema.get(version, None)
-        if version is None:
+        serialized = Registry().get_serialized(schema, version, example == '.json')
+        if serialized is None:
             raise Http404()
-        if example == '.json':
-            example = version.get('example', None)
-            if example is None:
-                raise Http404()
-            return JsonResponse(example, json_dumps_params={'indent': 2})
-        return JsonSchemaResponse(version.get('def'), json_dumps_params={'indent': 2})
+        encoding = get_accepted_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            [candidate for candidate in self.encodings if candidate in serialized.encodings]
+        )
+        etag = serialized.get_etag(encoding)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response_class = HttpResponse if example else JsonSchemaResponse
+            response = response_class(serialized.encodings[encoding], content_type=serialized.content_type)
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(response, public=True, max_age=settings.JSON_SCHEMA_MAX_AGE)
+        return response